@@ -1,387 +1,531 @@
-from fastapi import APIRouter, Query, Request
-from app.core.ai_agent import ask_gemini
-from fastapi.responses import JSONResponse
-import math
+from fastapi import APIRouter, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from app.core.ai_agent import (
+    ask_gemini_async,
+    cached_explanation,
+    error_text,
+    explain_within,
+    explanation_token,
+    open_explanation,
+    parse_explanation_token,
+    with_deadline,
+)
+from app.core.admission import Overloaded, get_admission, get_flights
+from app.core import config
+from app.core.ber import SimulationError, SimulationPlan, simulate
+from app.core.chain import ChainError, run_chain
+from app.core.batch import BatchError, calculate_batch, plain_column, safe_float, safe_int
+from app.core.coverage import CoverageError, CoverageRaster, CoverageSpec, get_store
+from app.core.fallback import local_explanation
+from app.core.graph import GRAPHS, evaluate
+from app.core.jobs import DONE, FINISHED, QueueFull, get_queue
+from app.core.llm_cache import get_cache
+from app.core.llm_client import LLMError
+from app.core.metrics import CALCULATIONS, ERRORS, REGISTRY, debug_sampled, stage
+from app.core.planner import CellularPlan, PlanError, optimize
+from app.core.prompts import build_prompt, sweep_prompt
+from app.core.session import LiveSession
+from app.core.sweep import SweepError, SweepPlan, SweepSummary, run_sweep
+from app.core.sweep import validate as validate_sweep
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+import asyncio
+import io
+import json
+import logging
+import numpy as np
 
 router = APIRouter()
+log = logging.getLogger(__name__)
 
-@router.get("/ai")
-def ask(prompt: str = Query(..., description="Prompt to Gemini")):
-    response = ask_gemini(prompt)
-    return {"gemini_response": response}
+def client_id(request):
+    # Fairness key for admission control: an explicit id, else the caller's address
+    if request.headers.get("X-Client-Id"):
+        return request.headers["X-Client-Id"][:128]
+    return request.client.host if request.client else "anonymous"
 
-import math
 
-def db_to_linear(db):
-    return 10 ** (db / 10)
+def overloaded_response(e):
+    ERRORS.inc(f"overloaded_{e.status_code}")
+    return JSONResponse(
+        {"error": str(e), "gemini": None},
+        status_code=e.status_code,
+        headers={"Retry-After": str(e.retry_after)},
+    )
 
-def calculate_link_budget(data):
-    # Constants
-    k = 1.38e-23  # Boltzmann constant (J/K)
-
-    # Extract inputs from user (match frontend input names)
-    print("Link budget data received:", data)  # Add this line for debugging
-    link_margin_db = float(data.get("link_margin_db", 0))     # dB
-    temperature = float(data.get("temperature_k", 290))       # Kelvin
-    noise_figure_db = float(data.get("noise_figure_db", 0))   # dB
-    bitrate = float(data.get("bitrate", 1e6))                 # bps
-    eb_no_db = float(data.get("eb_n0_db", 0))                 # dB
-
-    distance_km = float(data.get("distance", 1))              # km
-    frequency_mhz = float(data.get("frequency", 2400))        # MHz
-    tx_gain = float(data.get("tx_gain", 0))                   # dBi
-    rx_gain = float(data.get("rx_gain", 0))                   # dBi
-    system_loss = float(data.get("system_loss_db", 0))        # dB
-
-    # Convert dB values to linear
-    link_margin = db_to_linear(link_margin_db)
-    nf_linear = db_to_linear(noise_figure_db)
-    eb_no_linear = db_to_linear(eb_no_db)
-
-    # Step 1: Calculate Received Power in Watts
-    pr_watts = link_margin * k * temperature * nf_linear * bitrate * eb_no_linear
-
-    # Step 2: Convert Pr to dBm
-    pr_dbm = 10 * math.log10(pr_watts) + 30
-
-    # Step 3: Calculate FSPL in dB (Free Space)
-    fspl = 32.45 + 20 * math.log10(distance_km) + 20 * math.log10(frequency_mhz)
-
-    # Step 4: Calculate required Transmit Power
-    pt_dbm = pr_dbm + fspl + system_loss - tx_gain - rx_gain
-
-    return {
-        "received_power_dbm": round(pr_dbm, 2),
-        "transmit_power_dbm": round(pt_dbm, 2),
-        "fspl_db": round(fspl, 2),
-        "link_margin_db": round(link_margin_db, 2),
-        "noise_figure_db": round(noise_figure_db, 2),
-        "bitrate_bps": round(bitrate),
-        "eb_no_db": round(eb_no_db, 2),
-        "temperature_K": round(temperature),
-        "distance_km": round(distance_km, 2),
-        "frequency_mhz": round(frequency_mhz, 2),
-        "tx_gain_dbi": round(tx_gain, 2),
-        "rx_gain_dbi": round(rx_gain, 2),
-        "system_loss_db": round(system_loss, 2)
-    }
 
-def calculate_ofdm(data):
-    # Parse inputs
-    bandwidth_khz = float(data.get("bandwidth", 0))
-    subcarrier_spacing_khz = float(data.get("subcarrierSpacing", 0))
-    print("OFDM data received:", data)  # Add this line for debugging
-    modulation = str(data.get("modulation", "QAM"))
-    num_symbols_per_rb = int(data.get("numSymbols", 0))
-    rb_duration_us = float(data.get("duration_of_RB", 0))
-    parallel_rbs = int(data.get("parallelRB", 0))
-
-    # Map modulation to bits per symbol
-    modulation_bits_per_symbol = {
-        "BPSK": 1,
-        "QPSK": 2,
-        "8": 3,
-        "16": 4,
-        "32": 5,
-        "64": 6,
-        "128": 7,
-        "256": 8,
-        "1024": 10,
-        "4096": 12
-        }.get(modulation, 2)  # Default to QPSK if unknown
-
-    # 1. Subcarriers per RB
-    rb_bandwidth_hz = bandwidth_khz * 1e3
-    subcarrier_spacing_hz = subcarrier_spacing_khz * 1e3
-    subcarriers_per_rb = int(rb_bandwidth_hz // subcarrier_spacing_hz) if subcarrier_spacing_hz > 0 else 0
-
-    # 2. Bits per Resource Element (RE)
-    bits_per_re = modulation_bits_per_symbol
-
-    # 3. Bits per OFDM Symbol
-    bits_per_ofdm_symbol = subcarriers_per_rb * bits_per_re
-
-    # 4. Bits per Resource Block
-    bits_per_rb = bits_per_ofdm_symbol * num_symbols_per_rb
-
-    # 5. Max Transmission Rate with Parallel RBs
-    total_bits = bits_per_rb * parallel_rbs
-    rb_duration_sec = rb_duration_us * 1e-3 if rb_duration_us > 0 else 1  # avoid division by zero
-    max_data_rate_bps = total_bits / rb_duration_sec
-
-    # 6. Spectral Efficiency
-    total_bandwidth = rb_bandwidth_hz * parallel_rbs
-    spectral_efficiency = total_bits / (total_bandwidth * rb_duration_sec) if total_bandwidth > 0 else 0
-
-    return {
-        "bandwidth_khz": bandwidth_khz,
-        "subcarrier_spacing_khz": subcarrier_spacing_khz,
-        "modulation": modulation,
-        "modulation_bits_per_symbol": modulation_bits_per_symbol,
-        "num_symbols_per_rb": num_symbols_per_rb,
-        "rb_duration_us": rb_duration_us,
-        "parallel_rbs": parallel_rbs,
-        "subcarriers_per_rb": subcarriers_per_rb,
-        "bits_per_re": bits_per_re,
-        "bits_per_ofdm_symbol": bits_per_ofdm_symbol,
-        "bits_per_rb": bits_per_rb,
-        "total_bits": total_bits,
-        "rb_duration_sec": rb_duration_sec,
-        "max_data_rate_bps": max_data_rate_bps,
-        "total_bandwidth_hz": total_bandwidth,
-        "spectral_efficiency_bps_per_hz": spectral_efficiency
-    }
-
-def safe_float(value, default=0.0):
+@router.get("/ai")
+async def ask(request: Request, prompt: str = Query(..., description="Prompt to Gemini")):
     try:
-        return float(value)
-    except (TypeError, ValueError):
-        return default
+        response = await ask_gemini_async(prompt, client_id(request))
+    except Overloaded as e:
+        return overloaded_response(e)
+    return {"gemini_response": response}
 
-def safe_int(value, default=0):
-    try:
-        return int(value)
-    except (TypeError, ValueError):
-        return default
+def calculate_link_budget(data):
+    debug_sampled(log, "Link budget data received: %s", data)
+    return evaluate(GRAPHS["link_budget"], data)
+
+def calculate_ofdm(data):
+    debug_sampled(log, "OFDM data received: %s", data)
+    return evaluate(GRAPHS["ofdm"], data)
 
 def calculate_wireless_comm(data):
-    try:
-        bandwidth_khz = safe_float(data.get("bandwidth"))
-        if bandwidth_khz is None or bandwidth_khz <= 0:
-            return {"error": "Bandwidth must be greater than 0."}
-        bandwidth_hz = bandwidth_khz * 1e3
+    return evaluate(GRAPHS["wireless_comm"], data)
 
-        sampling_rate = safe_float(data.get("samplingRate"), 2 * bandwidth_hz)
-        if sampling_rate <= 0:
-            return {"error": "Sampling rate must be greater than 0."}
+def calculate_cellular(data):
+    return evaluate(GRAPHS["cellular"], data)
+
+SCENARIOS = {
+    "link_budget": calculate_link_budget,
+    "ofdm": calculate_ofdm,
+    "wireless_comm": calculate_wireless_comm,
+    "cellular": calculate_cellular,
+}
+
+# Key holding the numeric result in each scenario's response
+RESULT_KEYS = {
+    "link_budget": "calculation",
+    "ofdm": "result",
+    "wireless_comm": "calculation",
+    "cellular": "calculation",
+}
 
-        quant_bits = safe_int(data.get("quantBits"))
-        if quant_bits is None or not (1 <= quant_bits <= 32):
-            return {"error": "Quantization bits must be between 1 and 32."}
 
-        source_enc_rate = safe_float(data.get("sourceEncoderRate"))
-        if source_enc_rate is None or not (0 < source_enc_rate <= 1):
-            return {"error": "Source encoder rate must be between 0 and 1."}
+@router.post("/calculate")
+async def calculate(request: Request):
+    with stage("parse"):
+        body = await request.json()
+    scenario = body.get("scenario")
+    data = body.get("data")
 
-        channel_enc_rate = safe_float(data.get("channelEncoderRate"))
-        if channel_enc_rate is None or not (0 < channel_enc_rate <= 1):
-            return {"error": "Channel encoder rate must be between 0 and 1."}
+    if scenario not in SCENARIOS:
+        ERRORS.inc("unknown_scenario")
+        return JSONResponse({"error": f"Unknown scenario: {scenario}", "gemini": None}, status_code=400)
+
+    # Off the event loop: very large cells make the Erlang-B solvers take a while
+    with stage("calculate"):
+        calculation = await run_in_threadpool(SCENARIOS[scenario], data)
+    if "error" in calculation:
+        CALCULATIONS.inc(scenario, "invalid")
+        ERRORS.inc("validation")
+        return JSONResponse({"error": calculation["error"], "gemini": None})
+    CALCULATIONS.inc(scenario, "ok")
+
+    with stage("prompt"):
+        prompt = build_prompt(scenario, data, calculation)
+    response = {RESULT_KEYS[scenario]: calculation}
+
+    explanation_id = explanation_token(scenario, data)
+    base = request.url.path[: -len("/calculate")]
+    if body.get("explain") == "inline":
+        # Legacy single-phase mode: wait for the explanation, but never past the deadline
+        deadline = min(safe_float(body.get("deadline"), config.EXPLAIN_DEADLINE_S), config.EXPLAIN_DEADLINE_S)
+        try:
+            with stage("llm"):
+                text, source = await explain_within(
+                    scenario, data, calculation, prompt, client_id(request), deadline
+                )
+        except Overloaded as e:
+            return overloaded_response(e)
+        response["gemini"] = text
+        response["explanation_source"] = source
+        if source == "local":
+            # The Gemini answer is still coming; it can be fetched from here once cached
+            response["explanation_id"] = explanation_id
+            response["explanation_url"] = f"{base}/explain/{explanation_id}"
+        with stage("serialize"):
+            return JSONResponse(response)
+
+    # Two-phase mode: numbers now, explanation streamed from /explain/{id}
+    with stage("cache"):
+        response["gemini"] = await cached_explanation(scenario, data, calculation)
+    response["explanation_id"] = explanation_id
+    response["explanation_url"] = f"{base}/explain/{explanation_id}"
+    with stage("serialize"):
+        return JSONResponse(response)
+
+
+def _npz_column(values):
+    # np.load refuses object arrays without allow_pickle, so every column gets a plain dtype
+    if values.dtype != object:
+        return values
+    if all(v is None or isinstance(v, (bool, np.bool_)) for v in values):
+        # Flags such as meets_gos: 1 / 0, and -1 where the row has none
+        return np.array([-1 if v is None else int(v) for v in values], dtype=np.int8)
+    return np.array(["" if v is None else str(v) for v in values], dtype=str)
+
+
+def _npz_bytes(result):
+    buffer = io.BytesIO()
+    arrays = {name: _npz_column(values) for name, values in result.columns.items()}
+    arrays["error"] = np.array(["" if e is None else e for e in result.errors], dtype=str)
+    np.savez(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def _batch_rows(scenario, columns, result):
+    # Per-row inputs, only rebuilt when the caller asks for explanation ids
+    list_columns = {k: v for k, v in columns.items() if isinstance(v, list)}
+    scalars = {k: v for k, v in columns.items() if not isinstance(v, list)}
+    for record in result.records():
+        if "error" not in record:
+            data = dict(scalars)
+            data.update({k: v[record["row"]] for k, v in list_columns.items()})
+            record["explanation_id"] = explanation_token(scenario, data)
+        yield record
+
+
+@router.post("/calculate/batch")
+async def calculate_batch_route(request: Request):
+    with stage("parse"):
+        body = await request.json()
+    scenario = body.get("scenario")
+    columns = body.get("data")
+    output = body.get("format", "ndjson")
+    if output not in ("ndjson", "columns", "npz"):
+        return JSONResponse({"error": "format must be ndjson, columns or npz"}, status_code=400)
 
-        interleaver_rate = safe_float(data.get("interleaverRate"), 1)
-        if interleaver_rate < 1:
-            return {"error": "Interleaver rate must be ≥ 1."}
+    try:
+        with stage("calculate"):
+            result = await run_in_threadpool(calculate_batch, scenario, columns, config.BATCH_MAX_ROWS)
+    except BatchError as e:
+        ERRORS.inc("batch")
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    headers = {"X-Batch-Rows": str(result.rows), "X-Batch-Errors": str(int((~result.ok).sum()))}
+    if output == "npz":
+        with stage("serialize"):
+            payload = await run_in_threadpool(_npz_bytes, result)
+        return Response(payload, media_type="application/x-npz", headers=headers)
+    if output == "columns":
+        with stage("serialize"):
+            doc = await run_in_threadpool(result.to_columns)
+        return JSONResponse(doc, headers=headers)
+
+    # The LLM is skipped by default; explain=true only attaches ids for /explain/{id}
+    explain_rows = bool(body.get("explain"))
+
+    def lines():
+        records = _batch_rows(scenario, columns, result) if explain_rows else result.records()
+        chunk = []
+        for record in records:
+            chunk.append(json.dumps(record))
+            if len(chunk) >= config.BATCH_CHUNK_ROWS:
+                yield "\n".join(chunk) + "\n"
+                chunk = []
+        if chunk:
+            yield "\n".join(chunk) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers=headers)
+
+
+def _sweep_chunk_line(chunk):
+    line = {"type": "rows", "start": chunk["start"], "stop": chunk["stop"]}
+    line.update({name: values.tolist() for name, values in chunk["inputs"].items()})
+    line.update({name: plain_column(values) for name, values in chunk["outputs"].items()})
+    if any(e is not None for e in chunk["errors"]):
+        line["error"] = chunk["errors"]
+    return json.dumps(line) + "\n"
+
+
+@router.post("/sweep")
+async def sweep_route(request: Request):
+    body = await request.json()
+    try:
+        plan = SweepPlan.parse(body)
+        await run_in_threadpool(validate_sweep, plan)
+        summary = SweepSummary(plan)
+    except SweepError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    chunk_rows = max(safe_int(body.get("chunk_rows"), config.SWEEP_CHUNK_ROWS), 1)
+
+    async def lines():
+        yield json.dumps({
+            "type": "plan",
+            "scenario": plan.scenario,
+            "total": plan.total,
+            "axes": {axis.name: plain_column(axis.values) for axis in plan.axes},
+        }) + "\n"
+        # Chunks stream out as soon as they are evaluated; the pool keeps working meanwhile
+        async for chunk in iterate_in_threadpool(run_sweep(plan, chunk_rows)):
+            summary.update(chunk)
+            yield _sweep_chunk_line(chunk)
+        doc = summary.to_dict()
+        yield json.dumps({"type": "summary", **doc}) + "\n"
+        if body.get("explain"):
+            # One LLM call for the whole sweep, never one per point
+            prompt = sweep_prompt(plan.scenario, body.get("sweep"), doc)
+            try:
+                text, _ = await explain_within(f"sweep:{plan.scenario}", body, doc, prompt, client_id(request))
+            except Overloaded as e:
+                yield json.dumps({"type": "explanation", "error": str(e)}) + "\n"
+                return
+            yield json.dumps({"type": "explanation", "text": text}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.post("/plan/cellular")
+async def plan_cellular(request: Request):
+    body = await request.json()
+    try:
+        plan = CellularPlan.parse(body)
+    except PlanError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return await run_in_threadpool(optimize, plan)
 
-        burst_length = safe_float(data.get("burstLength"))
-        if burst_length is None or burst_length <= 0:
-            return {"error": "Burst length must be > 0."}
 
-        # Step-by-step computation
-        rate_sampler = sampling_rate
-        rate_quantizer = rate_sampler * quant_bits
-        rate_source_encoder = rate_quantizer * source_enc_rate
-        rate_channel_encoder = rate_source_encoder / channel_enc_rate
-        rate_interleaver = rate_channel_encoder * interleaver_rate
-        rate_burst_formatter = rate_interleaver * burst_length
+@router.post("/simulate/ber")
+async def simulate_ber(request: Request):
+    body = await request.json()
+    try:
+        plan = SimulationPlan.parse(body)
+    except SimulationError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    doc, cached = await run_in_threadpool(simulate, plan)
+    return {**doc, "cached": cached}
 
-        return {
-            "sampler_rate_bps": rate_sampler,
-            "quantizer_rate_bps": rate_quantizer,
-            "source_encoder_rate_bps": rate_source_encoder,
-            "channel_encoder_rate_bps": rate_channel_encoder,
-            "interleaver_rate_bps": rate_interleaver,
-            "burst_formatter_rate_bps": rate_burst_formatter
-        }
 
-    except Exception as e:
-        return {"error": f"Unexpected error: {str(e)}"}
+@router.post("/simulate/chain")
+async def simulate_chain(request: Request):
+    body = await request.json()
+    data = body.get("data")
+    if not isinstance(data, dict):
+        return JSONResponse({"error": "data must be a wireless_comm input object"}, status_code=400)
+    try:
+        return await run_in_threadpool(run_chain, data, body.get("samples"), body.get("buffer_samples"))
+    except (ChainError, TypeError, ValueError) as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+
+def _coverage_response(raster, raster_id, tiles, body):
+    headers = {"X-Coverage-Id": raster_id, "X-Coverage-Tiles": str(tiles)}
+    output = body.get("format", "png")
+    if output == "npz":
+        return Response(raster.npz(), media_type="application/octet-stream", headers=headers)
+    if output != "png":
+        raise CoverageError("format must be 'png' or 'npz'")
+    try:
+        vmin, vmax = (None if body.get(k) is None else float(body[k]) for k in ("vmin", "vmax"))
+    except (TypeError, ValueError):
+        raise CoverageError("vmin and vmax must be numbers")
+    image, (low, high) = raster.png(body.get("layer", "power"), vmin, vmax)
+    headers["X-Coverage-Range"] = f"{low:g},{high:g}"
+    return Response(image, media_type="image/png", headers=headers)
 
 
+@router.post("/coverage")
+async def coverage(request: Request):
+    body = await request.json()
+    try:
+        raster = CoverageRaster(CoverageSpec.parse(body))
+        tiles = await run_in_threadpool(raster.compute)
+        raster_id = get_store().add(raster)
+        return await run_in_threadpool(_coverage_response, raster, raster_id, tiles, body)
+    except CoverageError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
 
-def calculate_cellular(data):
-    area_km2 = safe_float(data.get("area"))
-    cell_radius_km = safe_float(data.get("cell_radius"))
-    reuse_factor = safe_int(data.get("reuse_factor"), 1)
-    bandwidth_mhz = safe_float(data.get("bandwidth"))
-    channel_bandwidth_mhz = safe_float(data.get("channel_bandwidth"))
-    spectral_efficiency = safe_float(data.get("spectral_efficiency"))
-    subscribers = safe_int(data.get("subscribers"))
-    calls_per_day = safe_float(data.get("calls_per_day"))
-    call_duration_min = safe_float(data.get("call_duration"))
-    gos = safe_float(data.get("gos"))
-
-    # Calculations
-    cell_area_km2 = (3 * math.sqrt(3) / 2) * (cell_radius_km ** 2)
-    num_cells = area_km2 / cell_area_km2
-    total_bandwidth_hz = bandwidth_mhz * 1e6
-    channel_bw_hz = channel_bandwidth_mhz * 1e6
-
-    # Capacity
-    channels_per_cell = total_bandwidth_hz / (reuse_factor * channel_bw_hz) if channel_bw_hz > 0 else 0
-    total_channels = int(num_cells * channels_per_cell)
-
-    # Total offered traffic in Erlangs (simplified)
-    avg_call_sec = call_duration_min * 60
-    erlang_per_user = (calls_per_day * avg_call_sec) / 86400
-    total_traffic_erlangs = erlang_per_user * subscribers
-    traffic_per_cell = total_traffic_erlangs / num_cells if num_cells > 0 else 0
-
-    # Network capacity in bits per second
-    network_capacity_bps = total_bandwidth_hz * spectral_efficiency
-
-    return {
-        "area_km2": area_km2,
-        "cell_radius_km": cell_radius_km,
-        "cell_area_km2": cell_area_km2,
-        "num_cells": int(num_cells),
-        "reuse_factor": reuse_factor,
-        "bandwidth_mhz": bandwidth_mhz,
-        "channel_bandwidth_mhz": channel_bandwidth_mhz,
-        "channels_per_cell": int(channels_per_cell),
-        "total_channels": total_channels,
-        "spectral_efficiency_bps_per_hz": spectral_efficiency,
-        "network_capacity_bps": int(network_capacity_bps),
-        "subscribers": subscribers,
-        "calls_per_day": calls_per_day,
-        "call_duration_min": call_duration_min,
-        "gos": gos,
-        "traffic_per_cell_erlangs": round(traffic_per_cell, 2),
-        "total_traffic_erlangs": round(total_traffic_erlangs, 2),
-        "erlang_per_user": round(erlang_per_user, 4)
-    }
 
-@router.post("/calculate")
-async def calculate(request: Request):
+@router.post("/coverage/{raster_id}/move")
+async def coverage_move(raster_id: str, request: Request):
     body = await request.json()
-    scenario = body.get("scenario")
-    data = body.get("data")
-    calculation = None
-    gemini_response = None
-
-    if scenario == "link_budget":
-        calculation = calculate_link_budget(data)
-        # Compose rich Gemini prompt for link budget
-        prompt = f"""
-            You are a wireless link budget analysis expert. Based on the following user inputs and computed results, provide a detailed explanation of how each parameter and result affects the received power, transmit power, and link performance. Explain the significance of each metric and how the configuration impacts the reliability and performance of the wireless link.
-
-            User Inputs:
-            - Link Margin (dB): {calculation['link_margin_db']}
-            - Temperature (K): {calculation['temperature_K']}
-            - Noise Figure (dB): {calculation['noise_figure_db']}
-            - Bitrate (bps): {calculation['bitrate_bps']}
-            - Eb/N0 (dB): {calculation['eb_no_db']}
-            - Distance (km): {calculation['distance_km']}
-            - Frequency (MHz): {calculation['frequency_mhz']}
-            - Transmitter Gain (dBi): {calculation['tx_gain_dbi']}
-            - Receiver Gain (dBi): {calculation['rx_gain_dbi']}
-            - System Loss (dB): {calculation['system_loss_db']}
-
-            Computed Results:
-            - Received Power (dBm): {calculation['received_power_dbm']}
-            - Required Transmit Power (dBm): {calculation['transmit_power_dbm']}
-            - Free Space Path Loss (FSPL, dB): {calculation['fspl_db']}
-
-            Discuss how these values are derived and their importance in wireless link design.
-            """
-        gemini_response = ask_gemini(prompt)
-        return JSONResponse({"calculation": calculation, "gemini": gemini_response})
-
-    elif scenario == "ofdm":
-        calculation = calculate_ofdm(data)
-        if "error" in calculation:
-            return JSONResponse({"error": calculation["error"], "gemini": None})
-        # Compose updated Gemini prompt for OFDM
-        prompt = f"""
-            You are an OFDM systems expert. Based on the following user inputs and computed results, provide a detailed explanation of how each parameter and result affects the data rates, resource allocation, and spectral efficiency in the OFDM system. Explain the significance of each metric and how the configuration impacts the maximum transmission capacity and efficiency.
-
-            User Inputs:
-            - Bandwidth: {data.get('bandwidth')} kHz
-            - Subcarrier Spacing: {data.get('subcarrierSpacing')} kHz
-            - Modulation: {data.get('modulation')}
-            - Number of OFDM Symbols per RB: {data.get('numSymbols')}
-            - Duration of RB: {data.get('duration_of_RB')} ms
-            - Parallel RBs: {data.get('parallelRB')}
-
-            Computed Results:
-            - Subcarriers per RB: {calculation['subcarriers_per_rb']}
-            - Bits per Resource Element: {calculation['bits_per_re']}
-            - Bits per OFDM Symbol: {calculation['bits_per_ofdm_symbol']}
-            - Bits per Resource Block: {calculation['bits_per_rb']}
-            - Total Bits (all parallel RBs): {calculation['total_bits']}
-            - RB Duration (s): {calculation['rb_duration_sec']:.6f}
-            - Max Data Rate: {calculation['max_data_rate_bps']:.2f} bps
-            - Total Bandwidth: {calculation['total_bandwidth_hz'] / 1e3:.2f} kHz
-            - Spectral Efficiency: {calculation['spectral_efficiency_bps_per_hz']:.4f} bps/Hz
-
-            Discuss how these values are derived and their importance in OFDM system design.
-            """
-        gemini_response = ask_gemini(prompt)
-        return JSONResponse({"result": calculation, "gemini": gemini_response})
-
-    elif scenario == "wireless_comm":
-        calculation = calculate_wireless_comm(data)
-
-        if "error" in calculation:
-            return JSONResponse({"error": calculation["error"], "gemini": None})
-
-        # Compose rich Gemini prompt
-        prompt = f"""
-            You are a communication systems expert. A wireless communication system has passed through several blocks. Based on the following inputs and their corresponding computed data rates, provide a detailed explanation of how the data rate changes at each block and why.
-
-            User Inputs:
-            - Bandwidth: {data.get("bandwidth")} kHz
-            - Sampling Rate: {data.get("samplingRate") or 'Auto (2×Bandwidth)'} Hz
-            - Quantization Bits: {data.get("quantBits")}
-            - Source Encoder Rate: {data.get("sourceEncoderRate")}
-            - Channel Encoder Rate: {data.get("channelEncoderRate")}
-            - Interleaver Rate: {data.get("interleaverRate")}
-            - Burst Length: {data.get("burstLength")}
-
-            Computed Output Rates:
-            - Sampler Rate: {calculation['sampler_rate_bps']:.2f} bps
-            - Quantizer Rate: {calculation['quantizer_rate_bps']:.2f} bps
-            - Source Encoder Rate: {calculation['source_encoder_rate_bps']:.2f} bps
-            - Channel Encoder Rate: {calculation['channel_encoder_rate_bps']:.2f} bps
-            - Interleaver Rate: {calculation['interleaver_rate_bps']:.2f} bps
-            - Burst Formatter Rate: {calculation['burst_formatter_rate_bps']:.2f} bps
-
-            Explain the role of each block and how the rate evolves through the pipeline.
-            """
-        gemini_response = ask_gemini(prompt)
-        return JSONResponse({"gemini": gemini_response})
-
-    elif scenario == "cellular":
-        calculation = calculate_cellular(data)
-        if "error" in calculation:
-            return JSONResponse({"error": calculation["error"], "gemini": None})
-
-        prompt = f"""
-        You are a cellular network design expert. Based on the following user inputs and computed results, explain the impact of each input on network capacity, frequency reuse, user support, and area coverage. Provide clear and helpful analysis.
-
-        User Inputs:
-        - Total Area: {data.get('area')} km²
-        - Cell Radius: {data.get('cell_radius')} km
-        - Frequency Reuse Factor: {data.get('reuse_factor')}
-        - Total Bandwidth: {data.get('bandwidth')} MHz
-        - Channel Bandwidth per User: {data.get('channel_bandwidth')} MHz
-        - Spectral Efficiency: {data.get('spectral_efficiency')} bps/Hz
-        - Number of Subscribers: {data.get('subscribers')}
-        - Calls per Day per Subscriber: {data.get('calls_per_day')}
-        - Average Call Duration: {data.get('call_duration')} minutes
-        - Grade of Service (GoS): {data.get('gos')}
-
-        Computed Results:
-        - Cell Area: {calculation['cell_area_km2']:.2f} km²
-        - Number of Cells: {calculation['num_cells']}
-        - Channels per Cell: {calculation['channels_per_cell']}
-        - Total Channels in Network: {calculation['total_channels']}
-        - Erlang per User: {calculation['erlang_per_user']:.4f}
-        - Total Network Traffic: {calculation['total_traffic_erlangs']:.2f} Erlangs
-        - Traffic per Cell: {calculation['traffic_per_cell_erlangs']:.2f} Erlangs
-        - Network Capacity: {calculation['network_capacity_bps'] / 1e6:.2f} Mbps
-
-        Provide a structured explanation of how these parameters define the size, capacity, and efficiency of the designed cellular network.
-        """
-
-        gemini_response = ask_gemini(prompt)
-        return JSONResponse({"calculation": calculation, "gemini": gemini_response})
+    raster = get_store().get(raster_id)
+    if raster is None:
+        # Rasters live in one worker's memory; the client re-POSTs /coverage on a miss
+        return JSONResponse({"error": "Unknown or expired coverage id"}, status_code=404)
+    try:
+        index = safe_int(body.get("index"), -1)
+        x, y = float(body["x"]), float(body["y"])
+    except (KeyError, TypeError, ValueError):
+        return JSONResponse({"error": "index, x and y are required"}, status_code=400)
+    try:
+        tiles = await run_in_threadpool(raster.move, index, x, y)
+        return await run_in_threadpool(_coverage_response, raster, raster_id, tiles, body)
+    except CoverageError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+
+def _sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
 
+
+@router.get("/explain/{explanation_id}")
+async def stream_explanation_route(
+    explanation_id: str, request: Request, format: str = Query("sse", pattern="^(sse|ndjson)$")
+):
+    try:
+        scenario, data = parse_explanation_token(explanation_id)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=404)
+    if scenario not in SCENARIOS:
+        return JSONResponse({"error": f"Unknown scenario: {scenario}"}, status_code=404)
+
+    # The id carries the design, so whichever worker gets this request can rebuild the prompt
+    with stage("calculate"):
+        calculation = await run_in_threadpool(SCENARIOS[scenario], data)
+    if "error" in calculation:
+        ERRORS.inc("validation")
+        return JSONResponse({"error": calculation["error"]}, status_code=400)
+    with stage("prompt"):
+        prompt = build_prompt(scenario, data, calculation)
+    try:
+        # Admission is decided here, so a shed request gets a real 429/503 status
+        with stage("admission"):
+            chunks = await open_explanation(scenario, data, calculation, prompt, client_id(request))
+    except Overloaded as e:
+        return overloaded_response(e)
+
+    async def events():
+        # Past the deadline the client gets a local summary first; Gemini's text replaces it if it arrives
+        try:
+            async for kind, text in with_deadline(
+                chunks, config.EXPLAIN_DEADLINE_S, lambda: local_explanation(scenario, data, calculation)
+            ):
+                if format == "sse":
+                    yield _sse(kind, {"text": text})
+                else:
+                    yield json.dumps({kind: text} if kind == "fallback" else {"text": text}) + "\n"
+        except LLMError as e:
+            message = error_text(e)
+            if format == "sse":
+                yield _sse("error", {"error": message})
+            else:
+                yield json.dumps({"error": message}) + "\n"
+            return
+        if format == "sse":
+            yield _sse("done", {})
+        else:
+            yield json.dumps({"done": True}) + "\n"
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(
+        events(),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/session")
+async def live_session(websocket: WebSocket):
+    await websocket.accept()
+    session = LiveSession(websocket.send_json, client_id(websocket))
+    try:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                message = json.loads(text)
+            except ValueError:
+                await session.handle(None)
+                continue
+            await session.handle(message)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await session.close()
+
+
+def _job_doc(job, base):
+    doc = job.to_dict(get_queue().store)
+    doc["url"] = f"{base}/jobs/{job.id}"
+    if doc.get("result_available"):
+        doc["result_url"] = f"{base}/jobs/{job.id}/result"
+    return doc
+
+
+@router.post("/jobs")
+async def submit_job(request: Request):
+    body = await request.json()
+    base = request.url.path[: -len("/jobs")]
+    try:
+        job = await run_in_threadpool(
+            get_queue().submit, body.get("kind"), body.get("payload"), safe_int(body.get("priority"), 0)
+        )
+    except QueueFull as e:
+        ERRORS.inc("jobs_full")
+        return JSONResponse(
+            {"error": str(e)}, status_code=503, headers={"Retry-After": str(config.JOB_RETRY_AFTER_S)}
+        )
+    except ValueError as e:
+        ERRORS.inc("validation")
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return JSONResponse(_job_doc(job, base), status_code=202)
+
+
+@router.get("/jobs")
+def job_stats():
+    return get_queue().stats()
+
+
+@router.get("/jobs/{job_id}")
+def job_status(job_id: str, request: Request):
+    job = get_queue().get(job_id)
+    if job is None:
+        return JSONResponse({"error": "Unknown or expired job id"}, status_code=404)
+    return _job_doc(job, request.url.path[: -len(f"/jobs/{job_id}")])
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    queue = get_queue()
+    job = queue.get(job_id)
+    if job is None:
+        return JSONResponse({"error": "Unknown or expired job id"}, status_code=404)
+    base = request.url.path[: -len(f"/jobs/{job_id}/events")]
+
+    async def lines():
+        # Progress arrives from the pool on another thread; poll the job's version counter
+        version = None
+        while True:
+            if job.version != version:
+                version = job.version
+                yield json.dumps(_job_doc(job, base)) + "\n"
+            if job.state in FINISHED:
+                return
+            await asyncio.sleep(config.JOB_PROGRESS_INTERVAL_S / 2)
+
+    return StreamingResponse(
+        lines(), media_type="application/x-ndjson", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/jobs/{job_id}/result")
+def job_result(job_id: str):
+    queue = get_queue()
+    job = queue.get(job_id)
+    if job is None:
+        return JSONResponse({"error": "Unknown or expired job id"}, status_code=404)
+    if job.state not in FINISHED:
+        return JSONResponse({"error": f"Job is {job.state}"}, status_code=409)
+    stored = queue.store.get(job_id)
+    if stored is None:
+        if job.state == DONE:
+            message = "Result was evicted; submit the job again"
+        else:
+            message = job.error or f"Job was {job.state}"
+        return JSONResponse({"error": message}, status_code=410)
+    body, media_type = stored
+    return Response(body, media_type=media_type)
+
+
+@router.delete("/jobs/{job_id}")
+def cancel_job(job_id: str, request: Request):
+    job = get_queue().cancel(job_id)
+    if job is None:
+        return JSONResponse({"error": "Unknown or expired job id"}, status_code=404)
+    return _job_doc(job, request.url.path[: -len(f"/jobs/{job_id}")])
+
+
+@router.get("/metrics")
+def metrics():
+    return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@router.get("/llm/cache")
+def llm_cache_stats():
+    return get_cache().stats()
+
+
+@router.get("/llm/admission")
+def llm_admission_stats():
+    return {"admission": get_admission().stats(), "coalescing": get_flights().stats()}
@@ -0,0 +1,257 @@
+import asyncio
+import threading
+import weakref
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+from app.core import config
+from app.core.llm_client import LLMError
+
+
+class Overloaded(LLMError):
+    """Load was shed: 429 for a client over its share, 503 when the service is saturated."""
+
+    def __init__(self, message, status_code, retry_after=None):
+        super().__init__(message, status_code)
+        self.retry_after = config.ADMISSION_RETRY_AFTER_S if retry_after is None else retry_after
+
+
+def _grant(waiter):
+    if not waiter.done():
+        waiter.set_result(True)
+
+
+class AdmissionController:
+    """Caps LLM calls in flight, with a bounded wait queue served round-robin per client.
+
+    A client may hold at most ``per_client`` queued requests (429 beyond that); when the
+    whole queue is full, or a request waits longer than ``queue_timeout``, it is shed with
+    503. Freed slots go to the next *client* in rotation, not the next request, so one
+    busy client cannot starve the rest.
+    """
+
+    def __init__(self, max_active, max_queue, per_client, queue_timeout):
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self.per_client = per_client
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._queued = 0
+        self._queues = OrderedDict()
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.rejected_client = 0
+        self.rejected_full = 0
+        self.timed_out = 0
+
+    def _enqueue(self, client, waiter):
+        with self._lock:
+            if self._active < self.max_active and not self._queued:
+                self._active += 1
+                self.admitted += 1
+                return True
+            if self._queued >= self.max_queue:
+                self.rejected_full += 1
+                raise Overloaded("LLM queue is full, try again shortly", 503)
+            queue = self._queues.get(client)
+            if queue is not None and len(queue) >= self.per_client:
+                self.rejected_client += 1
+                raise Overloaded("Too many queued LLM requests from this client", 429)
+            if queue is None:
+                queue = self._queues[client] = deque()
+            queue.append(waiter)
+            self._queued += 1
+            return False
+
+    def _withdraw(self, client, waiter):
+        # False means release() already handed this waiter a slot
+        with self._lock:
+            queue = self._queues.get(client)
+            if queue is None or waiter not in queue:
+                return False
+            queue.remove(waiter)
+            self._queued -= 1
+            if not queue:
+                del self._queues[client]
+            return True
+
+    async def acquire(self, client):
+        waiter = asyncio.get_running_loop().create_future()
+        if self._enqueue(client, waiter):
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if self._withdraw(client, waiter):
+                with self._lock:
+                    self.timed_out += 1
+                raise Overloaded("Timed out waiting for LLM capacity", 503) from None
+        except asyncio.CancelledError:
+            if not self._withdraw(client, waiter):
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            while self._queues:
+                client, queue = next(iter(self._queues.items()))
+                waiter = queue.popleft()
+                self._queued -= 1
+                if queue:
+                    self._queues.move_to_end(client)
+                else:
+                    del self._queues[client]
+                loop = waiter.get_loop()
+                if not waiter.done() and not loop.is_closed():
+                    self.admitted += 1
+                    loop.call_soon_threadsafe(_grant, waiter)
+                    return
+            self._active -= 1
+
+    @asynccontextmanager
+    async def slot(self, client):
+        await self.acquire(client)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "active": self._active,
+                "queued": self._queued,
+                "clients_waiting": len(self._queues),
+                "max_active": self.max_active,
+                "max_queue": self.max_queue,
+                "admitted": self.admitted,
+                "rejected_client": self.rejected_client,
+                "rejected_full": self.rejected_full,
+                "timed_out": self.timed_out,
+            }
+
+
+class Broadcast:
+    """One upstream stream replayed to every subscriber, late joiners included."""
+
+    def __init__(self):
+        self.chunks = []
+        self.error = None
+        self.done = False
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        event, self._changed = self._changed, asyncio.Event()
+        event.set()
+
+    async def run(self, source):
+        try:
+            async for chunk in source:
+                self.chunks.append(chunk)
+                self._notify()
+        except LLMError as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+
+    async def subscribe(self):
+        index = 0
+        while True:
+            while index < len(self.chunks):
+                yield self.chunks[index]
+                index += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._changed.wait()
+
+
+class SingleFlight:
+    """Concurrent callers with the same key share one in-flight call (per event loop).
+
+    The shared work is shielded: a caller that gives up does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._loops = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _calls(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            return self._loops.setdefault(loop, {})
+
+    def _track(self, calls, key, task, value):
+        calls[key] = value
+
+        def forget(done):
+            if calls.get(key) is value:
+                del calls[key]
+            if not done.cancelled():
+                done.exception()  # retrieved here so an abandoned failure is not logged
+
+        task.add_done_callback(forget)
+
+    async def do(self, key, work):
+        """Await ``work()`` once for every concurrent caller with ``key``.
+
+        A stream already in flight under ``key`` is joined instead, and its full text returned.
+        """
+        calls = self._calls()
+        task = calls.get(key)
+        if isinstance(task, Broadcast):
+            self.coalesced += 1
+            return "".join([chunk async for chunk in task.subscribe()])
+        if task is None:
+            self.leaders += 1
+            task = asyncio.get_running_loop().create_task(work())
+            self._track(calls, key, task, task)
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def join(self, key):
+        """Subscription to an in-flight stream for ``key``, or None."""
+        shared = self._calls().get(key)
+        if isinstance(shared, Broadcast) and not shared.done:
+            self.coalesced += 1
+            return shared.subscribe()
+        return None
+
+    def stream(self, key, source):
+        """Start broadcasting ``source`` under ``key`` and return the first subscription."""
+        calls = self._calls()
+        shared = Broadcast()
+        self.leaders += 1
+        task = asyncio.get_running_loop().create_task(shared.run(source))
+        self._track(calls, key, task, shared)
+        return shared.subscribe()
+
+    def stats(self):
+        return {"leaders": self.leaders, "coalesced": self.coalesced}
+
+
+_admission = None
+_flights = SingleFlight()
+_admission_lock = threading.Lock()
+
+
+def get_admission():
+    global _admission
+    with _admission_lock:
+        if _admission is None:
+            _admission = AdmissionController(
+                config.ADMISSION_MAX_ACTIVE,
+                config.ADMISSION_QUEUE_SIZE,
+                config.ADMISSION_PER_CLIENT,
+                config.ADMISSION_QUEUE_TIMEOUT_S,
+            )
+        return _admission
+
+
+def get_flights():
+    return _flights
@@ -1,34 +1,200 @@
-import os
-import requests
+import asyncio
+import base64
+import binascii
+import hashlib
+import json
+
+from app.core import config
+from app.core.admission import Overloaded, get_admission, get_flights
+from app.core.fallback import local_explanation
+from app.core.llm_cache import cache_key, get_cache
+from app.core.llm_client import LLMError, get_client
+from app.core.metrics import ERRORS, EXPLANATIONS
+
+# Longest explanation token accepted back from a client
+MAX_TOKEN_LENGTH = 4096
+
+
+def error_text(exc):
+    ERRORS.inc("llm")
+    if str(exc) == "Gemini API key is missing":
+        return str(exc)
+    return f"Gemini Error: {exc}"
 
-# ✅ Use Gemini 2.5 Flash with v1beta
-GEMINI_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
 
 def ask_gemini(prompt: str) -> str:
-    GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+    # Blocking call; only use from scripts or threadpool (sync) routes
+    try:
+        return get_client().generate_sync(prompt)
+    except LLMError as e:
+        return error_text(e)
+
+
+async def _admitted_generate(prompt, client):
+    async with get_admission().slot(client):
+        return await get_client().generate(prompt)
+
+
+async def ask_gemini_async(prompt: str, client=None) -> str:
+    """Identical concurrent prompts share one call. Raises ``Overloaded`` when load is shed."""
+    key = "prompt:" + hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    try:
+        return await get_flights().do(key, lambda: _admitted_generate(prompt, client))
+    except Overloaded:
+        raise
+    except LLMError as e:
+        return error_text(e)
+
+
+async def explain_within(scenario, data, calculation, prompt, client=None, deadline=None):
+    """Explanation within ``deadline`` seconds (default ``EXPLAIN_DEADLINE_S``) as ``(text, source)``.
+
+    ``source`` is ``"cache"``, ``"llm"`` or ``"local"``. When Gemini fails or misses the
+    deadline the text comes from the local templates instead; a late call keeps running
+    and caches its answer, so ``/explain/{id}`` serves it afterwards. Raises ``Overloaded``
+    when load is shed.
+    """
+    deadline = config.EXPLAIN_DEADLINE_S if deadline is None else deadline
+    cache = get_cache()
+    key = cache_key(scenario, calculation, data)
+    cached = await cache.aget(key)
+    if cached is not None:
+        EXPLANATIONS.inc("llm")
+        return cached, "cache"
+
+    async def call():
+        text = await _admitted_generate(prompt, client)
+        await cache.aset(key, text)
+        return text
+
+    # do() shields the shared call, so giving up on it here leaves it running to fill the cache
+    waiting = asyncio.ensure_future(get_flights().do(key, call))
+    try:
+        done, _ = await asyncio.wait({waiting}, timeout=max(deadline, 0))
+    except asyncio.CancelledError:
+        waiting.cancel()
+        raise
+    source = "llm"
+    if not done:
+        waiting.cancel()
+        source = "local"
+    else:
+        try:
+            text = waiting.result()
+        except Overloaded:
+            raise
+        except LLMError:
+            ERRORS.inc("llm")
+            source = "local"
+    if source == "local":
+        text = local_explanation(scenario, data, calculation)
+    EXPLANATIONS.inc(source)
+    return text, source
 
-    if not GEMINI_API_KEY:
-        return "Gemini API key is missing"
 
-    headers = {
-        "Content-Type": "application/json"
-    }
+def explanation_token(scenario, data):
+    """Self-contained explanation id: the design itself, URL-safe base64 encoded.
+
+    Any worker can rebuild the prompt from it, so no per-process state is needed
+    between ``/calculate`` and ``/explain/{id}``.
+    """
+    blob = json.dumps({"s": scenario, "d": data or {}}, sort_keys=True, separators=(",", ":"))
+    return base64.urlsafe_b64encode(blob.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def parse_explanation_token(token):
+    """Inverse of :func:`explanation_token`; raises ``ValueError`` on malformed tokens."""
+    if len(token) > MAX_TOKEN_LENGTH:
+        raise ValueError("Explanation id too long")
+    try:
+        blob = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        doc = json.loads(blob)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Malformed explanation id")
+    if not isinstance(doc, dict) or not isinstance(doc.get("d"), dict):
+        raise ValueError("Malformed explanation id")
+    return doc.get("s"), doc["d"]
+
+
+async def cached_explanation(scenario, data, calculation):
+    # Opportunistic check: a miss here is not final, the stream will look again
+    return await get_cache().aget(cache_key(scenario, calculation, data), record_miss=False)
+
+
+async def _once(text):
+    yield text
+
+
+async def open_explanation(scenario, data, calculation, prompt, client=None):
+    """Async iterator over the explanation text; decided before any output is sent.
+
+    Serves the cache, joins an identical stream already in flight, or takes an admission
+    slot and starts a new one (raising ``Overloaded`` if load is shed). The full text is
+    cached once the upstream stream completes. Iterating raises ``LLMError`` if Gemini fails.
+    """
+    cache = get_cache()
+    key = cache_key(scenario, calculation, data)
+    cached = await cache.aget(key)
+    if cached is not None:
+        return _once(cached)
+    flights = get_flights()
+    joined = flights.join(key)
+    if joined is not None:
+        return joined
+    admission = get_admission()
+    await admission.acquire(client)
+    # Someone may have started the same stream while this request waited for its slot
+    joined = flights.join(key)
+    if joined is not None:
+        admission.release()
+        return joined
+
+    async def source():
+        try:
+            parts = []
+            async for chunk in get_client().stream(prompt):
+                parts.append(chunk)
+                yield chunk
+            await cache.aset(key, "".join(parts))
+        finally:
+            admission.release()
+
+    return flights.stream(key, source())
+
+
+async def _next(chunks):
+    try:
+        return await chunks.__anext__()
+    except StopAsyncIteration:
+        return None
 
-    payload = {
-        "contents": [
-            {
-                "parts": [{"text": prompt}]
-            }
-        ]
-    }
 
-    response = requests.post(
-        f"{GEMINI_URL}?key={GEMINI_API_KEY}",
-        headers=headers,
-        json=payload
-    )
+async def with_deadline(chunks, deadline, fallback):
+    """Events for an explanation stream: ``("chunk", text)``, or ``("fallback", text)`` first
+    when nothing has arrived after ``deadline`` seconds.
 
+    ``fallback`` is called for the local text. A failure before the first chunk ends the
+    stream on the fallback instead of an error; later failures still raise ``LLMError``.
+    """
+    first = asyncio.ensure_future(_next(chunks))
     try:
-        return response.json()["candidates"][0]["content"]["parts"][0]["text"]
-    except Exception:
-        return f"Gemini Error: {response.status_code} - {response.text}"
+        done, _ = await asyncio.wait({first}, timeout=max(deadline, 0))
+        fell_back = not done
+        if fell_back:
+            yield "fallback", fallback()
+        try:
+            chunk = await first
+        except LLMError:
+            ERRORS.inc("llm")
+            if not fell_back:
+                yield "fallback", fallback()
+            EXPLANATIONS.inc("local")
+            return
+    finally:
+        if not first.done():
+            first.cancel()
+    # Counted by what the client ends up with: the fallback is replaced once Gemini answers
+    EXPLANATIONS.inc("llm" if chunk is not None else "local")
+    while chunk is not None:
+        yield "chunk", chunk
+        chunk = await _next(chunks)
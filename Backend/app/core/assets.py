@@ -0,0 +1,275 @@
+import gzip
+import hashlib
+import io
+import mimetypes
+import os
+import re
+import threading
+
+from app.core import config
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:  # images are served as they are
+    Image = None
+
+# Types worth compressing; images and archives already are
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml", "application/xml")
+
+# Formats Pillow can resize and re-encode here, by media type
+_PIL_FORMATS = {"image/jpeg": "JPEG", "image/png": "PNG", "image/webp": "WEBP"}
+
+_REFERENCE = re.compile(r"/static/([\w\-./\\]+)")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Client hints the pages ask for, so image requests carry the viewport size
+ACCEPT_CH = "Sec-CH-Viewport-Width, Sec-CH-DPR, Viewport-Width, DPR, Width"
+_IMAGE_VARY = "Accept, Sec-CH-Viewport-Width, Sec-CH-DPR, Viewport-Width, DPR, Width"
+
+
+class Representation:
+    """One encoded form of an asset: the bytes and their strong ETag."""
+
+    __slots__ = ("body", "etag", "media_type", "encoding")
+
+    def __init__(self, body, etag, media_type, encoding=None):
+        self.body = body
+        self.etag = etag
+        self.media_type = media_type
+        self.encoding = encoding
+
+
+class Asset:
+    """A file held in memory with its precompressed encodings.
+
+    ``url`` is the fingerprinted path (``images/space.3f2a1b4c5d6e.jpg``) that can be
+    cached forever; the plain path keeps working but is revalidated with the ETag.
+    """
+
+    def __init__(self, name, body, media_type):
+        self.name = name
+        self.media_type = media_type
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        stem, ext = os.path.splitext(name)
+        self.url = f"{stem}.{self.digest[:12]}{ext}"
+        self.identity = Representation(body, f'"{self.digest}"', media_type)
+        self.encodings = {}
+        if media_type.startswith(COMPRESSIBLE) and len(body) >= config.ASSET_MIN_COMPRESS_BYTES:
+            self._compress("gzip", gzip.compress(body, config.ASSET_GZIP_LEVEL, mtime=0))
+            if brotli is not None:
+                self._compress("br", brotli.compress(body, quality=config.ASSET_BROTLI_QUALITY))
+        self.resizable = (
+            Image is not None and media_type in _PIL_FORMATS and len(body) >= config.ASSET_IMAGE_MIN_BYTES
+        )
+        self.width = _image_width(body) if self.resizable else None
+        self.resizable = self.resizable and self.width is not None
+
+    def _compress(self, encoding, body):
+        if len(body) < len(self.identity.body):
+            self.encodings[encoding] = Representation(body, f'"{self.digest}-{encoding}"', self.media_type, encoding)
+
+
+def _image_width(body):
+    try:
+        with Image.open(io.BytesIO(body)) as image:
+            return image.width
+    except Exception:
+        return None
+
+
+def _q_values(header):
+    """``{token: q}`` from an Accept or Accept-Encoding header."""
+    values = {}
+    for part in (header or "").split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        values[token] = q
+    return values
+
+
+def etag_matches(header, etag):
+    """``If-None-Match`` check with the weak comparison RFC 9110 prescribes for it."""
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def _hint(headers, *names):
+    for name in names:
+        try:
+            value = float(headers.get(name) or 0)
+        except ValueError:
+            continue
+        if value > 0:
+            return value
+    return None
+
+
+class AssetStore:
+    """Every file under ``root``, fingerprinted and precompressed once at startup.
+
+    HTML pages have their ``/static/...`` references rewritten to fingerprinted URLs
+    before they are hashed, so a page changes whenever anything it links to does.
+    """
+
+    def __init__(self, root, widths=None):
+        self.root = root
+        self.widths = sorted(widths if widths is not None else config.ASSET_IMAGE_WIDTHS)
+        self.assets = {}
+        self.urls = {}
+        self._variants = {}
+        self._lock = threading.Lock()
+        pages = []
+        for directory, _, files in os.walk(root):
+            for filename in sorted(files):
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, root).replace(os.sep, "/")
+                if name.endswith(".html"):
+                    pages.append((name, path))
+                else:
+                    self._add(name, path)
+        for name, path in pages:
+            self._add(name, path, rewrite=True)
+
+    def _add(self, name, path, rewrite=False):
+        with open(path, "rb") as f:
+            body = f.read()
+        if rewrite:
+            body = _REFERENCE.sub(self._fingerprint, body.decode("utf-8")).encode("utf-8")
+        media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if media_type.startswith("text/"):
+            media_type += "; charset=utf-8"
+        asset = Asset(name, body, media_type)
+        self.assets[name] = asset
+        self.urls[asset.url] = asset
+
+    def _fingerprint(self, match):
+        asset = self.assets.get(match.group(1).replace("\\", "/"))
+        return f"/static/{asset.url}" if asset else match.group(0)
+
+    def lookup(self, path):
+        """``(asset, immutable)`` for a plain or fingerprinted path, or ``(None, False)``."""
+        if path in self.urls:
+            return self.urls[path], True
+        return self.assets.get(path), False
+
+    # ------------------------------------------------------------------ negotiation
+
+    def target_width(self, asset, headers, query_width=None):
+        """Breakpoint to downscale to, or None for the original size."""
+        width = query_width or _hint(headers, "width")
+        if width is None:
+            viewport = _hint(headers, "sec-ch-viewport-width", "viewport-width")
+            if viewport is not None:
+                width = viewport * (_hint(headers, "sec-ch-dpr", "dpr") or 1)
+        if width is None:
+            return None
+        for breakpoint in self.widths:
+            if breakpoint >= width:
+                return breakpoint if breakpoint < asset.width else None
+        return None
+
+    def select(self, asset, headers, query_width=None):
+        """The representation a request should get, by Accept-Encoding or by Accept and size hints.
+
+        Image variants come back as ``(media_type, width)`` so a 304 never has to render them.
+        """
+        if asset.resizable:
+            webp = _q_values(headers.get("accept")).get("image/webp", 0) > 0
+            width = self.target_width(asset, headers, query_width)
+            media_type = "image/webp" if webp else asset.media_type
+            if width is None and media_type == asset.media_type:
+                return asset.identity
+            return media_type, width
+        accepted = _q_values(headers.get("accept-encoding"))
+        for encoding in ("br", "gzip"):
+            if encoding in asset.encodings and accepted.get(encoding, accepted.get("*", 0)) > 0:
+                return asset.encodings[encoding]
+        return asset.identity
+
+    def respond(self, path, headers, query_width=None):
+        """``(status, body, media_type, headers)`` for a GET of ``path``, or None if there is no such asset."""
+        asset, immutable = self.lookup(path)
+        if asset is None:
+            return None
+        choice = self.select(asset, headers, query_width)
+        if isinstance(choice, Representation):
+            etag, media_type, encoding = choice.etag, choice.media_type, choice.encoding
+        else:
+            media_type, width = choice
+            etag, encoding = _variant_tag(asset, media_type, width), None
+        response_headers = {"ETag": etag, "Cache-Control": IMMUTABLE if immutable else REVALIDATE}
+        if asset.resizable:
+            response_headers["Vary"] = _IMAGE_VARY
+        elif asset.encodings:
+            response_headers["Vary"] = "Accept-Encoding"
+        if asset.media_type.startswith("text/html"):
+            response_headers["Accept-CH"] = ACCEPT_CH
+        if etag_matches(headers.get("if-none-match"), etag):
+            return 304, b"", media_type, response_headers
+        if encoding:
+            response_headers["Content-Encoding"] = encoding
+        body = choice.body if isinstance(choice, Representation) else self._variant(asset, *choice).body
+        return 200, body, media_type, response_headers
+
+    def _variant(self, asset, media_type, width):
+        key = (asset.name, media_type, width)
+        variant = self._variants.get(key)
+        if variant is None:
+            # One resize at a time; a concurrent request for the same key waits for this one
+            with self._lock:
+                variant = self._variants.get(key)
+                if variant is None:
+                    variant = self._variants[key] = self._render(asset, media_type, width)
+        return variant
+
+    def _render(self, asset, media_type, width):
+        with Image.open(io.BytesIO(asset.identity.body)) as image:
+            if width is not None:
+                height = max(1, round(image.height * width / image.width))
+                # JPEG decodes straight to a smaller scale; the resize then only finishes the job
+                image.draft("RGB", (width, height))
+                image = image.resize((width, height), Image.LANCZOS)
+            if media_type != "image/png" and image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+            out = io.BytesIO()
+            image.save(out, _PIL_FORMATS[media_type], quality=config.ASSET_IMAGE_QUALITY)
+        return Representation(out.getvalue(), _variant_tag(asset, media_type, width), media_type)
+
+
+def _variant_tag(asset, media_type, width):
+    return f'"{asset.digest}-{width or "full"}-{media_type.rpartition("/")[2]}"'
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_assets(root):
+    """The process-wide store; ``root`` is only read the first time."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = AssetStore(root)
+        return _store
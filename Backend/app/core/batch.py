@@ -0,0 +1,477 @@
+import math
+
+import numpy as np
+
+from app.core.erlang import channels_for_array, erlang_b_array, traffic_for_array
+from app.core.propagation import DEFAULT_MODEL, PARAMETERS, PropagationError, free_space_db, parse_model
+
+# Boltzmann constant (J/K), same value as the scalar link budget
+BOLTZMANN = 1.38e-23
+
+# Bits per symbol for the modulation names the OFDM form accepts
+MODULATION_BITS_PER_SYMBOL = {
+    "BPSK": 1,
+    "QPSK": 2,
+    "8": 3,
+    "16": 4,
+    "32": 5,
+    "64": 6,
+    "128": 7,
+    "256": 8,
+    "1024": 10,
+    "4096": 12,
+}
+
+
+class BatchError(ValueError):
+    """The request as a whole is unusable (as opposed to a bad row)."""
+
+
+class BatchResult:
+    """Columnar output of a vectorized scenario run.
+
+    ``columns`` maps output names to arrays of length ``rows``; ``errors`` holds a
+    message for every rejected row and ``None`` elsewhere. Rejected rows carry NaN.
+    """
+
+    def __init__(self, columns, errors):
+        self.columns = columns
+        self.errors = errors
+        self.rows = len(errors)
+
+    @property
+    def ok(self):
+        return np.array([e is None for e in self.errors], dtype=bool)
+
+    def records(self, start=0, stop=None):
+        """Yield one dict per row in ``[start, stop)``; rejected rows become ``{"error": ...}``."""
+        stop = self.rows if stop is None else min(stop, self.rows)
+        names = list(self.columns)
+        values = [plain_column(self.columns[name][start:stop]) for name in names]
+        for offset, row in enumerate(zip(*values)):
+            index = start + offset
+            error = self.errors[index]
+            if error is not None:
+                yield {"row": index, "error": error}
+            else:
+                record = {"row": index}
+                record.update(zip(names, row))
+                yield record
+
+    def to_columns(self):
+        doc = {name: plain_column(values) for name, values in self.columns.items()}
+        doc["error"] = list(self.errors)
+        return doc
+
+
+def plain_column(values):
+    # NaN is not valid JSON; rejected rows serialise as null
+    if values.dtype.kind == "f":
+        return [None if v != v else v for v in values.tolist()]
+    return values.tolist()
+
+
+# --------------------------------------------------------------------------- input parsing
+
+
+def safe_float(value, default=0.0):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def safe_int(value, default=0):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def row_count(columns):
+    """Number of rows implied by the list-valued columns; scalars broadcast."""
+    lengths = {len(v) for v in columns.values() if isinstance(v, (list, tuple, np.ndarray))}
+    if len(lengths) > 1:
+        raise BatchError(f"All input columns must have the same length, got {sorted(lengths)}")
+    return lengths.pop() if lengths else 1
+
+
+def _to_float(value):
+    if value is None or value == "":
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _missing(value, n):
+    return np.fromiter((v is None or v == "" for v in value), dtype=bool, count=n)
+
+
+def float_column(columns, name, default, n):
+    """Float column; missing entries take ``default`` (NaN if None), unparseable ones are NaN."""
+    value = columns.get(name)
+    if value is None:
+        return np.full(n, np.nan if default is None else default, dtype=float)
+    if not isinstance(value, (list, tuple, np.ndarray)):
+        value = [value] * n
+    try:
+        out = np.array(value, dtype=float)
+    except (TypeError, ValueError):
+        out = np.fromiter((_to_float(v) for v in value), dtype=float, count=n)
+    if default is not None and not isinstance(value, np.ndarray) and np.isnan(out).any():
+        out[_missing(value, n)] = default
+    return out
+
+
+def str_column(columns, name, default, n):
+    value = columns.get(name, default)
+    if not isinstance(value, (list, tuple, np.ndarray)):
+        value = [value] * n
+    return np.array([default if v is None else str(v) for v in value], dtype=object)
+
+
+class _Rows:
+    """Collects the first validation error of every row."""
+
+    def __init__(self, n):
+        self.errors = [None] * n
+        self.bad = np.zeros(n, dtype=bool)
+
+    def reject(self, mask, message):
+        fresh = mask & ~self.bad
+        for index in np.flatnonzero(fresh):
+            self.errors[index] = message
+        self.bad |= fresh
+
+    def result(self, columns):
+        if self.bad.any():
+            for name, values in columns.items():
+                if values.dtype.kind == "f":
+                    values[self.bad] = np.nan
+        return BatchResult(columns, self.errors)
+
+
+def _invalid(*arrays):
+    mask = np.zeros(len(arrays[0]), dtype=bool)
+    for values in arrays:
+        mask |= ~np.isfinite(values)
+    return mask
+
+
+# ------------------------------------------------------------------------------ shared math
+
+
+def model_groups(columns, rows, where, default=DEFAULT_MODEL):
+    """Rows in ``where`` grouped by propagation model, as ``(model, row mask)`` pairs.
+
+    Rows sharing a model and its parameters (usually all of them) are evaluated
+    together; rows with an unusable model are rejected.
+    """
+    n = len(where)
+    keys = ("propagation_model",) + PARAMETERS
+    values = [
+        str_column(columns, key, default, n) if key == "propagation_model" else columns.get(key)
+        for key in keys
+    ]
+    per_row = [isinstance(v, (list, tuple, np.ndarray)) for v in values]
+    models = {}
+    groups = {}
+    for index in np.flatnonzero(where):
+        raw = tuple(v[index] if row else v for v, row in zip(values, per_row))
+        if raw not in models:
+            try:
+                models[raw] = parse_model(dict(zip(keys, raw)), default)
+            except PropagationError as e:
+                models[raw] = str(e)
+        groups.setdefault(models[raw], []).append(index)
+    out = []
+    for model, indices in groups.items():
+        mask = np.zeros(n, dtype=bool)
+        mask[indices] = True
+        if isinstance(model, str):
+            rows.reject(mask, model)
+        else:
+            out.append((model, mask))
+    return out
+
+
+def path_loss_column(columns, rows, distance_km, frequency_mhz):
+    """Path loss and model name per row; rows outside their model's frequency range are rejected."""
+    n = len(distance_km)
+    loss = np.full(n, np.nan)
+    names = np.full(n, None, dtype=object)
+    for model, mask in model_groups(columns, rows, np.ones(n, dtype=bool)):
+        rows.reject(mask & model.invalid_frequency(frequency_mhz), model.frequency_message())
+        with np.errstate(divide="ignore", invalid="ignore"):
+            loss[mask] = model.loss_db(distance_km[mask], frequency_mhz[mask])
+        names[mask] = model.name
+    return loss, names
+
+
+# ------------------------------------------------------------------------------ scenarios
+
+
+def link_budget_batch(columns):
+    n = row_count(columns)
+    rows = _Rows(n)
+    link_margin_db = float_column(columns, "link_margin_db", 0, n)
+    temperature = float_column(columns, "temperature_k", 290, n)
+    noise_figure_db = float_column(columns, "noise_figure_db", 0, n)
+    bitrate = float_column(columns, "bitrate", 1e6, n)
+    eb_no_db = float_column(columns, "eb_n0_db", 0, n)
+    distance_km = float_column(columns, "distance", 1, n)
+    frequency_mhz = float_column(columns, "frequency", 2400, n)
+    tx_gain = float_column(columns, "tx_gain", 0, n)
+    rx_gain = float_column(columns, "rx_gain", 0, n)
+    system_loss = float_column(columns, "system_loss_db", 0, n)
+
+    rows.reject(
+        _invalid(link_margin_db, temperature, noise_figure_db, bitrate, eb_no_db,
+                 distance_km, frequency_mhz, tx_gain, rx_gain, system_loss),
+        "All inputs must be numbers.",
+    )
+    rows.reject(temperature <= 0, "Temperature must be greater than 0.")
+    rows.reject(bitrate <= 0, "Bitrate must be greater than 0.")
+    rows.reject(distance_km <= 0, "Distance must be greater than 0.")
+    rows.reject(frequency_mhz <= 0, "Frequency must be greater than 0.")
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pr_watts = (
+            10 ** (link_margin_db / 10) * BOLTZMANN * temperature
+            * 10 ** (noise_figure_db / 10) * bitrate * 10 ** (eb_no_db / 10)
+        )
+        pr_dbm = 10 * np.log10(pr_watts) + 30
+        fspl = free_space_db(distance_km, frequency_mhz)
+    path_loss = fspl
+    extra = {}
+    if columns.get("propagation_model") is not None:
+        path_loss, names = path_loss_column(columns, rows, distance_km, frequency_mhz)
+        extra = {"propagation_model": names, "path_loss_db": np.round(path_loss, 2)}
+    pt_dbm = pr_dbm + path_loss + system_loss - tx_gain - rx_gain
+
+    return rows.result({
+        "received_power_dbm": np.round(pr_dbm, 2),
+        "transmit_power_dbm": np.round(pt_dbm, 2),
+        "fspl_db": np.round(fspl, 2),
+        "link_margin_db": np.round(link_margin_db, 2),
+        "noise_figure_db": np.round(noise_figure_db, 2),
+        "bitrate_bps": np.round(bitrate),
+        "eb_no_db": np.round(eb_no_db, 2),
+        "temperature_K": np.round(temperature),
+        "distance_km": np.round(distance_km, 2),
+        "frequency_mhz": np.round(frequency_mhz, 2),
+        "tx_gain_dbi": np.round(tx_gain, 2),
+        "rx_gain_dbi": np.round(rx_gain, 2),
+        "system_loss_db": np.round(system_loss, 2),
+        **extra,
+    })
+
+
+def ofdm_batch(columns):
+    n = row_count(columns)
+    rows = _Rows(n)
+    bandwidth_khz = float_column(columns, "bandwidth", 0, n)
+    subcarrier_spacing_khz = float_column(columns, "subcarrierSpacing", 0, n)
+    modulation = str_column(columns, "modulation", "QAM", n)
+    num_symbols_per_rb = np.trunc(float_column(columns, "numSymbols", 0, n))
+    rb_duration_us = float_column(columns, "duration_of_RB", 0, n)
+    parallel_rbs = np.trunc(float_column(columns, "parallelRB", 0, n))
+
+    rows.reject(
+        _invalid(bandwidth_khz, subcarrier_spacing_khz, num_symbols_per_rb, rb_duration_us, parallel_rbs),
+        "All numeric inputs must be numbers.",
+    )
+
+    # Unknown modulations fall back to QPSK, as in the single-design calculator
+    bits_per_re = np.fromiter(
+        (MODULATION_BITS_PER_SYMBOL.get(m, 2) for m in modulation), dtype=float, count=n
+    )
+
+    rb_bandwidth_hz = bandwidth_khz * 1e3
+    subcarrier_spacing_hz = subcarrier_spacing_khz * 1e3
+    with np.errstate(divide="ignore", invalid="ignore"):
+        subcarriers_per_rb = np.where(
+            subcarrier_spacing_hz > 0, np.floor(rb_bandwidth_hz / subcarrier_spacing_hz), 0
+        )
+        bits_per_ofdm_symbol = subcarriers_per_rb * bits_per_re
+        bits_per_rb = bits_per_ofdm_symbol * num_symbols_per_rb
+        total_bits = bits_per_rb * parallel_rbs
+        rb_duration_sec = np.where(rb_duration_us > 0, rb_duration_us * 1e-3, 1)
+        max_data_rate_bps = total_bits / rb_duration_sec
+        total_bandwidth = rb_bandwidth_hz * parallel_rbs
+        spectral_efficiency = np.where(
+            total_bandwidth > 0, total_bits / (total_bandwidth * rb_duration_sec), 0
+        )
+
+    return rows.result({
+        "bandwidth_khz": bandwidth_khz,
+        "subcarrier_spacing_khz": subcarrier_spacing_khz,
+        "modulation_bits_per_symbol": bits_per_re,
+        "num_symbols_per_rb": num_symbols_per_rb,
+        "rb_duration_us": rb_duration_us,
+        "parallel_rbs": parallel_rbs,
+        "subcarriers_per_rb": subcarriers_per_rb,
+        "bits_per_re": bits_per_re,
+        "bits_per_ofdm_symbol": bits_per_ofdm_symbol,
+        "bits_per_rb": bits_per_rb,
+        "total_bits": total_bits,
+        "rb_duration_sec": rb_duration_sec,
+        "max_data_rate_bps": max_data_rate_bps,
+        "total_bandwidth_hz": total_bandwidth,
+        "spectral_efficiency_bps_per_hz": spectral_efficiency,
+    })
+
+
+def wireless_comm_batch(columns):
+    n = row_count(columns)
+    rows = _Rows(n)
+    bandwidth_khz = float_column(columns, "bandwidth", 0.0, n)
+    bandwidth_hz = bandwidth_khz * 1e3
+    sampling_rate = float_column(columns, "samplingRate", None, n)
+    sampling_rate = np.where(np.isnan(sampling_rate), 2 * bandwidth_hz, sampling_rate)
+    quant_bits = np.trunc(float_column(columns, "quantBits", 0, n))
+    source_enc_rate = float_column(columns, "sourceEncoderRate", 0.0, n)
+    channel_enc_rate = float_column(columns, "channelEncoderRate", 0.0, n)
+    interleaver_rate = float_column(columns, "interleaverRate", None, n)
+    interleaver_rate = np.where(np.isnan(interleaver_rate), 1, interleaver_rate)
+    burst_length = float_column(columns, "burstLength", 0.0, n)
+
+    # Same checks, same order and same messages as calculate_wireless_comm
+    rows.reject(~(bandwidth_khz > 0), "Bandwidth must be greater than 0.")
+    rows.reject(~(sampling_rate > 0), "Sampling rate must be greater than 0.")
+    rows.reject(~((quant_bits >= 1) & (quant_bits <= 32)), "Quantization bits must be between 1 and 32.")
+    rows.reject(~((source_enc_rate > 0) & (source_enc_rate <= 1)), "Source encoder rate must be between 0 and 1.")
+    rows.reject(~((channel_enc_rate > 0) & (channel_enc_rate <= 1)), "Channel encoder rate must be between 0 and 1.")
+    rows.reject(~(interleaver_rate >= 1), "Interleaver rate must be ≥ 1.")
+    rows.reject(~(burst_length > 0), "Burst length must be > 0.")
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate_quantizer = sampling_rate * quant_bits
+        rate_source_encoder = rate_quantizer * source_enc_rate
+        rate_channel_encoder = rate_source_encoder / channel_enc_rate
+        rate_interleaver = rate_channel_encoder * interleaver_rate
+        rate_burst_formatter = rate_interleaver * burst_length
+
+    return rows.result({
+        "sampler_rate_bps": sampling_rate,
+        "quantizer_rate_bps": rate_quantizer,
+        "source_encoder_rate_bps": rate_source_encoder,
+        "channel_encoder_rate_bps": rate_channel_encoder,
+        "interleaver_rate_bps": rate_interleaver,
+        "burst_formatter_rate_bps": rate_burst_formatter,
+    })
+
+
+def cellular_batch(columns):
+    n = row_count(columns)
+    rows = _Rows(n)
+    area_km2 = float_column(columns, "area", 0.0, n)
+    cell_radius_km = float_column(columns, "cell_radius", 0.0, n)
+    reuse_factor = np.trunc(float_column(columns, "reuse_factor", 1, n))
+    bandwidth_mhz = float_column(columns, "bandwidth", 0.0, n)
+    channel_bandwidth_mhz = float_column(columns, "channel_bandwidth", 0.0, n)
+    spectral_efficiency = float_column(columns, "spectral_efficiency", 0.0, n)
+    subscribers = np.trunc(float_column(columns, "subscribers", 0, n))
+    calls_per_day = float_column(columns, "calls_per_day", 0.0, n)
+    call_duration_min = float_column(columns, "call_duration", 0.0, n)
+    gos = float_column(columns, "gos", 0.0, n)
+
+    # Rows with a maximum path loss take their radius from the propagation model
+    extra = {}
+    if columns.get("max_path_loss_db") is not None:
+        max_loss = float_column(columns, "max_path_loss_db", None, n)
+        frequency_mhz = float_column(columns, "frequency", 0.0, n)
+        given = columns["max_path_loss_db"]
+        if not isinstance(given, (list, tuple, np.ndarray)):
+            given = [given] * n
+        rows.reject(np.isnan(max_loss) & ~_missing(given, n), "Maximum path loss must be a number.")
+        derived = ~np.isnan(max_loss)
+        names = np.full(n, None, dtype=object)
+        for model, mask in model_groups(columns, rows, derived):
+            rows.reject(mask & model.invalid_frequency(frequency_mhz), model.frequency_message())
+            with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+                cell_radius_km[mask] = model.range_km(max_loss[mask], frequency_mhz[mask])
+            names[mask] = model.name
+        extra = {"max_path_loss_db": max_loss, "propagation_model": names, "frequency_mhz": frequency_mhz}
+
+    rows.reject(
+        _invalid(area_km2, cell_radius_km, reuse_factor, bandwidth_mhz, channel_bandwidth_mhz,
+                 spectral_efficiency, subscribers, calls_per_day, call_duration_min, gos),
+        "All inputs must be numbers.",
+    )
+    rows.reject(cell_radius_km <= 0, "Cell radius must be greater than 0.")
+    rows.reject(reuse_factor <= 0, "Reuse factor must be at least 1.")
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cell_area_km2 = (3 * math.sqrt(3) / 2) * cell_radius_km ** 2
+        num_cells = area_km2 / cell_area_km2
+        total_bandwidth_hz = bandwidth_mhz * 1e6
+        channel_bw_hz = channel_bandwidth_mhz * 1e6
+
+        channels_per_cell = np.where(
+            channel_bw_hz > 0, total_bandwidth_hz / (reuse_factor * channel_bw_hz), 0
+        )
+        total_channels = np.trunc(num_cells * channels_per_cell)
+
+        avg_call_sec = call_duration_min * 60
+        erlang_per_user = (calls_per_day * avg_call_sec) / 86400
+        total_traffic_erlangs = erlang_per_user * subscribers
+        traffic_per_cell = np.where(num_cells > 0, total_traffic_erlangs / num_cells, 0)
+
+    network_capacity_bps = total_bandwidth_hz * spectral_efficiency
+
+    # Erlang-B per row; rejected rows are masked to NaN so they cost nothing
+    ok = ~rows.bad
+    blocking = erlang_b_array(np.where(ok, traffic_per_cell, np.nan),
+                              np.maximum(np.trunc(channels_per_cell), 0))
+    gos_ok = ok & (gos > 0) & (gos < 1)
+    channels_required = channels_for_array(np.where(gos_ok, traffic_per_cell, np.nan), gos)
+    max_traffic_per_cell = np.round(traffic_for_array(np.where(gos_ok, np.trunc(channels_per_cell), np.nan), gos), 2)
+    meets_gos = np.where(gos_ok, blocking <= gos, None).astype(object)
+
+    return rows.result({
+        "area_km2": area_km2,
+        "cell_radius_km": cell_radius_km,
+        "cell_area_km2": cell_area_km2,
+        "num_cells": np.trunc(num_cells),
+        "reuse_factor": reuse_factor,
+        "bandwidth_mhz": bandwidth_mhz,
+        "channel_bandwidth_mhz": channel_bandwidth_mhz,
+        "channels_per_cell": np.trunc(channels_per_cell),
+        "total_channels": total_channels,
+        "spectral_efficiency_bps_per_hz": spectral_efficiency,
+        "network_capacity_bps": np.trunc(network_capacity_bps),
+        "subscribers": subscribers,
+        "calls_per_day": calls_per_day,
+        "call_duration_min": call_duration_min,
+        "gos": gos,
+        "traffic_per_cell_erlangs": np.round(traffic_per_cell, 2),
+        "total_traffic_erlangs": np.round(total_traffic_erlangs, 2),
+        "erlang_per_user": np.round(erlang_per_user, 4),
+        "channels_required_per_cell": channels_required,
+        "blocking_probability": blocking,
+        "max_traffic_per_cell_erlangs": max_traffic_per_cell,
+        "meets_gos": meets_gos,
+        **extra,
+    })
+
+
+BATCH_SCENARIOS = {
+    "link_budget": link_budget_batch,
+    "ofdm": ofdm_batch,
+    "wireless_comm": wireless_comm_batch,
+    "cellular": cellular_batch,
+}
+
+
+def calculate_batch(scenario, columns, max_rows=None):
+    """Run every row of ``columns`` (name -> list of values) through ``scenario`` in one pass."""
+    if scenario not in BATCH_SCENARIOS:
+        raise BatchError(f"Unknown scenario: {scenario}")
+    if not isinstance(columns, dict):
+        raise BatchError("data must be an object of input columns")
+    if max_rows is not None and row_count(columns) > max_rows:
+        raise BatchError(f"At most {max_rows} rows per batch")
+    return BATCH_SCENARIOS[scenario](columns)
@@ -0,0 +1,314 @@
+import json
+import math
+import threading
+
+import numpy as np
+
+from app.core import config
+from app.core.batch import MODULATION_BITS_PER_SYMBOL
+from app.core.llm_cache import LRUCache
+from app.core.sweep import get_pool, pool_size
+
+CHANNELS = ("awgn", "rayleigh")
+
+# Two-sided 95% normal quantile, for the error-count confidence target
+Z95 = 1.96
+
+
+class SimulationError(ValueError):
+    pass
+
+
+def _gray(index):
+    return index ^ (index >> 1)
+
+
+class Constellation:
+    """Gray-mapped BPSK or (square or rectangular) QAM with unit average symbol energy.
+
+    An odd number of bits above one uses a rectangular grid, one more bit on I than on Q.
+    """
+
+    def __init__(self, bits):
+        self.bits = bits
+        self.i_bits = 1 if bits == 1 else math.ceil(bits / 2)
+        self.q_bits = 0 if bits == 1 else bits // 2
+        energy = sum((4 ** k - 1) / 3 for k in (self.i_bits, self.q_bits) if k)
+        self.scale = 1 / math.sqrt(energy)
+        self._axes = [self._axis(k) for k in (self.i_bits, self.q_bits)]
+
+    @staticmethod
+    def _axis(k):
+        levels = 2 ** k
+        index = np.arange(levels)
+        code = _gray(index)
+        amplitude = np.empty(levels)
+        amplitude[code] = 2 * index - (levels - 1)  # bit pattern -> PAM level
+        return levels, amplitude, code
+
+    @staticmethod
+    def _pack(bits):
+        weights = 1 << np.arange(bits.shape[-1] - 1, -1, -1)
+        return bits.astype(np.int64) @ weights
+
+    @staticmethod
+    def _unpack(values, k):
+        shifts = np.arange(k - 1, -1, -1)
+        return ((values[..., None] >> shifts) & 1).astype(np.uint8)
+
+    def modulate(self, bits):
+        """``(..., bits)`` array of 0/1 -> complex symbols of shape ``(...)``."""
+        _, i_amplitude, _ = self._axes[0]
+        symbols = i_amplitude[self._pack(bits[..., :self.i_bits])].astype(complex)
+        if self.q_bits:
+            _, q_amplitude, _ = self._axes[1]
+            symbols += 1j * q_amplitude[self._pack(bits[..., self.i_bits:])]
+        return symbols * self.scale
+
+    def demodulate(self, symbols):
+        """Hard nearest-point decision back to ``(..., bits)``."""
+        symbols = symbols / self.scale
+        parts = []
+        for (levels, _, code), k, values in zip(self._axes, (self.i_bits, self.q_bits), (symbols.real, symbols.imag)):
+            if not k:
+                continue
+            index = np.clip(np.rint((values + levels - 1) / 2), 0, levels - 1).astype(np.int64)
+            parts.append(self._unpack(code[index], k))
+        return np.concatenate(parts, axis=-1)
+
+
+def _q(x):
+    return 0.5 * math.erfc(x / math.sqrt(2))
+
+
+def theory_ber(bits, eb_n0_db, channel="awgn"):
+    """Closed-form BER where one exists: BPSK/QPSK on both channels, square QAM on AWGN (approximate)."""
+    ebn0 = 10 ** (eb_n0_db / 10)
+    if bits <= 2:
+        if channel == "rayleigh":
+            return 0.5 * (1 - math.sqrt(ebn0 / (1 + ebn0)))
+        return _q(math.sqrt(2 * ebn0))
+    if channel == "awgn" and bits % 2 == 0:
+        m = 2 ** bits
+        return min(0.5, (4 / bits) * (1 - 1 / math.sqrt(m)) * _q(math.sqrt(3 * bits * ebn0 / (m - 1))))
+    return None
+
+
+def simulate_point(bits, eb_n0_db, channel, subcarriers, taps, target_errors, max_bits, seed):
+    """Monte Carlo BER/BLER of uncoded OFDM at one Eb/N0, stopping at ``target_errors`` bit errors.
+
+    Each batch maps random bits onto ``subcarriers`` subcarriers, builds the OFDM symbols
+    with an IFFT and adds complex AWGN in the time domain. With ``rayleigh`` every symbol
+    also passes a ``taps``-tap Rayleigh channel; the cyclic prefix is modelled by making the
+    convolution circular, and the receiver equalizes with perfect channel knowledge. A
+    block is one OFDM symbol.
+    """
+    rng = np.random.default_rng(seed)
+    constellation = Constellation(bits)
+    n0 = 1 / (bits * 10 ** (eb_n0_db / 10))
+    batch = max(1, config.BER_BATCH_BITS // (subcarriers * bits))
+    sent = errors = blocks = block_errors = 0
+    while errors < target_errors and sent < max_bits:
+        tx = rng.integers(0, 2, size=(batch, subcarriers, bits), dtype=np.uint8)
+        signal = np.fft.ifft(constellation.modulate(tx), axis=1, norm="ortho")
+        if channel == "rayleigh":
+            h = rng.standard_normal((batch, taps)) + 1j * rng.standard_normal((batch, taps))
+            response = np.fft.fft(h / math.sqrt(2 * taps), n=subcarriers, axis=1)
+            signal = np.fft.ifft(np.fft.fft(signal, axis=1) * response, axis=1)
+        noise = rng.standard_normal(signal.shape) + 1j * rng.standard_normal(signal.shape)
+        received = np.fft.fft(signal + noise * math.sqrt(n0 / 2), axis=1, norm="ortho")
+        if channel == "rayleigh":
+            received /= response
+        wrong = constellation.demodulate(received) != tx
+        sent += wrong.size
+        errors += int(wrong.sum())
+        blocks += batch
+        block_errors += int(wrong.any(axis=(1, 2)).sum())
+
+    ber = errors / sent
+    spread = Z95 * math.sqrt(errors)
+    return {
+        "eb_n0_db": eb_n0_db,
+        "bits": sent,
+        "errors": errors,
+        "ber": ber,
+        # Poisson interval on the error count; with no errors, the rule of three
+        "ber_low": max(0.0, (errors - spread) / sent),
+        "ber_high": (errors + spread) / sent if errors else 3 / sent,
+        "blocks": blocks,
+        "block_errors": block_errors,
+        "bler": block_errors / blocks,
+        "converged": errors >= target_errors,
+        "theory_ber": theory_ber(bits, eb_n0_db, channel),
+    }
+
+
+class SimulationPlan:
+    def __init__(self, modulation, channel, points, subcarriers=64, taps=4, precision=0.2, max_bits=None, seed=0):
+        self.modulation = modulation
+        self.bits = MODULATION_BITS_PER_SYMBOL[modulation]
+        self.channel = channel
+        self.points = points
+        self.subcarriers = subcarriers
+        self.taps = taps
+        self.precision = precision
+        self.max_bits = max_bits or config.BER_MAX_BITS
+        self.seed = seed
+        # Errors needed for a 95% interval of +/- precision around the BER
+        self.target_errors = math.ceil((Z95 / precision) ** 2)
+
+    @classmethod
+    def parse(cls, body):
+        if not isinstance(body, dict):
+            raise SimulationError("Body must be a JSON object")
+        modulation = str(body.get("modulation", "QPSK"))
+        if modulation not in MODULATION_BITS_PER_SYMBOL:
+            raise SimulationError(
+                f"Unknown modulation {modulation!r}; use one of {', '.join(MODULATION_BITS_PER_SYMBOL)}"
+            )
+        channel = body.get("channel", "awgn")
+        if channel not in CHANNELS:
+            raise SimulationError("channel must be 'awgn' or 'rayleigh'")
+        points = cls._points(body.get("eb_n0_db", {"start": 0, "stop": 10, "step": 2}))
+        try:
+            subcarriers = int(body.get("subcarriers", 64))
+            taps = int(body.get("taps", 4))
+            precision = float(body.get("precision", 0.2))
+            max_bits = int(float(body.get("max_bits", config.BER_MAX_BITS)))
+            seed = int(body.get("seed", 0))
+        except (TypeError, ValueError):
+            raise SimulationError("subcarriers, taps, precision, max_bits and seed must be numbers")
+        if not 1 <= subcarriers <= 4096:
+            raise SimulationError("subcarriers must be between 1 and 4096")
+        if not 1 <= taps <= subcarriers:
+            raise SimulationError("taps must be between 1 and the number of subcarriers")
+        if not 0.01 <= precision <= 1:
+            raise SimulationError("precision must be between 0.01 and 1")
+        if not 1 <= max_bits <= config.BER_MAX_BITS:
+            raise SimulationError(f"max_bits must be between 1 and {config.BER_MAX_BITS}")
+        return cls(modulation, channel, points, subcarriers, taps, precision, max_bits, seed)
+
+    @staticmethod
+    def _points(spec):
+        if isinstance(spec, (int, float)):
+            values = [float(spec)]
+        elif isinstance(spec, list):
+            try:
+                values = [float(v) for v in spec]
+            except (TypeError, ValueError):
+                raise SimulationError("eb_n0_db values must be numbers")
+        elif isinstance(spec, dict):
+            try:
+                start, stop, step = (float(spec[k]) for k in ("start", "stop", "step"))
+            except (KeyError, TypeError, ValueError):
+                raise SimulationError("eb_n0_db range needs numeric start, stop and step")
+            if step <= 0 or stop < start:
+                raise SimulationError("eb_n0_db range needs step > 0 and stop >= start")
+            count = math.floor((stop - start) / step + 1e-9) + 1
+            if count > config.BER_MAX_POINTS:
+                raise SimulationError(f"At most {config.BER_MAX_POINTS} Eb/N0 points are allowed")
+            values = [round(start + i * step, 9) for i in range(count)]
+        else:
+            raise SimulationError("eb_n0_db must be a number, a list or {start, stop, step}")
+        if not values or len(values) > config.BER_MAX_POINTS:
+            raise SimulationError(f"Give between 1 and {config.BER_MAX_POINTS} Eb/N0 points")
+        if any(not -20 <= v <= 60 for v in values):
+            raise SimulationError("Eb/N0 points must be between -20 and 60 dB")
+        return values
+
+    def key(self):
+        return json.dumps([
+            self.bits, self.channel, self.points, self.subcarriers,
+            self.taps if self.channel == "rayleigh" else None, self.target_errors, self.max_bits, self.seed,
+        ])
+
+    def tasks(self):
+        # One independent, reproducible stream per point, so serial and pooled runs agree
+        seeds = np.random.SeedSequence(self.seed).spawn(len(self.points))
+        for point, seed in zip(self.points, seeds):
+            yield (
+                self.bits, point, self.channel, self.subcarriers, self.taps,
+                self.target_errors, self.max_bits, seed,
+            )
+
+    def header(self):
+        return {
+            "modulation": self.modulation,
+            "bits_per_symbol": self.bits,
+            "channel": self.channel,
+            "subcarriers": self.subcarriers,
+            "taps": self.taps if self.channel == "rayleigh" else None,
+            "target_errors": self.target_errors,
+            "max_bits": self.max_bits,
+            "seed": self.seed,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LRUCache(config.BER_CACHE_SIZE, config.BER_CACHE_TTL_S)
+        return _cache
+
+
+def simulate(plan, parallel=None, progress=None):
+    """BER/BLER curve for ``plan``; returns ``(doc, cached)``.
+
+    Points run on the sweep process pool when there is more than one of each;
+    ``parallel`` forces the choice. ``progress(done, total, points)`` is called after each
+    point of a serial run.
+    """
+    cache = get_cache()
+    key = plan.key()
+    doc = cache.get(key)
+    if doc is not None:
+        return doc, True
+    tasks = list(plan.tasks())
+    if parallel is None:
+        parallel = len(tasks) > 1 and pool_size() > 1
+    if parallel:
+        points = list(get_pool().map(simulate_point, *zip(*tasks)))
+    else:
+        points = []
+        for task in tasks:
+            points.append(simulate_point(*task))
+            if progress is not None:
+                progress(len(points), len(tasks), points)
+    doc = {**plan.header(), "points": points}
+    cache.set(key, doc)
+    return doc, False
+
+
+def link_error_rate(modulation, subcarriers, eb_n0_db, channel="awgn"):
+    """BER and BLER (one OFDM symbol per block) at a single Eb/N0, within the inline bit budget."""
+    plan = SimulationPlan(
+        modulation, channel, [float(eb_n0_db)], subcarriers=subcarriers, taps=min(4, subcarriers),
+        max_bits=config.BER_INLINE_MAX_BITS,
+    )
+    doc, _ = simulate(plan, parallel=False)
+    return doc["points"][0]
+
+
+def ofdm_error_outputs(modulation, subcarriers, eb_n0_db, channel, max_data_rate_bps):
+    """Extra OFDM results at an operating Eb/N0, or None when no Eb/N0 was given.
+
+    The effective rate is the peak rate times the fraction of OFDM symbols received
+    without a bit error (uncoded, one block per symbol across the RB's subcarriers).
+    """
+    if eb_n0_db is None or not math.isfinite(eb_n0_db):
+        return None
+    modulation = modulation if modulation in MODULATION_BITS_PER_SYMBOL else "QPSK"
+    channel = channel if channel in CHANNELS else "awgn"
+    outputs = {"eb_n0_db": eb_n0_db, "channel": channel, "ber": None, "bler": None, "effective_data_rate_bps": 0.0}
+    if subcarriers > 0:
+        # Very wide blocks are simulated at the FFT size cap
+        point = link_error_rate(modulation, min(subcarriers, 4096), eb_n0_db, channel)
+        outputs["ber"] = point["ber"]
+        outputs["bler"] = point["bler"]
+        outputs["effective_data_rate_bps"] = max_data_rate_bps * (1 - point["bler"])
+    return outputs
@@ -0,0 +1,397 @@
+import math
+import time
+from fractions import Fraction
+
+import numpy as np
+
+from app.core import config
+from app.core.graph import GRAPHS, GraphState
+
+# Industry-standard K=7 convolutional code (octal generators 133 and 171)
+CONSTRAINT_LENGTH = 7
+GENERATORS = (0o133, 0o171)
+# Barker-13 sync word at the head of every burst
+BARKER_13 = np.array([1, 1, 1, 1, 1, 0, 0, 1, 1, 0, 1, 0, 1], dtype=np.uint8)
+
+
+class ChainError(ValueError):
+    pass
+
+
+def _fraction(value, limit):
+    return Fraction(value).limit_denominator(limit)
+
+
+class Stage:
+    """One bit-level block of the chain.
+
+    ``push`` takes a view of the upstream buffer and returns a view of this stage's own
+    preallocated output buffer, valid until the next push. Input is consumed in whole
+    groups of ``group`` bits. When no remainder is pending, the input view is transformed
+    in place of a copy; only a remainder is copied aside for the next push.
+    """
+
+    name = ""
+    implementation = ""
+
+    def __init__(self, group, factor, max_in):
+        self.group = group
+        self.factor = factor  # realized output/input bit ratio
+        self.max_out = self.output_size(max_in + group)
+        self.out = np.zeros(self.max_out, dtype=np.uint8)
+        self.work = np.empty(max_in + group, dtype=np.uint8)
+        self.carry = np.empty(group, dtype=np.uint8)
+        self.pending = 0
+        self.bits = 0
+        self.seconds = 0.0
+
+    def output_size(self, bits):
+        return bits // self.group * self.group * self.factor.numerator // self.factor.denominator
+
+    def push(self, bits):
+        started = time.perf_counter()
+        if self.pending:
+            size = self.pending + len(bits)
+            self.work[:self.pending] = self.carry[:self.pending]
+            self.work[self.pending:size] = bits
+            bits = self.work[:size]
+        usable = len(bits) - len(bits) % self.group
+        out = self.transform(bits[:usable]) if usable else self.out[:0]
+        self.pending = len(bits) - usable
+        self.carry[:self.pending] = bits[usable:]
+        self.bits += len(out)
+        self.seconds += time.perf_counter() - started
+        return out
+
+    def transform(self, bits):
+        raise NotImplementedError
+
+
+class PassThrough(Stage):
+    implementation = "pass-through (rate 1)"
+
+    def __init__(self, name, max_in):
+        self.name = name
+        super().__init__(1, Fraction(1), max_in)
+
+    def output_size(self, bits):
+        return 0  # never writes; hands its input on
+
+    def transform(self, bits):
+        return bits
+
+
+class SourceEncoder(Stage):
+    """Fixed-rate source coder: keeps the leading k bits of every n."""
+
+    name = "source_encoder"
+
+    def __init__(self, rate, max_in):
+        rate = _fraction(rate, 64)
+        self.keep = rate.numerator
+        self.implementation = f"keeps {self.keep} of every {rate.denominator} bits"
+        super().__init__(rate.denominator, rate, max_in)
+
+    def transform(self, bits):
+        rows = len(bits) // self.group
+        out = self.out[:rows * self.keep]
+        out.shape = (rows, self.keep)
+        out[:] = bits.reshape(rows, self.group)[:, :self.keep]
+        return self.out[:rows * self.keep]
+
+
+class RepetitionEncoder(Stage):
+    """Rate k/n <= 1/2: each group of k bits is spread evenly over n output bits."""
+
+    name = "channel_encoder"
+
+    def __init__(self, rate, max_in):
+        k, n = rate.numerator, rate.denominator
+        self.index = np.arange(n) * k // n
+        self.implementation = f"repetition code, rate {k}/{n}"
+        super().__init__(k, Fraction(n, k), max_in)
+
+    def transform(self, bits):
+        rows = len(bits) // self.group
+        out = self.out[:rows * len(self.index)]
+        out.shape = (rows, len(self.index))
+        np.take(bits.reshape(rows, self.group), self.index, axis=1, out=out)
+        return self.out[:rows * len(self.index)]
+
+
+class ConvolutionalEncoder(Stage):
+    """K=7 rate-1/2 convolutional code, punctured to rate k/n >= 1/2.
+
+    The shift register carries over between pushes, so the stream is encoded exactly as
+    if it arrived in one piece.
+    """
+
+    name = "channel_encoder"
+
+    def __init__(self, rate, max_in):
+        k, n = rate.numerator, rate.denominator
+        memory = CONSTRAINT_LENGTH - 1
+        # Evenly spread the n kept bits over the 2k mother-code bits of each group
+        self.keep = np.unique(np.round(np.linspace(0, 2 * k - 1, n)).astype(int))
+        self.taps = [
+            [d for d in range(CONSTRAINT_LENGTH) if g >> (memory - d) & 1] for g in GENERATORS
+        ]
+        self.implementation = f"convolutional K=7 (133, 171), punctured to rate {k}/{n}"
+        super().__init__(k, Fraction(n, k), max_in)
+        self.memory = memory
+        self.register = np.zeros(self.memory + len(self.work), dtype=np.uint8)
+        self.coded = np.empty((len(self.work), 2), dtype=np.uint8)
+
+    def transform(self, bits):
+        size = len(bits)
+        m = self.memory
+        self.register[m:m + size] = bits
+        coded = self.coded[:size]
+        for column, taps in zip(coded.T, self.taps):
+            column[:] = 0
+            for delay in taps:
+                np.bitwise_xor(column, self.register[m - delay:m - delay + size], out=column)
+        self.register[:m] = self.register[size:size + m]  # the last K-1 inputs
+        rows = size // self.group
+        out = self.out[:rows * len(self.keep)]
+        out.shape = (rows, len(self.keep))
+        np.take(coded.reshape(rows, 2 * self.group), self.keep, axis=1, out=out)
+        return self.out[:rows * len(self.keep)]
+
+
+class BlockInterleaver(Stage):
+    """Writes ``rows`` x ``cols`` blocks by row and reads them by column.
+
+    A rate above 1 is realized as fill bits after each block.
+    """
+
+    name = "interleaver"
+
+    def __init__(self, rate, rows, max_in):
+        rate = _fraction(rate, 64)
+        self.rows = rows
+        self.cols = 8 * rate.denominator
+        payload = self.rows * self.cols
+        self.block = payload * rate.numerator // rate.denominator
+        self.implementation = f"{self.rows}x{self.cols} block interleaver, {self.block - payload} fill bits per block"
+        super().__init__(payload, rate, max_in)
+
+    def transform(self, bits):
+        blocks = len(bits) // self.group
+        out = self.out[:blocks * self.block]
+        out.shape = (blocks, self.block)
+        payload = out[:, :self.group]
+        payload.shape = (blocks, self.cols, self.rows)  # never copies; fill bits stay zero
+        payload[:] = bits.reshape(blocks, self.rows, self.cols).transpose(0, 2, 1)
+        return self.out[:blocks * self.block]
+
+
+class BurstFramer(Stage):
+    """Wraps each payload in a burst: Barker-13 sync word, payload, then guard bits."""
+
+    name = "burst_formatter"
+
+    def __init__(self, factor, max_in):
+        factor = _fraction(factor, 64)
+        scale = math.ceil(256 / factor.denominator)
+        payload = factor.denominator * scale
+        self.burst = factor.numerator * scale
+        self.sync = min(len(BARKER_13), self.burst - payload)
+        self.implementation = f"bursts of {self.burst} bits: {self.sync}-bit sync, {payload}-bit payload, guard"
+        super().__init__(payload, factor, max_in)
+        frames = self.out[:len(self.out) // self.burst * self.burst].reshape(-1, self.burst)
+        frames[:, :self.sync] = BARKER_13[:self.sync]
+
+    def transform(self, bits):
+        bursts = len(bits) // self.group
+        out = self.out[:bursts * self.burst]
+        out.shape = (bursts, self.burst)
+        out[:, self.sync:self.sync + self.group] = bits.reshape(bursts, self.group)
+        return self.out[:bursts * self.burst]
+
+
+class Quantizer:
+    """Uniform mid-rise quantizer over [-1, 1), emitting each level as ``bits`` bits, MSB first."""
+
+    name = "quantizer"
+
+    def __init__(self, bits, max_samples):
+        self.bits_per_sample = bits
+        self.levels = 2 ** bits
+        self.implementation = f"uniform mid-rise, {self.levels} levels"
+        self.index = np.empty(max_samples, dtype=np.int64)
+        self.scratch = np.empty(max_samples, dtype=np.float64)
+        self.shifts = np.arange(bits - 1, -1, -1, dtype=np.int64)
+        self.words = np.empty((max_samples, bits), dtype=np.int64)
+        self.out = np.empty(max_samples * bits, dtype=np.uint8)
+        self.signal_power = 0.0
+        self.noise_power = 0.0
+        self.bits = 0
+        self.seconds = 0.0
+
+    def push(self, samples):
+        started = time.perf_counter()
+        n = len(samples)
+        scratch, index = self.scratch[:n], self.index[:n]
+        np.add(samples, 1, out=scratch)
+        np.multiply(scratch, self.levels / 2, out=scratch)
+        np.floor(scratch, out=scratch)
+        np.clip(scratch, 0, self.levels - 1, out=scratch)
+        index[:] = scratch
+        # Reconstruction error, for the measured SQNR
+        np.add(scratch, 0.5, out=scratch)
+        np.multiply(scratch, 2 / self.levels, out=scratch)
+        np.subtract(scratch, 1, out=scratch)
+        np.subtract(scratch, samples, out=scratch)
+        self.noise_power += float(np.dot(scratch, scratch))
+        self.signal_power += float(np.dot(samples, samples))
+
+        words = self.words[:n]
+        np.right_shift(index[:, None], self.shifts, out=words)
+        out = self.out[:n * self.bits_per_sample]
+        out.shape = (n, self.bits_per_sample)
+        np.bitwise_and(words, 1, out=out, casting="unsafe")
+        self.bits += n * self.bits_per_sample
+        self.seconds += time.perf_counter() - started
+        return self.out[:n * self.bits_per_sample]
+
+    def sqnr_db(self):
+        if self.noise_power == 0:
+            return None
+        return 10 * math.log10(self.signal_power / self.noise_power)
+
+
+class Sampler:
+    """Samples a three-tone test signal inside the source bandwidth, 0.9 peak."""
+
+    name = "sampler"
+    implementation = "three tones at 0.11, 0.37 and 0.73 of the bandwidth"
+
+    def __init__(self, bandwidth_hz, sampling_rate, max_samples):
+        self.steps = [2 * math.pi * f * bandwidth_hz / sampling_rate for f in (0.11, 0.37, 0.73)]
+        self.ramp = np.arange(max_samples, dtype=np.float64)
+        self.phase = np.empty(max_samples, dtype=np.float64)
+        self.tone = np.empty(max_samples, dtype=np.float64)
+        self.out = np.empty(max_samples, dtype=np.float64)
+        self.samples = 0
+        self.seconds = 0.0
+
+    def blocks(self, total, size):
+        start = 0
+        while start < total:
+            started = time.perf_counter()
+            n = min(size, total - start)
+            out, phase, tone = self.out[:n], self.phase[:n], self.tone[:n]
+            out[:] = 0
+            for step in self.steps:
+                np.add(self.ramp[:n], start, out=phase)
+                np.multiply(phase, step, out=phase)
+                np.sin(phase, out=tone)
+                np.multiply(tone, 0.3, out=tone)
+                np.add(out, tone, out=out)
+            start += n
+            self.samples += n
+            self.seconds += time.perf_counter() - started
+            yield out
+
+
+def _through(stage, upstream):
+    for block in upstream:
+        out = stage.push(block)
+        if len(out):
+            yield out
+
+
+def channel_encoder(rate, max_in):
+    rate = _fraction(rate, 16)
+    if rate == 1:
+        return PassThrough("channel_encoder", max_in)
+    if rate >= Fraction(1, 2):
+        return ConvolutionalEncoder(rate, max_in)
+    return RepetitionEncoder(rate, max_in)
+
+
+def run_chain(data, samples=None, buffer_samples=None, interleaver_rows=16):
+    """Push ``samples`` samples through real implementations of every wireless_comm block.
+
+    Returns measured and analytic bit rates at each stage boundary plus the pipeline's own
+    processing throughput. Rates that are not simple fractions are realized as the
+    nearest fraction; each stage reports the factor it actually applied.
+    """
+    state = GraphState(GRAPHS["wireless_comm"], data)
+    error = state.error()
+    if error:
+        raise ChainError(error)
+    values = state.values
+    if values["burst"] < 1:
+        raise ChainError("The simulator needs burstLength >= 1; a shorter burst would have to drop data")
+    samples = int(samples or config.CHAIN_SAMPLES)
+    buffer_samples = int(buffer_samples or config.CHAIN_BUFFER_SAMPLES)
+    if not 1 <= samples <= config.CHAIN_MAX_SAMPLES:
+        raise ChainError(f"samples must be between 1 and {config.CHAIN_MAX_SAMPLES}")
+    buffer_samples = min(max(buffer_samples, 1), samples)
+
+    sampling_rate = values["sampling_rate"]
+    sampler = Sampler(values["bandwidth_khz"] * 1e3, sampling_rate, buffer_samples)
+    quantizer = Quantizer(values["quant_bits"], buffer_samples)
+    stages = []
+    max_in = len(quantizer.out)
+    source_rate = _fraction(values["source_rate"], 64)
+    stages.append(
+        PassThrough("source_encoder", max_in) if source_rate == 1 else SourceEncoder(values["source_rate"], max_in)
+    )
+    for build in (
+        lambda m: channel_encoder(values["channel_rate"], m),
+        lambda m: (
+            PassThrough("interleaver", m) if values["interleaver"] == 1
+            else BlockInterleaver(values["interleaver"], interleaver_rows, m)
+        ),
+        lambda m: PassThrough("burst_formatter", m) if values["burst"] == 1 else BurstFramer(values["burst"], m),
+    ):
+        max_in = max(max_in, stages[-1].max_out)
+        stages.append(build(max_in))
+
+    started = time.perf_counter()
+    stream = _through(quantizer, sampler.blocks(samples, buffer_samples))
+    for stage in stages:
+        stream = _through(stage, stream)
+    for _ in stream:
+        pass
+    wall = time.perf_counter() - started
+
+    duration = samples / sampling_rate
+    analytic = state.outputs()
+    boundaries = [
+        ("sampler", sampler.samples, Fraction(1), sampler, "sampler_rate_bps"),
+        ("quantizer", quantizer.bits, Fraction(quantizer.bits_per_sample), quantizer, "quantizer_rate_bps"),
+    ] + [
+        (stage.name, stage.bits, stage.factor, stage, f"{stage.name}_rate_bps") for stage in stages
+    ]
+    report = []
+    for name, count, factor, block, key in boundaries:
+        measured = count / duration
+        report.append({
+            "stage": name,
+            "implementation": block.implementation,
+            "bits": count,
+            "realized_factor": float(factor),
+            "measured_bps": measured,
+            "analytic_bps": analytic[key],
+            "relative_error": measured / analytic[key] - 1 if analytic[key] else None,
+            "pending_bits": getattr(block, "pending", 0),
+            "seconds": block.seconds,
+        })
+    return {
+        "samples": samples,
+        "buffer_samples": buffer_samples,
+        "duration_s": duration,
+        "stages": report,
+        "sqnr_db": quantizer.sqnr_db(),
+        "sqnr_full_scale_sine_db": 6.02 * quantizer.bits_per_sample + 1.76,
+        "throughput": {
+            "wall_s": wall,
+            "samples_per_s": samples / wall if wall else None,
+            "output_bits_per_s": report[-1]["bits"] / wall if wall else None,
+            "realtime_factor": duration / wall if wall else None,
+        },
+    }
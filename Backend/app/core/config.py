@@ -0,0 +1,114 @@
+import os
+
+from dotenv import load_dotenv
+
+# Load .env before reading any setting below
+load_dotenv()
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return float(default)
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return int(default)
+
+
+# Gemini endpoint (override GEMINI_BASE_URL to point at a local stub server)
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+
+# LLM client tuning
+LLM_TIMEOUT_S = _env_float("LLM_TIMEOUT_S", 30)            # wall-clock budget per call, retries included
+LLM_CONNECT_TIMEOUT_S = _env_float("LLM_CONNECT_TIMEOUT_S", 5)
+LLM_MAX_RETRIES = _env_int("LLM_MAX_RETRIES", 2)           # retries after the first attempt
+LLM_BACKOFF_BASE_S = _env_float("LLM_BACKOFF_BASE_S", 0.5)
+LLM_BACKOFF_MAX_S = _env_float("LLM_BACKOFF_MAX_S", 8)
+LLM_MAX_CONCURRENCY = _env_int("LLM_MAX_CONCURRENCY", 8)   # outbound calls in flight (sync + async)
+LLM_MAX_CONNECTIONS = _env_int("LLM_MAX_CONNECTIONS", 20)
+LLM_KEEPALIVE_CONNECTIONS = _env_int("LLM_KEEPALIVE_CONNECTIONS", 10)
+
+# Explanations: wait at most this long for Gemini before answering with a local summary
+EXPLAIN_DEADLINE_S = _env_float("EXPLAIN_DEADLINE_S", 4)
+
+# /session WebSocket: quiet time after the last update before the explanation is requested
+SESSION_DEBOUNCE_S = _env_float("SESSION_DEBOUNCE_S", 0.8)
+
+# Admission control in front of the LLM (429 = client over its share, 503 = saturated)
+ADMISSION_MAX_ACTIVE = _env_int("ADMISSION_MAX_ACTIVE", LLM_MAX_CONCURRENCY)
+ADMISSION_QUEUE_SIZE = _env_int("ADMISSION_QUEUE_SIZE", 64)       # waiting requests, all clients
+ADMISSION_PER_CLIENT = _env_int("ADMISSION_PER_CLIENT", 8)        # waiting requests per client
+ADMISSION_QUEUE_TIMEOUT_S = _env_float("ADMISSION_QUEUE_TIMEOUT_S", 10)
+ADMISSION_RETRY_AFTER_S = _env_int("ADMISSION_RETRY_AFTER_S", 2)
+
+# LLM response cache (set LLM_CACHE_PATH to a SQLite file to share it across workers)
+LLM_CACHE_SIZE = _env_int("LLM_CACHE_SIZE", 1024)
+LLM_CACHE_TTL_S = _env_float("LLM_CACHE_TTL_S", 86400)
+LLM_CACHE_DIGITS = _env_int("LLM_CACHE_DIGITS", 6)         # significant digits in the cache key
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
+LLM_CACHE_DISK_MAX_ROWS = _env_int("LLM_CACHE_DISK_MAX_ROWS", 100000)
+
+# /calculate/batch
+BATCH_MAX_ROWS = _env_int("BATCH_MAX_ROWS", 1000000)
+BATCH_CHUNK_ROWS = _env_int("BATCH_CHUNK_ROWS", 2000)     # NDJSON rows per streamed chunk
+
+# /sweep
+SWEEP_MAX_ROWS = _env_int("SWEEP_MAX_ROWS", 20000000)
+SWEEP_CHUNK_ROWS = _env_int("SWEEP_CHUNK_ROWS", 50000)
+SWEEP_PARALLEL_MIN_ROWS = _env_int("SWEEP_PARALLEL_MIN_ROWS", 500000)  # smaller sweeps stay in-process
+SWEEP_WORKERS = _env_int("SWEEP_WORKERS", 0)                            # 0 = one per core
+
+# /plan/cellular
+PLAN_MAX_RADII = _env_int("PLAN_MAX_RADII", 2000000)
+PLAN_MAX_FRONT = _env_int("PLAN_MAX_FRONT", 100)                      # designs returned, evenly spread
+PLAN_PARALLEL_MIN_ROWS = _env_int("PLAN_PARALLEL_MIN_ROWS", 200000)  # feasible rows before the pool is used
+
+# /coverage
+COVERAGE_MAX_PIXELS = _env_int("COVERAGE_MAX_PIXELS", 4096 * 4096)
+COVERAGE_TILE = _env_int("COVERAGE_TILE", 512)             # tile edge in pixels
+COVERAGE_WORKERS = _env_int("COVERAGE_WORKERS", 0)         # 0 = one thread per core
+COVERAGE_PNG_LEVEL = _env_int("COVERAGE_PNG_LEVEL", 6)     # zlib level for PNG output
+COVERAGE_SESSIONS = _env_int("COVERAGE_SESSIONS", 8)       # rasters kept per worker for /move
+
+# /simulate/ber Monte Carlo
+BER_MAX_BITS = _env_int("BER_MAX_BITS", 20000000)         # per Eb/N0 point, when the error target is not met
+BER_MAX_POINTS = _env_int("BER_MAX_POINTS", 64)
+BER_BATCH_BITS = _env_int("BER_BATCH_BITS", 2 ** 18)      # bits simulated per vectorized batch
+BER_INLINE_MAX_BITS = _env_int("BER_INLINE_MAX_BITS", 200000)  # budget for OFDM effective rate in /calculate
+BER_CACHE_SIZE = _env_int("BER_CACHE_SIZE", 256)
+BER_CACHE_TTL_S = _env_float("BER_CACHE_TTL_S", 86400)
+
+# /simulate/chain bit-level pipeline
+CHAIN_SAMPLES = _env_int("CHAIN_SAMPLES", 2 ** 16)            # samples pushed through by default
+CHAIN_MAX_SAMPLES = _env_int("CHAIN_MAX_SAMPLES", 2 ** 22)
+CHAIN_BUFFER_SAMPLES = _env_int("CHAIN_BUFFER_SAMPLES", 4096)  # samples per buffer
+
+# /jobs: background work on its own process pool
+JOB_WORKERS = _env_int("JOB_WORKERS", 0)                      # 0 = one per core
+JOB_MAX_QUEUED = _env_int("JOB_MAX_QUEUED", 256)              # waiting jobs before POST /jobs answers 503
+JOB_MAX_RECORDS = _env_int("JOB_MAX_RECORDS", 10000)          # finished job records kept for GET /jobs/{id}
+JOB_RESULT_BYTES = _env_int("JOB_RESULT_BYTES", 256 * 2**20)  # result store size before oldest results go
+JOB_PROGRESS_INTERVAL_S = _env_float("JOB_PROGRESS_INTERVAL_S", 0.25)
+JOB_RETRY_AFTER_S = _env_int("JOB_RETRY_AFTER_S", 5)
+
+# Static assets: fingerprinted and precompressed in memory at startup
+ASSET_MIN_COMPRESS_BYTES = _env_int("ASSET_MIN_COMPRESS_BYTES", 512)
+ASSET_GZIP_LEVEL = _env_int("ASSET_GZIP_LEVEL", 9)
+ASSET_BROTLI_QUALITY = _env_int("ASSET_BROTLI_QUALITY", 11)     # when the brotli package is installed
+ASSET_IMAGE_MIN_BYTES = _env_int("ASSET_IMAGE_MIN_BYTES", 200000)  # images this large get WebP/resized variants (Pillow)
+ASSET_IMAGE_WIDTHS = [int(w) for w in os.getenv("ASSET_IMAGE_WIDTHS", "480,960,1440,1920").split(",") if w.strip()]
+ASSET_IMAGE_QUALITY = _env_int("ASSET_IMAGE_QUALITY", 80)
+
+# Logging: app.* loggers; DEBUG call-site logs are sampled at LOG_SAMPLE_RATE (0..1)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "WARNING").upper()
+LOG_SAMPLE_RATE = _env_float("LOG_SAMPLE_RATE", 1.0)
+
+
+def gemini_api_key():
+    return os.getenv("GEMINI_API_KEY")
@@ -0,0 +1,388 @@
+import io
+import math
+import os
+import struct
+import threading
+import uuid
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from app.core import config
+from app.core.batch import BOLTZMANN
+from app.core.propagation import DEFAULT_MODEL, PropagationError, parse_model
+
+# Receivers closer than this (1 m) are clamped so the path loss stays finite
+MIN_DISTANCE_KM = 0.001
+
+# Viridis-like anchors; the PNG palette interpolates between them
+_RAMP = np.array([
+    [68, 1, 84], [59, 82, 139], [33, 145, 140], [94, 201, 98], [253, 231, 37],
+], dtype=float)
+
+_SERVER_COLOURS = np.array([
+    [31, 119, 180], [255, 127, 14], [44, 160, 44], [214, 39, 40], [148, 103, 189], [140, 86, 75],
+    [227, 119, 194], [127, 127, 127], [188, 189, 34], [23, 190, 207], [174, 199, 232], [255, 187, 120],
+], dtype=np.uint8)
+
+LAYERS = ("power", "snr", "best_server")
+
+
+class CoverageError(ValueError):
+    pass
+
+
+def _number(doc, name, default=None):
+    value = doc.get(name, default)
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise CoverageError(f"{name} must be a number")
+    if not math.isfinite(value):
+        raise CoverageError(f"{name} must be a number")
+    return value
+
+
+class Transmitter:
+    def __init__(self, x, y, power_dbm, gain_dbi=0.0, frequency_mhz=2400.0):
+        if frequency_mhz <= 0:
+            raise CoverageError("Frequency must be greater than 0.")
+        self.x = x
+        self.y = y
+        self.power_dbm = power_dbm
+        self.gain_dbi = gain_dbi
+        self.frequency_mhz = frequency_mhz
+
+    @property
+    def eirp_dbm(self):
+        return self.power_dbm + self.gain_dbi
+
+    @classmethod
+    def parse(cls, doc):
+        if not isinstance(doc, dict):
+            raise CoverageError("Each transmitter must be an object")
+        return cls(
+            _number(doc, "x"),
+            _number(doc, "y"),
+            _number(doc, "power_dbm"),
+            _number(doc, "gain_dbi", 0),
+            _number(doc, "frequency", 2400),
+        )
+
+
+class CoverageSpec:
+    """Grid, transmitters and receiver for a coverage raster.
+
+    ``bounds`` is ``(xmin, ymin, xmax, ymax)`` in km; row 0 of the raster is the north edge.
+    Path loss is free space unless a propagation ``model`` is given.
+    """
+
+    def __init__(self, bounds, width, height, transmitters, rx_gain=0.0, system_loss_db=0.0,
+                 temperature_k=290.0, noise_figure_db=0.0, bandwidth_hz=1e6, tile=None, model=None):
+        xmin, ymin, xmax, ymax = bounds
+        if not (xmax > xmin and ymax > ymin):
+            raise CoverageError("bounds must be [xmin, ymin, xmax, ymax] with xmax > xmin and ymax > ymin")
+        if width < 1 or height < 1:
+            raise CoverageError("width and height must be at least 1")
+        if width * height > config.COVERAGE_MAX_PIXELS:
+            raise CoverageError(f"Raster has {width * height} pixels; at most {config.COVERAGE_MAX_PIXELS} are allowed")
+        if not transmitters:
+            raise CoverageError("At least one transmitter is required")
+        if temperature_k <= 0 or bandwidth_hz <= 0:
+            raise CoverageError("Temperature and bandwidth must be greater than 0.")
+        if model is not None:
+            for tx in transmitters:
+                if model.invalid_frequency(tx.frequency_mhz):
+                    raise CoverageError(model.frequency_message())
+        self.model = model
+        self.bounds = (xmin, ymin, xmax, ymax)
+        self.width = width
+        self.height = height
+        self.transmitters = list(transmitters)
+        self.rx_gain = rx_gain
+        self.system_loss_db = system_loss_db
+        # Same kTB * NF noise floor as the link budget, over the receiver bandwidth
+        self.noise_dbm = 10 * math.log10(BOLTZMANN * temperature_k * bandwidth_hz) + 30 + noise_figure_db
+        self.tile = tile or config.COVERAGE_TILE
+        self.xs = xmin + (np.arange(width) + 0.5) * (xmax - xmin) / width
+        self.ys = ymax - (np.arange(height) + 0.5) * (ymax - ymin) / height
+
+    @classmethod
+    def parse(cls, body):
+        bounds = body.get("bounds")
+        if not isinstance(bounds, (list, tuple)) or len(bounds) != 4:
+            raise CoverageError("bounds must be [xmin, ymin, xmax, ymax] in km")
+        try:
+            bounds = [float(v) for v in bounds]
+            width, height = int(body.get("width", 256)), int(body.get("height", 256))
+        except (TypeError, ValueError):
+            raise CoverageError("bounds, width and height must be numbers")
+        transmitters = body.get("transmitters")
+        if not isinstance(transmitters, list):
+            raise CoverageError("transmitters must be a list")
+        receiver = body.get("receiver") or {}
+        propagation = body.get("propagation")
+        if propagation is not None and not isinstance(propagation, dict):
+            raise CoverageError("propagation must be an object")
+        try:
+            model = parse_model(propagation, DEFAULT_MODEL) if propagation else None
+        except PropagationError as e:
+            raise CoverageError(str(e))
+        return cls(
+            bounds,
+            width,
+            height,
+            [Transmitter.parse(t) for t in transmitters],
+            rx_gain=_number(receiver, "rx_gain", 0),
+            system_loss_db=_number(receiver, "system_loss_db", 0),
+            temperature_k=_number(receiver, "temperature_k", 290),
+            noise_figure_db=_number(receiver, "noise_figure_db", 0),
+            bandwidth_hz=_number(receiver, "bandwidth", 1e6),
+            model=model,
+        )
+
+    def tiles(self):
+        for r0 in range(0, self.height, self.tile):
+            for c0 in range(0, self.width, self.tile):
+                yield r0, min(r0 + self.tile, self.height), c0, min(c0 + self.tile, self.width)
+
+    def _gain_db(self, tx):
+        return tx.eirp_dbm + self.rx_gain - self.system_loss_db
+
+    def _budget_dbm(self, tx):
+        # Everything in the link budget except the 20*log10(d) term
+        return self._gain_db(tx) - 32.45 - 20 * math.log10(tx.frequency_mhz)
+
+    def _distance2(self, tx, r0, r1, c0, c1):
+        dx = self.xs[c0:c1] - tx.x
+        dy = self.ys[r0:r1] - tx.y
+        return np.maximum(dy[:, None] ** 2 + dx[None, :] ** 2, MIN_DISTANCE_KM ** 2)
+
+    def received_mw(self, tx, r0, r1, c0, c1):
+        """Received power (mW) from one transmitter over a tile, via the link budget's FSPL.
+
+        In linear units FSPL is a division by d^2, so comparing transmitters needs no log.
+        """
+        if self.model is not None:
+            return 10 ** (self.received_dbm(tx, r0, r1, c0, c1) / 10)
+        return 10 ** (self._budget_dbm(tx) / 10) / self._distance2(tx, r0, r1, c0, c1)
+
+    def received_dbm(self, tx, r0, r1, c0, c1):
+        distance2 = self._distance2(tx, r0, r1, c0, c1)
+        if self.model is not None:
+            return self._gain_db(tx) - self.model.loss_db(np.sqrt(distance2), tx.frequency_mhz)
+        # 20*log10(d) == 10*log10(d^2): skips the square root
+        return self._budget_dbm(tx) - 10 * np.log10(distance2)
+
+    def best_case_dbm(self, tx, r0, r1, c0, c1):
+        """Upper bound of :meth:`received_dbm` over a tile (nearest point of the tile)."""
+        x_lo, x_hi = self.xs[c0], self.xs[c1 - 1]
+        y_lo, y_hi = self.ys[r1 - 1], self.ys[r0]
+        dx = max(x_lo - tx.x, 0.0, tx.x - x_hi)
+        dy = max(y_lo - tx.y, 0.0, tx.y - y_hi)
+        d = max(math.hypot(dx, dy), MIN_DISTANCE_KM)
+        if self.model is not None:
+            # Every model's loss grows with distance, so the nearest point is still the best case
+            return self._gain_db(tx) - float(self.model.loss_db(d, tx.frequency_mhz))
+        return self._budget_dbm(tx) - 20 * math.log10(d)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    # NumPy releases the GIL in its ufuncs, so tiles scale across threads without pickling
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=config.COVERAGE_WORKERS or os.cpu_count() or 1, thread_name_prefix="coverage"
+            )
+        return _executor
+
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(cancel_futures=True)
+            _executor = None
+
+
+class CoverageRaster:
+    """Best-server received power and server index over a spec's grid (SNR is derived).
+
+    Each worker thread holds one tile of temporaries at a time, so memory stays at the
+    output rasters (6 bytes per pixel) whatever the transmitter count.
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.power = np.full((spec.height, spec.width), -np.inf, dtype=np.float32)
+        self.best_server = np.zeros((spec.height, spec.width), dtype=np.int16)
+        self.lock = threading.Lock()
+
+    @property
+    def snr(self):
+        return self.power - np.float32(self.spec.noise_dbm)
+
+    def _full_tile(self, r0, r1, c0, c1):
+        best = None
+        index = None
+        for i, tx in enumerate(self.spec.transmitters):
+            power = self.spec.received_mw(tx, r0, r1, c0, c1)
+            if best is None:
+                best, index = power, np.zeros(power.shape, dtype=np.int16)
+            else:
+                better = power > best
+                np.copyto(best, power, where=better)
+                index[better] = i
+        self.power[r0:r1, c0:c1] = 10 * np.log10(best)
+        self.best_server[r0:r1, c0:c1] = index
+
+    def _merge_tile(self, i, r0, r1, c0, c1):
+        power = self.spec.received_dbm(self.spec.transmitters[i], r0, r1, c0, c1)
+        current = self.power[r0:r1, c0:c1]
+        better = power > current
+        current[better] = power[better]
+        self.best_server[r0:r1, c0:c1][better] = i
+
+    def _run(self, jobs):
+        # jobs: (method, args); every job writes a disjoint tile, so no locking is needed
+        futures = [get_executor().submit(method, *args) for method, args in jobs]
+        for future in futures:
+            future.result()
+        return len(futures)
+
+    def compute(self):
+        with self.lock:
+            return self._run([(self._full_tile, tile) for tile in self.spec.tiles()])
+
+    def move(self, index, x, y):
+        """Move transmitter ``index`` and refresh only the tiles it can affect.
+
+        Tiles it was serving are recomputed from scratch (the runner-up is not stored).
+        Elsewhere the moved transmitter only matters where it now beats the stored best,
+        so tiles whose weakest pixel it cannot reach even at their nearest point are skipped.
+        Returns the number of tiles touched.
+        """
+        with self.lock:
+            spec = self.spec
+            if not 0 <= index < len(spec.transmitters):
+                raise CoverageError(f"No transmitter {index}")
+            tx = spec.transmitters[index]
+            tx.x, tx.y = x, y
+            jobs = []
+            for r0, r1, c0, c1 in spec.tiles():
+                if (self.best_server[r0:r1, c0:c1] == index).any():
+                    jobs.append((self._full_tile, (r0, r1, c0, c1)))
+                elif spec.best_case_dbm(tx, r0, r1, c0, c1) > self.power[r0:r1, c0:c1].min():
+                    jobs.append((self._merge_tile, (index, r0, r1, c0, c1)))
+            return self._run(jobs)
+
+    # -------------------------------------------------------------------- output
+
+    def layer(self, name):
+        if name == "power":
+            return self.power
+        if name == "snr":
+            return self.snr
+        if name == "best_server":
+            return self.best_server
+        raise CoverageError(f"layer must be one of {', '.join(LAYERS)}")
+
+    def npz(self):
+        """Uncompressed ``.npz``: float32 power, the smallest integer type for the server index.
+
+        SNR is not stored; it is ``power_dbm - noise_dbm``.
+        """
+        servers = self.best_server
+        if len(self.spec.transmitters) <= 256:
+            servers = servers.astype(np.uint8)
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            power_dbm=self.power,
+            best_server=servers,
+            bounds=np.asarray(self.spec.bounds),
+            noise_dbm=np.float64(self.spec.noise_dbm),
+        )
+        return buffer.getvalue()
+
+    def png(self, layer="power", vmin=None, vmax=None):
+        """Heatmap PNG of one layer; returns ``(bytes, (vmin, vmax))``."""
+        values = self.layer(layer)
+        if layer == "best_server":
+            rgb = _SERVER_COLOURS[values % len(_SERVER_COLOURS)]
+            return encode_png(rgb), (0, len(self.spec.transmitters) - 1)
+        vmin = float(np.min(values)) if vmin is None else vmin
+        vmax = float(np.max(values)) if vmax is None else vmax
+        span = vmax - vmin if vmax > vmin else 1.0
+        levels = np.clip((values - vmin) / span * 255, 0, 255).astype(np.uint8)
+        return encode_png(palette()[levels]), (vmin, vmax)
+
+
+def palette():
+    positions = np.linspace(0, 255, len(_RAMP))
+    steps = np.arange(256)
+    return np.stack([np.interp(steps, positions, _RAMP[:, c]) for c in range(3)], axis=1).astype(np.uint8)
+
+
+def _chunk(kind, data):
+    body = kind + data
+    return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body) & 0xFFFFFFFF)
+
+
+def encode_png(rgb):
+    """Encode an (H, W, 3) uint8 array as an 8-bit RGB PNG with zlib alone."""
+    height, width, _ = rgb.shape
+    # Filter type 0 (None) prefixed to every scanline
+    raw = np.empty((height, width * 3 + 1), dtype=np.uint8)
+    raw[:, 0] = 0
+    raw[:, 1:] = rgb.reshape(height, width * 3)
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"".join([
+        b"\x89PNG\r\n\x1a\n",
+        _chunk(b"IHDR", header),
+        _chunk(b"IDAT", zlib.compress(raw.tobytes(), config.COVERAGE_PNG_LEVEL)),
+        _chunk(b"IEND", b""),
+    ])
+
+
+class RasterStore:
+    """Recent rasters kept per process so a transmitter move can reuse them."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, raster):
+        key = uuid.uuid4().hex
+        with self._lock:
+            self._data[key] = raster
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return key
+
+    def get(self, key):
+        with self._lock:
+            raster = self._data.get(key)
+            if raster is not None:
+                self._data.move_to_end(key)
+            return raster
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = RasterStore(config.COVERAGE_SESSIONS)
+        return _store
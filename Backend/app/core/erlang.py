@@ -0,0 +1,307 @@
+import math
+import threading
+from bisect import bisect_left
+from functools import lru_cache
+
+import numpy as np
+
+# GoS targets with precomputed capacity tables
+COMMON_GOS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.03, 0.05, 0.1, 0.2)
+
+# Channel counts covered by the tables; larger cells fall back to the exact recursion
+TABLE_MAX_CHANNELS = 1024
+
+_SOLVER_STEPS = 60
+
+# Off-table GoS targets whose capacity tables are kept once built
+OFF_TABLE_CACHE = 32
+
+# Terms of 1/B more than this many standard deviations of the traffic below min(A, N) are
+# below 1e-21 of the sum, so the recursion can start there instead of at n = 0
+_WINDOW_SIGMAS = 10
+
+
+def _negligible_from(traffic):
+    # Past A + 20*sqrt(A) + 100 channels blocking is below 1e-80, far under any GoS target
+    return math.ceil(traffic + 20 * math.sqrt(traffic) + 100)
+
+
+def _start(traffic, channels):
+    """First n the recursion has to run from, with B = 1 there, for double precision.
+
+    1/B(A, N) is N!/A^N times the sum of the Poisson weights A^k/k! over k <= N, which
+    fall off at least as fast as a Gaussian of width sqrt(A) below min(A, N). Skipping
+    the negligible ones makes every evaluation O(sqrt(A)) instead of O(N).
+    """
+    return max(0, min(math.floor(traffic), channels) - math.ceil(_WINDOW_SIGMAS * math.sqrt(traffic)) - 20)
+
+
+def erlang_b(traffic, channels):
+    """Blocking probability B(A, N) via the stable recursion B(n) = A*B(n-1) / (n + A*B(n-1))."""
+    channels = int(channels)
+    if channels < 0:
+        raise ValueError("channels must be >= 0")
+    if traffic <= 0:
+        return 0.0 if channels > 0 else 1.0
+    if channels > _negligible_from(traffic):
+        return 0.0
+    return _blocking(traffic, channels)
+
+
+def _blocking(traffic, channels):
+    b = 1.0
+    for n in range(_start(traffic, channels) + 1, channels + 1):
+        b = traffic * b / (n + traffic * b)
+    return b
+
+
+def _recursion(traffic, channels):
+    # One pass for every lane at once, each from its own start (see _start). Lanes are
+    # sorted by step count so the lanes still recursing at step k are a suffix and can
+    # be updated in place.
+    if traffic.size == 1:
+        # Plain floats beat NumPy's per-call overhead for a single lane
+        return np.array([_blocking(float(traffic[0]), int(channels[0]))])
+    first = np.maximum(
+        0, np.minimum(np.floor(traffic), channels) - np.ceil(_WINDOW_SIGMAS * np.sqrt(traffic)) - 20
+    )
+    steps = channels - first
+    order = np.argsort(steps, kind="stable")
+    counts = steps[order]
+    first = first[order]
+    a = traffic[order]
+    b = np.ones_like(a)
+    top = int(counts[-1]) if counts.size else 0
+    starts = np.searchsorted(counts, np.arange(1, top + 1), side="left")
+    for k, s in enumerate(starts, start=1):
+        ab = a[s:] * b[s:]
+        b[s:] = ab / (first[s:] + k + ab)
+    out = np.empty_like(b)
+    out[order] = b
+    return out
+
+
+def erlang_b_array(traffic, channels):
+    """Vectorized :func:`erlang_b`; rows with invalid inputs are NaN."""
+    traffic, channels = np.broadcast_arrays(
+        np.asarray(traffic, dtype=float), np.asarray(channels, dtype=float)
+    )
+    shape = traffic.shape
+    traffic, channels = traffic.ravel(), np.trunc(channels.ravel())
+    out = np.full(traffic.shape, np.nan)
+    valid = np.isfinite(traffic) & np.isfinite(channels) & (traffic >= 0) & (channels >= 0)
+    idle = valid & (traffic == 0)
+    out[idle] = np.where(channels[idle] > 0, 0.0, 1.0)
+
+    busy = valid & (traffic > 0)
+    with np.errstate(invalid="ignore"):
+        negligible = busy & (channels > np.ceil(traffic + 20 * np.sqrt(traffic) + 100))
+    out[negligible] = 0.0
+    active = busy & ~negligible
+    if active.any():
+        out[active] = _recursion(traffic[active], channels[active])
+    return out.reshape(shape)
+
+
+def _channel_bracket(traffic, gos):
+    # Carried traffic A(1 - B) never exceeds N, so B(N) > gos below A(1 - gos); past
+    # _negligible_from(A) blocking is 0. The answer lies in (lo, hi].
+    return np.maximum(np.floor(traffic * (1 - gos)) - 1, 0), np.ceil(traffic + 20 * np.sqrt(traffic) + 100) + 1
+
+
+def channels_for(traffic, gos):
+    """Fewest channels N with B(traffic, N) <= gos."""
+    if not 0 < gos < 1:
+        raise ValueError("GoS must be between 0 and 1")
+    if traffic <= 0:
+        return 0
+    table = _table_for(gos)
+    if table is not None and traffic <= table[-1]:
+        # Capacity grows with N, so the first N whose capacity covers the traffic wins
+        return bisect_left(table, traffic)
+    lo, hi = (int(bound) for bound in _channel_bracket(traffic, gos))
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if erlang_b(traffic, mid) > gos:
+            lo = mid
+        else:
+            hi = mid
+    return hi
+
+
+def channels_for_array(traffic, gos):
+    """Vectorized :func:`channels_for`; rows with invalid inputs are NaN."""
+    traffic, gos = np.broadcast_arrays(np.asarray(traffic, dtype=float), np.asarray(gos, dtype=float))
+    shape = traffic.shape
+    traffic, gos = traffic.ravel(), gos.ravel()
+    out = np.full(traffic.shape, np.nan)
+    valid = np.isfinite(traffic) & (traffic >= 0) & (gos > 0) & (gos < 1)
+    out[valid & (traffic == 0)] = 0
+
+    pending = valid & (traffic > 0)
+    for target in np.unique(gos[pending]):
+        table = capacity_table(float(target))
+        lanes = pending & (gos == target) & (traffic <= table[-1])
+        out[lanes] = np.searchsorted(table, traffic[lanes], side="left")
+        pending &= ~lanes
+
+    if pending.any():
+        # Very large cells: bisect on N, every lane at once
+        a, g = traffic[pending], gos[pending]
+        lo, hi = _channel_bracket(a, g)
+        while np.any(hi - lo > 1):
+            mid = np.floor((lo + hi) / 2)
+            over = erlang_b_array(a, mid) > g
+            lo = np.where(over, mid, lo)
+            hi = np.where(over, hi, mid)
+        out[pending] = hi
+    return out.reshape(shape)
+
+
+def traffic_for(channels, gos):
+    """Largest offered traffic (Erlangs) that N channels carry with B <= gos."""
+    if not 0 < gos < 1:
+        raise ValueError("GoS must be between 0 and 1")
+    channels = int(channels)
+    if channels <= 0:
+        return 0.0
+    table = _table_for(gos)
+    if table is not None and channels <= TABLE_MAX_CHANNELS:
+        return float(table[channels])
+    return _traffic_for(channels, float(gos))
+
+
+@lru_cache(maxsize=4096)
+def _traffic_for(channels, gos):
+    # Off-table GoS or very large cells, solved once per (N, gos)
+    guess = None
+    if channels <= TABLE_MAX_CHANNELS:
+        guess = _interpolated(np.array([channels]), gos)
+    return float(_capacity(np.array([channels], dtype=float), gos, guess)[0])
+
+
+def traffic_for_array(channels, gos):
+    """Vectorized :func:`traffic_for`; rows with invalid inputs are NaN."""
+    channels, gos = np.broadcast_arrays(np.asarray(channels, dtype=float), np.asarray(gos, dtype=float))
+    shape = channels.shape
+    channels, gos = np.trunc(channels.ravel()), gos.ravel()
+    out = np.full(channels.shape, np.nan)
+    valid = np.isfinite(channels) & (gos > 0) & (gos < 1)
+    out[valid & (channels <= 0)] = 0.0
+    pending = valid & (channels > 0)
+    for target in np.unique(gos[pending]):
+        target = float(target)
+        lanes = pending & (gos == target)
+        small = lanes & (channels <= TABLE_MAX_CHANNELS)
+        if small.any():
+            out[small] = capacity_table(target)[channels[small].astype(int)]
+        lanes &= ~small
+        if lanes.any():
+            # Rows repeat channel counts, so each distinct count is solved once
+            counts, index = np.unique(channels[lanes], return_inverse=True)
+            out[lanes] = _capacity(counts, target)[index]
+    return out.reshape(shape)
+
+
+def _interpolated(channels, gos):
+    # Capacity from the neighbouring common tables, interpolated in log(GoS); None outside them
+    if not COMMON_GOS[0] < gos < COMMON_GOS[-1]:
+        return None
+    upper = bisect_left(COMMON_GOS, gos)
+    lo_gos, hi_gos = COMMON_GOS[upper - 1], COMMON_GOS[upper]
+    weight = (math.log(gos) - math.log(lo_gos)) / (math.log(hi_gos) - math.log(lo_gos))
+    lo_cap = capacity_table(lo_gos)[channels]
+    hi_cap = capacity_table(hi_gos)[channels]
+    return lo_cap + weight * (hi_cap - lo_cap)
+
+
+def traffic_for_interpolated(channels, gos):
+    """Capacity for any GoS from the neighbouring tables, interpolated in log(GoS).
+
+    A cheap approximation for search pruning; :func:`traffic_for` is exact.
+    """
+    if not 0 < gos < 1:
+        raise ValueError("GoS must be between 0 and 1")
+    channels = int(channels)
+    if channels <= 0:
+        return 0.0
+    if channels > TABLE_MAX_CHANNELS or not COMMON_GOS[0] <= gos <= COMMON_GOS[-1]:
+        return traffic_for(channels, gos)
+    if gos in COMMON_GOS:
+        return float(capacity_table(gos)[channels])
+    return float(_interpolated(channels, gos))
+
+
+def _capacity(channels, gos, guess=None):
+    """Offered traffic at which each channel count hits ``gos`` exactly.
+
+    Newton on log B(A) (d/dA log B = N/A - 1 + B), kept inside a bisection bracket.
+    ``gos`` may be one target or one per lane; ``guess`` seeds the iteration.
+    """
+    # Carried traffic A(1 - B) never exceeds N, so the root lies below N / (1 - gos)
+    lo = np.zeros_like(channels)
+    hi = channels / (1 - gos) + 1
+    a = np.maximum(channels, 0.5) if guess is None else np.clip(guess, 1e-9, hi)
+    target = np.log(gos)
+    for _ in range(_SOLVER_STEPS):
+        b = _recursion(a, channels)
+        over = b > gos
+        hi = np.where(over, a, hi)
+        lo = np.where(over, lo, a)
+        slope = channels / a - 1 + b
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = a - (np.log(b) - target) / slope
+        # Converged lanes stay put: at the root the step lands on the bracket edge
+        done = np.abs(step - a) <= 1e-12 * np.maximum(a, 1)
+        if np.all(done):
+            break
+        inside = np.isfinite(step) & (step > lo) & (step < hi)
+        a = np.where(done, a, np.where(inside, step, (lo + hi) / 2))
+    # Report the feasible side of the bracket so B(table[N], N) <= gos holds exactly
+    return np.where(_recursion(a, channels) > gos, lo, a)
+
+
+# Tables for COMMON_GOS, filled by build_tables()
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def build_tables():
+    """Solve the capacity tables for every COMMON_GOS target at once; call at startup."""
+    with _tables_lock:
+        missing = [gos for gos in COMMON_GOS if gos not in _tables]
+        if not missing:
+            return
+        channels = np.arange(1, TABLE_MAX_CHANNELS + 1, dtype=float)
+        lanes = np.tile(channels, len(missing))
+        targets = np.repeat(missing, channels.size)
+        solved = _capacity(lanes, targets).reshape(len(missing), channels.size)
+        for gos, row in zip(missing, solved):
+            table = np.concatenate(([0.0], row))
+            table.setflags(write=False)
+            _tables[gos] = table
+
+
+def capacity_table(gos):
+    """Capacity in Erlangs for N = 0..TABLE_MAX_CHANNELS at ``gos`` (read-only, memoized).
+
+    Common targets come from :func:`build_tables`; the last OFF_TABLE_CACHE others are
+    solved on first use, seeded from the neighbouring common tables.
+    """
+    if gos in COMMON_GOS:
+        if gos not in _tables:
+            build_tables()
+        return _tables[gos]
+    return _off_table(gos)
+
+
+@lru_cache(maxsize=OFF_TABLE_CACHE)
+def _off_table(gos):
+    channels = np.arange(1, TABLE_MAX_CHANNELS + 1, dtype=float)
+    table = np.concatenate(([0.0], _capacity(channels, gos, _interpolated(channels.astype(int), gos))))
+    table.setflags(write=False)
+    return table
+
+
+def _table_for(gos):
+    return capacity_table(gos) if gos in COMMON_GOS else None
@@ -0,0 +1,218 @@
+# Deterministic explanations built from the calculation alone, served when Gemini misses its deadline
+
+NOTE = "_Quick summary generated locally; the AI explanation was not ready in time._"
+
+
+def _num(value, digits=4):
+    return f"{value:.{digits}g}" if isinstance(value, (int, float)) else str(value)
+
+
+def _rate(bps):
+    for factor, unit in ((1e9, "Gbps"), (1e6, "Mbps"), (1e3, "kbps")):
+        if abs(bps) >= factor:
+            return f"{bps / factor:.3g} {unit}"
+    return f"{bps:.3g} bps"
+
+
+def _watts(dbm):
+    watts = 10 ** ((dbm - 30) / 10)
+    if watts >= 1:
+        return f"{watts:.3g} W"
+    if watts >= 1e-3:
+        return f"{watts * 1e3:.3g} mW"
+    return f"{watts * 1e6:.3g} µW"
+
+
+def link_budget_summary(data, c):
+    return (
+        f"The receiver needs **{c['received_power_dbm']} dBm**: thermal noise at {c['temperature_K']} K over "
+        f"{_rate(c['bitrate_bps'])}, raised by the {c['noise_figure_db']} dB noise figure, the "
+        f"{c['eb_no_db']} dB Eb/N0 target and the {c['link_margin_db']} dB margin. Free-space loss over "
+        f"{c['distance_km']} km at {c['frequency_mhz']} MHz is **{c['fspl_db']} dB**"
+        f"{_model_loss(c)}. After "
+        f"{c['tx_gain_dbi'] + c['rx_gain_dbi']:.4g} dBi of antenna gain and {c['system_loss_db']} dB of system "
+        f"loss the transmitter must deliver **{c['transmit_power_dbm']} dBm** ({_watts(c['transmit_power_dbm'])})."
+    )
+
+
+def _model_loss(c):
+    if "path_loss_db" not in c:
+        return ""
+    return f"; the {c['propagation_model']} model, which sizes the transmitter, puts it at **{c['path_loss_db']} dB**"
+
+
+def link_budget_rules(data, c):
+    margin, pt = c["link_margin_db"], c["transmit_power_dbm"]
+    if margin < 3:
+        yield f"A link margin of {margin} dB is risky: ordinary fading swings exceed it and will drop the link."
+    elif margin > 20:
+        yield f"A {margin} dB margin is generous; trading some of it away lowers the required transmit power dB for dB."
+    if pt > 43:
+        yield f"{pt} dBm is beyond a typical macro base station (about 43 dBm); add antenna gain or shorten the hop."
+    elif pt > 30:
+        yield f"{pt} dBm exceeds the 1 W that handsets and most unlicensed radios may transmit."
+    elif pt < 0:
+        yield "The required power is below 1 mW, so even low-power radios close this link comfortably."
+    if c["eb_no_db"] < 4:
+        yield f"An Eb/N0 of {c['eb_no_db']} dB only works with strong channel coding."
+    if c["system_loss_db"] > 6:
+        yield f"{c['system_loss_db']} dB of system loss costs as much as {c['system_loss_db']} dB of extra path loss; check cables and connectors."
+    yield "Doubling the bit rate or the distance raises the required transmit power by about 3 dB and 6 dB respectively."
+
+
+def ofdm_summary(data, c):
+    return (
+        f"A {_num(c['bandwidth_khz'])} kHz resource block holds **{c['subcarriers_per_rb']} subcarriers** at "
+        f"{_num(c['subcarrier_spacing_khz'])} kHz spacing. With {c['modulation']} ({c['bits_per_re']} bits per "
+        f"resource element) one OFDM symbol carries {c['bits_per_ofdm_symbol']} bits, a block of "
+        f"{c['num_symbols_per_rb']} symbols carries {c['bits_per_rb']} bits, and {c['parallel_rbs']} parallel "
+        f"blocks carry {c['total_bits']} bits every {_num(c['rb_duration_sec'] * 1e3)} ms: a peak rate of "
+        f"**{_rate(c['max_data_rate_bps'])}** at **{c['spectral_efficiency_bps_per_hz']:.3g} bps/Hz**."
+    )
+
+
+def ofdm_rules(data, c):
+    bits = c["bits_per_re"]
+    if c["subcarriers_per_rb"] == 0:
+        yield "The subcarrier spacing is wider than the resource block, so no subcarrier fits and nothing is carried."
+    elif c["subcarrier_spacing_khz"] > 0 and c["bandwidth_khz"] % c["subcarrier_spacing_khz"]:
+        yield "The block bandwidth is not a whole number of subcarriers; the remainder is left unused."
+    if bits >= 6:
+        yield f"{bits} bits per symbol needs a high SNR (roughly 20 dB or more) and falls back to lower orders at the cell edge."
+    elif bits == 1:
+        yield "BPSK is the most robust choice but carries the fewest bits; use it for control or cell-edge users."
+    if c["spectral_efficiency_bps_per_hz"] > bits:
+        yield "Spectral efficiency exceeds the bits per symbol, so the symbols are shorter than 1/Δf allows; check the block duration."
+    if c.get("bler") is not None:
+        yield (
+            f"At Eb/N0 = {c['eb_n0_db']} dB ({c['channel']}) the simulated BER is {c['ber']:.2g} and "
+            f"{c['bler']:.1%} of OFDM symbols arrive with errors, so the effective rate is "
+            f"{_rate(c['effective_data_rate_bps'])}."
+        )
+    yield "The rate scales linearly with modulation bits, symbols per block and parallel blocks."
+
+
+def wireless_comm_summary(data, c):
+    return (
+        f"The sampler produces **{c['sampler_rate_bps']:.4g} samples/s**, and {data.get('quantBits')}-bit quantization "
+        f"turns them into {_rate(c['quantizer_rate_bps'])}. The source encoder compresses this to "
+        f"{_rate(c['source_encoder_rate_bps'])}, channel coding expands it to "
+        f"{_rate(c['channel_encoder_rate_bps'])}, the interleaver gives {_rate(c['interleaver_rate_bps'])} and "
+        f"burst formatting ends at **{_rate(c['burst_formatter_rate_bps'])}**."
+    )
+
+
+def wireless_comm_rules(data, c):
+    try:
+        bits = int(data.get("quantBits"))
+        yield f"{bits} quantization bits give an SQNR of about {6.02 * bits + 1.76:.1f} dB."
+        if bits < 8:
+            yield "Fewer than 8 bits per sample is coarse for voice; expect audible quantization noise."
+    except (TypeError, ValueError):
+        pass
+    try:
+        bandwidth_hz = float(data.get("bandwidth")) * 1e3
+        if c["sampler_rate_bps"] < 2 * bandwidth_hz:
+            yield "The sampling rate is below twice the bandwidth (Nyquist), so the signal will alias."
+    except (TypeError, ValueError):
+        pass
+    source = c["source_encoder_rate_bps"]
+    if source > 0:
+        overhead = c["burst_formatter_rate_bps"] / source
+        if overhead >= 2:
+            yield f"Coding, interleaving and framing multiply the compressed rate by {overhead:.3g}; at least half of the transmitted bits are redundancy."
+    yield "Each block scales the rate by its factor, so the final rate is the sampler rate times the product of all factors."
+
+
+def cellular_summary(data, c):
+    text = (
+        f"{_num(c['area_km2'])} km² is covered by **{c['num_cells']} cells** of {c['cell_area_km2']:.3g} km². "
+        f"A reuse factor of {c['reuse_factor']} leaves **{c['channels_per_cell']} channels per cell**, which must "
+        f"carry {c['traffic_per_cell_erlangs']} Erlangs each ({c['total_traffic_erlangs']} Erlangs network-wide)."
+    )
+    if "max_path_loss_db" in c:
+        text += (
+            f" The {c['cell_radius_km']:.3g} km radius is the {c['propagation_model']} range for "
+            f"{c['max_path_loss_db']} dB of path loss at {c['frequency_mhz']} MHz."
+        )
+    if c.get("meets_gos") is not None:
+        text += (
+            f" Erlang-B needs {c['channels_required_per_cell']} channels for GoS {c['gos']}; the available channels "
+            f"block {c['blocking_probability']:.3g} of calls and carry at most {c['max_traffic_per_cell_erlangs']} Erlangs."
+        )
+    return text
+
+
+def cellular_rules(data, c):
+    meets = c.get("meets_gos")
+    if c["channels_per_cell"] == 0:
+        yield "No channel fits in a cell: lower the reuse factor or use narrower channels."
+    elif meets is False:
+        yield (
+            f"The design **fails its GoS**: it needs {c['channels_required_per_cell']} channels per cell but has "
+            f"{c['channels_per_cell']}. Shrink the cells, lower the reuse factor or narrow the channels."
+        )
+    elif meets:
+        capacity = c["max_traffic_per_cell_erlangs"] or 0
+        load = c["traffic_per_cell_erlangs"] / capacity if capacity else 0
+        if load > 0.9:
+            yield f"Cells run at {load:.0%} of their GoS capacity, so there is little headroom for growth."
+        elif load < 0.5:
+            yield f"Cells use only {load:.0%} of their capacity; larger cells would need fewer sites."
+    if c["reuse_factor"] < 3:
+        yield f"A reuse factor of {c['reuse_factor']} puts co-channel cells close together; expect strong interference."
+    elif c["reuse_factor"] > 12:
+        yield f"A reuse factor of {c['reuse_factor']} wastes spectrum; each cell gets only 1/{c['reuse_factor']} of the channels."
+    yield "Halving the cell radius quadruples the number of cells and the capacity per km²."
+
+
+def sweep_summary(data, c):
+    lines = [f"The sweep evaluated {c.get('rows', 0)} designs ({c.get('failed_rows', 0)} invalid)."]
+    for name, extreme in (c.get("extrema") or {}).items():
+        lines.append(f"- **{name}** ranges from {_num(extreme['min'])} to {_num(extreme['max'])}.")
+    return "\n".join(lines)
+
+
+def sweep_rules(data, c):
+    for limit in c.get("limits") or []:
+        values = [curve[limit["axis"]] for curve in limit["curves"] if curve.get(limit["axis"]) is not None]
+        bound = limit["at_most"] if limit["at_most"] is not None else limit["at_least"]
+        relation = "at most" if limit["at_most"] is not None else "at least"
+        if not values:
+            yield f"No design keeps {limit['output']} {relation} {bound}."
+        else:
+            yield (
+                f"Keeping {limit['output']} {relation} {bound}, the {limit['find']} {limit['axis']} per curve lies "
+                f"between {_num(min(values))} and {_num(max(values))}."
+            )
+
+
+TEMPLATES = {
+    "link_budget": (link_budget_summary, link_budget_rules),
+    "ofdm": (ofdm_summary, ofdm_rules),
+    "wireless_comm": (wireless_comm_summary, wireless_comm_rules),
+    "cellular": (cellular_summary, cellular_rules),
+    "sweep": (sweep_summary, sweep_rules),
+}
+
+
+def local_explanation(scenario, data, calculation):
+    """Markdown explanation from a per-scenario template plus rule-based commentary.
+
+    Pure and deterministic; anything the templates cannot read degrades to a generic note.
+    """
+    kind = "sweep" if str(scenario).startswith("sweep:") else scenario
+    templates = TEMPLATES.get(kind)
+    data = data if isinstance(data, dict) else {}
+    try:
+        if templates is None:
+            raise KeyError(kind)
+        summary, rules = templates
+        parts = [summary(data, calculation)]
+        notes = list(rules(data, calculation))
+    except (KeyError, TypeError, ValueError, ZeroDivisionError, OverflowError):
+        parts, notes = ["The calculation finished; see the results table for the computed values."], []
+    if notes:
+        parts.append("\n".join(f"- {note}" for note in notes))
+    parts.append(NOTE)
+    return "\n\n".join(parts)
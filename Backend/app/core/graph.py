@@ -0,0 +1,435 @@
+import inspect
+import math
+
+from app.core.batch import BOLTZMANN, MODULATION_BITS_PER_SYMBOL, safe_float, safe_int
+from app.core.ber import ofdm_error_outputs
+from app.core.erlang import channels_for, erlang_b, traffic_for
+from app.core.propagation import DEFAULT_MODEL, PARAMETERS, PropagationError, parse_model
+
+
+class GraphError(ValueError):
+    pass
+
+
+class Failed:
+    """Value of a node whose function raised; every node downstream shares it."""
+
+    __slots__ = ("message",)
+
+    def __init__(self, message):
+        self.message = message
+
+    def __eq__(self, other):
+        return isinstance(other, Failed) and other.message == self.message
+
+    def __hash__(self):
+        return hash(self.message)
+
+
+# Value of an output the calculator leaves out of its result for the current inputs
+ABSENT = object()
+
+
+def _same(a, b):
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    return type(a) is type(b) and a == b
+
+
+class Graph:
+    """A calculator as inputs -> intermediates -> outputs.
+
+    Node dependencies are the parameter names of the node's function, so
+    ``graph.node("fspl", lambda distance_km, frequency_mhz: ...)`` depends on exactly
+    those two. Outputs live in their own namespace and may reuse input names.
+    """
+
+    def __init__(self, scenario, inputs, check=None):
+        self.scenario = scenario
+        self.inputs = dict(inputs)  # name -> default raw value
+        self.check = check          # node holding a validation message or None
+        self.funcs = {}
+        self.deps = {}
+        self.order = []
+        self.outputs = []
+        self.dependents = {name: [] for name in self.inputs}
+
+    def _add(self, key, func):
+        deps = tuple(inspect.signature(func).parameters)
+        missing = [d for d in deps if d not in self.dependents]
+        if missing:
+            raise GraphError(f"{key} depends on undefined {missing}")
+        self.funcs[key] = func
+        self.deps[key] = deps
+        self.order.append(key)  # added after their dependencies, so this is topological
+        self.dependents[key] = []
+        for dep in deps:
+            self.dependents[dep].append(key)
+
+    def node(self, name, func):
+        if name in self.dependents:
+            raise GraphError(f"{name} is already defined")
+        self._add(name, func)
+        return self
+
+    def output(self, name, func):
+        self._add("out:" + name, func)
+        self.outputs.append(name)
+        return self
+
+    def compute(self, key, values):
+        args = [values[dep] for dep in self.deps[key]]
+        for arg in args:
+            if isinstance(arg, Failed):
+                return arg
+        try:
+            return self.funcs[key](*args)
+        except Exception as e:
+            return Failed(f"Unexpected error: {e}")
+
+
+class GraphState:
+    """Node values of one graph, kept current by recomputing only what an update touches."""
+
+    def __init__(self, graph, data=None):
+        self.graph = graph
+        self.values = dict(graph.inputs)
+        self.given = set()
+        for name, value in (data or {}).items():
+            if name in graph.inputs:
+                self.values[name] = value
+                self.given.add(name)
+        for key in graph.order:
+            self.values[key] = graph.compute(key, self.values)
+
+    def data(self):
+        """The inputs the client has set, as a calculator would receive them."""
+        return {name: self.values[name] for name in self.graph.inputs if name in self.given}
+
+    def error(self):
+        """Validation message, or the first failure among the outputs, else None."""
+        if self.graph.check is not None and self.values[self.graph.check] is not None:
+            check = self.values[self.graph.check]
+            return check.message if isinstance(check, Failed) else check
+        for name in self.graph.outputs:
+            value = self.values["out:" + name]
+            if isinstance(value, Failed):
+                return value.message
+        return None
+
+    def outputs(self):
+        values = ((name, self.values["out:" + name]) for name in self.graph.outputs)
+        return {name: value for name, value in values if value is not ABSENT}
+
+    def update(self, delta):
+        """Apply new input values; returns (changed outputs, number of nodes recomputed).
+
+        Propagation stops at any node whose recomputed value is unchanged.
+        """
+        unknown = [name for name in delta if name not in self.graph.inputs]
+        if unknown:
+            raise GraphError(f"Unknown inputs for {self.graph.scenario}: {', '.join(map(str, unknown))}")
+        dirty = set()
+        self.given.update(delta)
+        for name, value in delta.items():
+            if not _same(self.values[name], value):
+                self.values[name] = value
+                dirty.update(self.graph.dependents[name])
+        changed = {}
+        recomputed = 0
+        if not dirty:
+            return changed, recomputed
+        for key in self.graph.order:
+            if key not in dirty:
+                continue
+            recomputed += 1
+            value = self.graph.compute(key, self.values)
+            if _same(self.values[key], value):
+                continue
+            self.values[key] = value
+            dirty.update(self.graph.dependents[key])
+            if key.startswith("out:"):
+                # An output that disappears is reported as null
+                changed[key[4:]] = None if value is ABSENT else value
+        return changed, recomputed
+
+
+def evaluate(graph, data):
+    """One-off calculation: the outputs for ``data``, or ``{"error": message}``."""
+    state = GraphState(graph, data)
+    error = state.error()
+    return {"error": error} if error else state.outputs()
+
+
+# --------------------------------------------------------------------------- scenario graphs
+# These graphs are the scalar calculators: /calculate evaluates them once through
+# evaluate(), live sessions keep a GraphState current. batch.py is the vectorized
+# counterpart and matches their defaults, validation messages and operation order.
+
+
+def _db_to_linear(db):
+    return 10 ** (db / 10)
+
+
+def _pick(key):
+    return lambda errors: errors[key] if errors else ABSENT
+
+
+# Propagation inputs shared by the link budget and cellular graphs
+_PROPAGATION_INPUTS = dict.fromkeys(("propagation_model",) + PARAMETERS)
+
+
+def _propagation(default):
+    def model(propagation_model, tx_height_m, rx_height_m, environment, path_loss_exponent,
+              reference_distance_km, shadowing_sigma_db, location_reliability):
+        data = {
+            "propagation_model": propagation_model, "tx_height_m": tx_height_m, "rx_height_m": rx_height_m,
+            "environment": environment, "path_loss_exponent": path_loss_exponent,
+            "reference_distance_km": reference_distance_km, "shadowing_sigma_db": shadowing_sigma_db,
+            "location_reliability": location_reliability,
+        }
+        try:
+            return parse_model(data, default)
+        except PropagationError as e:
+            return e
+    return model
+
+
+def _model_error(model, frequency_mhz):
+    if isinstance(model, PropagationError):
+        return str(model)
+    if model is not None and model.invalid_frequency(frequency_mhz):
+        return model.frequency_message()
+    return None
+
+
+def link_budget_graph():
+    g = Graph("link_budget", {
+        "link_margin_db": 0, "temperature_k": 290, "noise_figure_db": 0, "bitrate": 1e6, "eb_n0_db": 0,
+        "distance": 1, "frequency": 2400, "tx_gain": 0, "rx_gain": 0, "system_loss_db": 0,
+        **_PROPAGATION_INPUTS,
+    }, check="error")
+    g.node("margin", lambda link_margin_db: float(link_margin_db))
+    g.node("temperature", lambda temperature_k: float(temperature_k))
+    g.node("noise_figure", lambda noise_figure_db: float(noise_figure_db))
+    g.node("rate", lambda bitrate: float(bitrate))
+    g.node("eb_no", lambda eb_n0_db: float(eb_n0_db))
+    g.node("distance_km", lambda distance: float(distance))
+    g.node("frequency_mhz", lambda frequency: float(frequency))
+    g.node("gain_tx", lambda tx_gain: float(tx_gain))
+    g.node("gain_rx", lambda rx_gain: float(rx_gain))
+    g.node("loss", lambda system_loss_db: float(system_loss_db))
+    g.node("model", _propagation(None))
+    g.node("error", _model_error)
+    g.node("pr_watts", lambda margin, temperature, noise_figure, rate, eb_no: (
+        _db_to_linear(margin) * BOLTZMANN * temperature * _db_to_linear(noise_figure) * rate * _db_to_linear(eb_no)
+    ))
+    g.node("pr_dbm", lambda pr_watts: 10 * math.log10(pr_watts) + 30)
+    g.node("fspl", lambda distance_km, frequency_mhz: (
+        32.45 + 20 * math.log10(distance_km) + 20 * math.log10(frequency_mhz)
+    ))
+    g.node("path_loss", lambda model, fspl, distance_km, frequency_mhz: (
+        fspl if model is None else model.path_loss_db(distance_km, frequency_mhz)
+    ))
+    g.node("pt_dbm", lambda pr_dbm, path_loss, loss, gain_tx, gain_rx: (
+        pr_dbm + path_loss + loss - gain_tx - gain_rx
+    ))
+    g.output("received_power_dbm", lambda pr_dbm: round(pr_dbm, 2))
+    g.output("transmit_power_dbm", lambda pt_dbm: round(pt_dbm, 2))
+    g.output("fspl_db", lambda fspl: round(fspl, 2))
+    g.output("link_margin_db", lambda margin: round(margin, 2))
+    g.output("noise_figure_db", lambda noise_figure: round(noise_figure, 2))
+    g.output("bitrate_bps", lambda rate: round(rate))
+    g.output("eb_no_db", lambda eb_no: round(eb_no, 2))
+    g.output("temperature_K", lambda temperature: round(temperature))
+    g.output("distance_km", lambda distance_km: round(distance_km, 2))
+    g.output("frequency_mhz", lambda frequency_mhz: round(frequency_mhz, 2))
+    g.output("tx_gain_dbi", lambda gain_tx: round(gain_tx, 2))
+    g.output("rx_gain_dbi", lambda gain_rx: round(gain_rx, 2))
+    g.output("system_loss_db", lambda loss: round(loss, 2))
+    g.output("propagation_model", lambda model: ABSENT if model is None else model.name)
+    g.output("path_loss_db", lambda model, path_loss: ABSENT if model is None else round(path_loss, 2))
+    return g
+
+
+def ofdm_graph():
+    g = Graph("ofdm", {
+        "bandwidth": 0, "subcarrierSpacing": 0, "modulation": "QAM", "numSymbols": 0,
+        "duration_of_RB": 0, "parallelRB": 0, "eb_n0_db": None, "channel": None,
+    })
+    g.node("bandwidth_khz", lambda bandwidth: float(bandwidth))
+    g.node("spacing_khz", lambda subcarrierSpacing: float(subcarrierSpacing))
+    g.node("modulation_name", lambda modulation: str(modulation))
+    g.node("symbols", lambda numSymbols: int(numSymbols))
+    g.node("rb_duration_us", lambda duration_of_RB: float(duration_of_RB))
+    g.node("rbs", lambda parallelRB: int(parallelRB))
+    g.node("bits", lambda modulation_name: MODULATION_BITS_PER_SYMBOL.get(modulation_name, 2))
+    g.node("rb_bandwidth_hz", lambda bandwidth_khz: bandwidth_khz * 1e3)
+    g.node("spacing_hz", lambda spacing_khz: spacing_khz * 1e3)
+    g.node("subcarriers", lambda rb_bandwidth_hz, spacing_hz: (
+        int(rb_bandwidth_hz // spacing_hz) if spacing_hz > 0 else 0
+    ))
+    g.node("bits_per_symbol", lambda subcarriers, bits: subcarriers * bits)
+    g.node("bits_per_block", lambda bits_per_symbol, symbols: bits_per_symbol * symbols)
+    g.node("bits_total", lambda bits_per_block, rbs: bits_per_block * rbs)
+    g.node("duration_s", lambda rb_duration_us: rb_duration_us * 1e-3 if rb_duration_us > 0 else 1)
+    g.node("bandwidth_total", lambda rb_bandwidth_hz, rbs: rb_bandwidth_hz * rbs)
+    g.output("bandwidth_khz", lambda bandwidth_khz: bandwidth_khz)
+    g.output("subcarrier_spacing_khz", lambda spacing_khz: spacing_khz)
+    g.output("modulation", lambda modulation_name: modulation_name)
+    g.output("modulation_bits_per_symbol", lambda bits: bits)
+    g.output("num_symbols_per_rb", lambda symbols: symbols)
+    g.output("rb_duration_us", lambda rb_duration_us: rb_duration_us)
+    g.output("parallel_rbs", lambda rbs: rbs)
+    g.output("subcarriers_per_rb", lambda subcarriers: subcarriers)
+    g.output("bits_per_re", lambda bits: bits)
+    g.output("bits_per_ofdm_symbol", lambda bits_per_symbol: bits_per_symbol)
+    g.output("bits_per_rb", lambda bits_per_block: bits_per_block)
+    g.output("total_bits", lambda bits_total: bits_total)
+    g.output("rb_duration_sec", lambda duration_s: duration_s)
+    g.output("max_data_rate_bps", lambda bits_total, duration_s: bits_total / duration_s)
+    g.output("total_bandwidth_hz", lambda bandwidth_total: bandwidth_total)
+    g.output("spectral_efficiency_bps_per_hz", lambda bits_total, bandwidth_total, duration_s: (
+        bits_total / (bandwidth_total * duration_s) if bandwidth_total > 0 else 0
+    ))
+    g.node("peak_bps", lambda bits_total, duration_s: bits_total / duration_s)
+    g.node("errors", lambda modulation_name, subcarriers, eb_n0_db, channel, peak_bps: (
+        ofdm_error_outputs(modulation_name, subcarriers, safe_float(eb_n0_db, None), channel, peak_bps)
+    ))
+    for name in ("eb_n0_db", "channel", "ber", "bler", "effective_data_rate_bps"):
+        g.output(name, _pick(name))
+    return g
+
+
+def _wireless_check(bandwidth_khz, sampling_rate, quant_bits, source_rate, channel_rate, interleaver, burst):
+    if bandwidth_khz <= 0:
+        return "Bandwidth must be greater than 0."
+    if sampling_rate <= 0:
+        return "Sampling rate must be greater than 0."
+    if not (1 <= quant_bits <= 32):
+        return "Quantization bits must be between 1 and 32."
+    if not (0 < source_rate <= 1):
+        return "Source encoder rate must be between 0 and 1."
+    if not (0 < channel_rate <= 1):
+        return "Channel encoder rate must be between 0 and 1."
+    if interleaver < 1:
+        return "Interleaver rate must be ≥ 1."
+    if burst <= 0:
+        return "Burst length must be > 0."
+    return None
+
+
+def wireless_comm_graph():
+    g = Graph("wireless_comm", {
+        "bandwidth": None, "samplingRate": None, "quantBits": None, "sourceEncoderRate": None,
+        "channelEncoderRate": None, "interleaverRate": None, "burstLength": None,
+    }, check="error")
+    g.node("bandwidth_khz", lambda bandwidth: safe_float(bandwidth))
+    g.node("sampling_rate", lambda samplingRate, bandwidth_khz: safe_float(samplingRate, 2 * (bandwidth_khz * 1e3)))
+    g.node("quant_bits", lambda quantBits: safe_int(quantBits))
+    g.node("source_rate", lambda sourceEncoderRate: safe_float(sourceEncoderRate))
+    g.node("channel_rate", lambda channelEncoderRate: safe_float(channelEncoderRate))
+    g.node("interleaver", lambda interleaverRate: safe_float(interleaverRate, 1))
+    g.node("burst", lambda burstLength: safe_float(burstLength))
+    g.node("error", _wireless_check)
+    g.node("sampler_bps", lambda sampling_rate: sampling_rate)
+    g.node("quantizer_bps", lambda sampler_bps, quant_bits: sampler_bps * quant_bits)
+    g.node("source_bps", lambda quantizer_bps, source_rate: quantizer_bps * source_rate)
+    g.node("channel_bps", lambda source_bps, channel_rate: source_bps / channel_rate)
+    g.node("interleaver_bps", lambda channel_bps, interleaver: channel_bps * interleaver)
+    g.output("sampler_rate_bps", lambda sampler_bps: sampler_bps)
+    g.output("quantizer_rate_bps", lambda quantizer_bps: quantizer_bps)
+    g.output("source_encoder_rate_bps", lambda source_bps: source_bps)
+    g.output("channel_encoder_rate_bps", lambda channel_bps: channel_bps)
+    g.output("interleaver_rate_bps", lambda interleaver_bps: interleaver_bps)
+    g.output("burst_formatter_rate_bps", lambda interleaver_bps, burst: interleaver_bps * burst)
+    return g
+
+
+def _max_loss(max_path_loss_db):
+    # Left out (None or ""), the radius input is used; given, it has to be a number
+    if max_path_loss_db is None or max_path_loss_db == "":
+        return None
+    return safe_float(max_path_loss_db, math.nan)
+
+
+def _cellular_check(max_loss, model, frequency_mhz):
+    if max_loss is None:
+        return None
+    if math.isnan(max_loss):
+        return "Maximum path loss must be a number."
+    return _model_error(model, frequency_mhz)
+
+
+def cellular_graph():
+    g = Graph("cellular", {
+        "area": None, "cell_radius": None, "reuse_factor": None, "bandwidth": None, "channel_bandwidth": None,
+        "spectral_efficiency": None, "subscribers": None, "calls_per_day": None, "call_duration": None, "gos": None,
+        "max_path_loss_db": None, "frequency": None, **_PROPAGATION_INPUTS,
+    }, check="error")
+    g.node("area_km2", lambda area: safe_float(area))
+    g.node("max_loss", _max_loss)
+    g.node("frequency_mhz", lambda frequency: safe_float(frequency))
+    g.node("model", _propagation(DEFAULT_MODEL))
+    g.node("error", _cellular_check)
+    g.node("radius_km", lambda cell_radius, max_loss, model, frequency_mhz: (
+        safe_float(cell_radius) if max_loss is None else model.max_range_km(max_loss, frequency_mhz)
+    ))
+    g.node("reuse", lambda reuse_factor: safe_int(reuse_factor, 1))
+    g.node("bandwidth_mhz", lambda bandwidth: safe_float(bandwidth))
+    g.node("channel_mhz", lambda channel_bandwidth: safe_float(channel_bandwidth))
+    g.node("efficiency", lambda spectral_efficiency: safe_float(spectral_efficiency))
+    g.node("users", lambda subscribers: safe_int(subscribers))
+    g.node("calls", lambda calls_per_day: safe_float(calls_per_day))
+    g.node("duration_min", lambda call_duration: safe_float(call_duration))
+    g.node("target_gos", lambda gos: safe_float(gos))
+    g.node("cell_area", lambda radius_km: (3 * math.sqrt(3) / 2) * (radius_km ** 2))
+    g.node("cells", lambda area_km2, cell_area: area_km2 / cell_area)
+    g.node("bandwidth_hz", lambda bandwidth_mhz: bandwidth_mhz * 1e6)
+    g.node("channel_hz", lambda channel_mhz: channel_mhz * 1e6)
+    g.node("channels", lambda bandwidth_hz, reuse, channel_hz: (
+        bandwidth_hz / (reuse * channel_hz) if channel_hz > 0 else 0
+    ))
+    g.node("erlang_user", lambda calls, duration_min: (calls * (duration_min * 60)) / 86400)
+    g.node("traffic", lambda erlang_user, users: erlang_user * users)
+    g.node("traffic_cell", lambda traffic, cells: traffic / cells if cells > 0 else 0)
+    g.node("blocking", lambda traffic_cell, channels: erlang_b(traffic_cell, max(int(channels), 0)))
+    g.node("gos_valid", lambda target_gos: 0 < target_gos < 1)
+    g.output("area_km2", lambda area_km2: area_km2)
+    g.output("cell_radius_km", lambda radius_km: radius_km)
+    g.output("cell_area_km2", lambda cell_area: cell_area)
+    g.output("num_cells", lambda cells: int(cells))
+    g.output("reuse_factor", lambda reuse: reuse)
+    g.output("bandwidth_mhz", lambda bandwidth_mhz: bandwidth_mhz)
+    g.output("channel_bandwidth_mhz", lambda channel_mhz: channel_mhz)
+    g.output("channels_per_cell", lambda channels: int(channels))
+    g.output("total_channels", lambda cells, channels: int(cells * channels))
+    g.output("spectral_efficiency_bps_per_hz", lambda efficiency: efficiency)
+    g.output("network_capacity_bps", lambda bandwidth_hz, efficiency: int(bandwidth_hz * efficiency))
+    g.output("subscribers", lambda users: users)
+    g.output("calls_per_day", lambda calls: calls)
+    g.output("call_duration_min", lambda duration_min: duration_min)
+    g.output("gos", lambda target_gos: target_gos)
+    g.output("traffic_per_cell_erlangs", lambda traffic_cell: round(traffic_cell, 2))
+    g.output("total_traffic_erlangs", lambda traffic: round(traffic, 2))
+    g.output("erlang_per_user", lambda erlang_user: round(erlang_user, 4))
+    g.output("channels_required_per_cell", lambda gos_valid, traffic_cell, target_gos: (
+        channels_for(traffic_cell, target_gos) if gos_valid else None
+    ))
+    g.output("blocking_probability", lambda blocking: blocking)
+    g.output("max_traffic_per_cell_erlangs", lambda gos_valid, channels, target_gos: (
+        round(traffic_for(int(channels), target_gos), 2) if gos_valid else None
+    ))
+    g.output("meets_gos", lambda gos_valid, blocking, target_gos: blocking <= target_gos if gos_valid else None)
+    g.output("max_path_loss_db", lambda max_loss: ABSENT if max_loss is None else max_loss)
+    g.output("propagation_model", lambda max_loss, model: ABSENT if max_loss is None else model.name)
+    g.output("frequency_mhz", lambda max_loss, frequency_mhz: ABSENT if max_loss is None else frequency_mhz)
+    return g
+
+
+GRAPHS = {
+    "link_budget": link_budget_graph(),
+    "ofdm": ofdm_graph(),
+    "wireless_comm": wireless_comm_graph(),
+    "cellular": cellular_graph(),
+}
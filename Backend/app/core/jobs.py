@@ -0,0 +1,483 @@
+import heapq
+import itertools
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app.core import config
+from app.core.batch import calculate_batch
+from app.core.ber import SimulationPlan, simulate
+from app.core.chain import ChainError, run_chain
+from app.core.coverage import CoverageError, CoverageRaster, CoverageSpec
+from app.core.metrics import JOBS
+from app.core.planner import CellularPlan, optimize
+from app.core.sweep import SweepPlan, SweepSummary, run_sweep
+from app.core.sweep import validate as validate_sweep
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobError(ValueError):
+    pass
+
+
+class QueueFull(RuntimeError):
+    pass
+
+
+class Cancelled(Exception):
+    pass
+
+
+# --------------------------------------------------------------------------- worker side
+# Set in each pool process by _init_worker: the progress queue back to the API process and
+# one cancel cell per pool slot, holding the number of the job to stop.
+_progress = None
+_cancel = None
+
+
+def _init_worker(progress, cancel):
+    global _progress, _cancel
+    _progress, _cancel = progress, cancel
+
+
+class Progress:
+    """Handed to a job runner; ``report`` sends progress home and raises Cancelled when asked to stop."""
+
+    def __init__(self, job_id, number, slot, interval):
+        self.job_id = job_id
+        self.number = number
+        self.slot = slot
+        self.interval = interval
+        self._sent = 0.0
+        self.total = None
+
+    def cancelled(self):
+        return _cancel is not None and _cancel[self.slot] == self.number
+
+    def report(self, done, total, partial=None):
+        if self.cancelled():
+            raise Cancelled()
+        self.total = total
+        now = time.monotonic()
+        # Throttled, but the last step always goes out
+        if _progress is not None and (done >= total or now - self._sent >= self.interval):
+            self._sent = now
+            _progress.put((self.job_id, done, total, partial))
+
+
+def _execute(run, payload, job_id, number, slot, interval):
+    progress = Progress(job_id, number, slot, interval)
+    try:
+        body, media_type = run(payload, progress)
+    except Cancelled:
+        return CANCELLED, None, None, None
+    except Exception as e:
+        return FAILED, f"{type(e).__name__}: {e}", None, None
+    # The total travels with the result: the last progress message may still be queued
+    return DONE, body, media_type, progress.total
+
+
+def _json(doc):
+    return json.dumps(doc).encode(), "application/json"
+
+
+# --------------------------------------------------------------------------- job kinds
+# Each kind has a check, run in the API process so bad payloads fail with a 400 before
+# they are queued, and a runner executed in a pool process that returns (bytes, media type).
+
+
+def check_sweep(payload):
+    plan = SweepPlan.parse(payload)
+    validate_sweep(plan)
+    SweepSummary(plan)
+
+
+def run_sweep_job(payload, progress):
+    plan = SweepPlan.parse(payload)
+    summary = SweepSummary(plan)
+    chunk_rows = int(payload.get("chunk_rows") or config.SWEEP_CHUNK_ROWS)
+    progress.report(0, plan.total)
+    # This process is already a pool worker, so the sweep runs serially inside it
+    for chunk in run_sweep(plan, chunk_rows, parallel=False):
+        summary.update(chunk)
+        progress.report(chunk["stop"], plan.total, summary.to_dict())
+    return _json({"scenario": plan.scenario, "total": plan.total, **summary.to_dict()})
+
+
+def check_plan(payload):
+    CellularPlan.parse(payload)
+
+
+def run_plan_job(payload, progress):
+    plan = CellularPlan.parse(payload)
+    progress.report(0, 1)
+    result = optimize(plan, parallel=False)
+    progress.report(1, 1)
+    return _json(result)
+
+
+def check_coverage(payload):
+    CoverageSpec.parse(payload)
+    if payload.get("format", "png") not in ("png", "npz"):
+        raise CoverageError("format must be 'png' or 'npz'")
+
+
+def run_coverage_job(payload, progress):
+    raster = CoverageRaster(CoverageSpec.parse(payload))
+    progress.report(0, 1)
+    raster.compute()
+    progress.report(1, 1)
+    if payload.get("format", "png") == "npz":
+        return raster.npz(), "application/octet-stream"
+    vmin, vmax = (None if payload.get(k) is None else float(payload[k]) for k in ("vmin", "vmax"))
+    image, _ = raster.png(payload.get("layer", "power"), vmin, vmax)
+    return image, "image/png"
+
+
+def check_batch(payload):
+    if not isinstance(payload.get("data"), dict):
+        raise JobError("batch payload needs a data object of columns")
+
+
+def run_batch_job(payload, progress):
+    progress.report(0, 1)
+    result = calculate_batch(payload.get("scenario"), payload.get("data"), config.BATCH_MAX_ROWS)
+    progress.report(1, 1)
+    return _json(result.to_columns())
+
+
+def check_ber(payload):
+    SimulationPlan.parse(payload)
+
+
+def run_ber_job(payload, progress):
+    plan = SimulationPlan.parse(payload)
+    progress.report(0, len(plan.points))
+    # One point at a time inside this worker, reporting the curve so far
+    doc, _ = simulate(plan, parallel=False, progress=lambda done, total, points: progress.report(
+        done, total, {"points": points}
+    ))
+    return _json(doc)
+
+
+def check_chain(payload):
+    if not isinstance(payload.get("data"), dict):
+        raise ChainError("chain payload needs a data object of wireless_comm inputs")
+
+
+def run_chain_job(payload, progress):
+    progress.report(0, 1)
+    result = run_chain(payload["data"], payload.get("samples"), payload.get("buffer_samples"))
+    progress.report(1, 1)
+    return _json(result)
+
+
+KINDS = {
+    "sweep": (check_sweep, run_sweep_job),
+    "plan": (check_plan, run_plan_job),
+    "coverage": (check_coverage, run_coverage_job),
+    "batch": (check_batch, run_batch_job),
+    "ber": (check_ber, run_ber_job),
+    "chain": (check_chain, run_chain_job),
+}
+
+
+# --------------------------------------------------------------------------- API side
+
+
+class ResultStore:
+    """Finished job results, evicted oldest first once they exceed ``max_bytes`` in total."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, key, body, media_type):
+        with self._lock:
+            if key in self._data:
+                self.size -= len(self._data.pop(key)[0])
+            if len(body) > self.max_bytes:
+                # Would evict everything and still not fit
+                self.evictions += 1
+                return False
+            self._data[key] = (body, media_type)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (old, _) = self._data.popitem(last=False)
+                self.size -= len(old)
+                self.evictions += 1
+            return True
+
+    def get(self, key):
+        with self._lock:
+            return self._data.get(key)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def stats(self):
+        with self._lock:
+            return {"results": len(self._data), "bytes": self.size, "max_bytes": self.max_bytes, "evictions": self.evictions}
+
+
+class Job:
+    def __init__(self, number, kind, payload, priority):
+        self.id = uuid.uuid4().hex
+        self.number = number
+        self.kind = kind
+        self.payload = payload
+        self.priority = priority
+        self.state = QUEUED
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.done = 0
+        self.total = None
+        self.partial = None
+        self.error = None
+        self.media_type = None
+        self.slot = None
+        self.version = 0  # bumped on every visible change, for streams
+
+    def to_dict(self, store=None):
+        doc = {
+            "id": self.id,
+            "kind": self.kind,
+            "priority": self.priority,
+            "state": self.state,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "progress": {"done": self.done, "total": self.total},
+        }
+        if self.partial is not None and self.state == RUNNING:
+            doc["partial"] = self.partial
+        if self.error:
+            doc["error"] = self.error
+        if self.state == DONE:
+            doc["media_type"] = self.media_type
+            doc["result_available"] = store is not None and self.id in store
+        return doc
+
+
+class JobQueue:
+    """Priority queue in front of a process pool with one job per worker at a time.
+
+    Jobs wait here rather than in the executor's FIFO so a higher priority jumps the line
+    and a queued job can be dropped. A running job is stopped at its next progress report.
+    """
+
+    def __init__(self, workers=None, max_queued=None, store=None, max_records=None, progress_interval=None):
+        self.workers = workers or config.JOB_WORKERS or os.cpu_count() or 1
+        self.max_queued = config.JOB_MAX_QUEUED if max_queued is None else max_queued
+        self.max_records = config.JOB_MAX_RECORDS if max_records is None else max_records
+        self.interval = config.JOB_PROGRESS_INTERVAL_S if progress_interval is None else progress_interval
+        self.store = store or ResultStore(config.JOB_RESULT_BYTES)
+        self.jobs = OrderedDict()
+        self._heap = []
+        self._queued = 0
+        self._numbers = itertools.count(1)
+        self._free = list(range(self.workers))
+        self._lock = threading.RLock()
+        self._pool = None
+        self._progress = None
+        self._cancel = None
+        self._reader = None
+
+    def _ensure_pool(self):
+        if self._pool is None:
+            # spawn, like the sweep pool: forking a threaded server process can deadlock the children
+            context = multiprocessing.get_context("spawn")
+            self._progress = context.Queue()
+            self._cancel = context.RawArray("q", self.workers)
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=context,
+                initializer=_init_worker, initargs=(self._progress, self._cancel),
+            )
+            self._reader = threading.Thread(target=self._read_progress, args=(self._progress,), daemon=True)
+            self._reader.start()
+        return self._pool
+
+    def _read_progress(self, queue):
+        while True:
+            message = queue.get()
+            if message is None:
+                return
+            job_id, done, total, partial = message
+            with self._lock:
+                job = self.jobs.get(job_id)
+                if job is None or job.state != RUNNING:
+                    continue
+                job.done, job.total = done, total
+                if partial is not None:
+                    job.partial = partial
+                job.version += 1
+
+    def submit(self, kind, payload, priority=0):
+        if kind not in KINDS:
+            raise JobError(f"Unknown job kind: {kind}. Use one of {', '.join(sorted(KINDS))}")
+        if not isinstance(payload, dict):
+            raise JobError("payload must be a JSON object")
+        check, _ = KINDS[kind]
+        check(payload)
+        with self._lock:
+            if self._queued >= self.max_queued:
+                raise QueueFull(f"{self._queued} jobs are already queued")
+            job = Job(next(self._numbers), kind, payload, priority)
+            self.jobs[job.id] = job
+            self._forget_old()
+            heapq.heappush(self._heap, (-priority, job.number, job))
+            self._queued += 1
+            JOBS.inc(kind, QUEUED)
+            self._dispatch()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.state in FINISHED:
+                return job
+            if job.state == QUEUED:
+                # Left in the heap and skipped when it surfaces
+                self._queued -= 1
+                self._finish(job, CANCELLED)
+            else:
+                self._cancel[job.slot] = job.number
+            return job
+
+    def _forget_old(self):
+        # Records of finished jobs are dropped oldest first; unfinished ones always stay
+        excess = len(self.jobs) - self.max_records
+        if excess <= 0:
+            return
+        for job_id in [j.id for j in self.jobs.values() if j.state in FINISHED][:excess]:
+            del self.jobs[job_id]
+
+    def _dispatch(self):
+        while self._free and self._heap:
+            _, _, job = heapq.heappop(self._heap)
+            if job.state != QUEUED:
+                continue
+            self._queued -= 1
+            job.slot = self._free.pop()
+            job.state = RUNNING
+            job.started = time.time()
+            job.version += 1
+            JOBS.inc(job.kind, RUNNING)
+            _, run = KINDS[job.kind]
+            pool = self._ensure_pool()
+            try:
+                future = pool.submit(_execute, run, job.payload, job.id, job.number, job.slot, self.interval)
+            except BrokenProcessPool:
+                self._reset_pool(pool)
+                pool = self._ensure_pool()
+                future = pool.submit(_execute, run, job.payload, job.id, job.number, job.slot, self.interval)
+            future.add_done_callback(lambda f, job=job, pool=pool: self._completed(job, f, pool))
+
+    def _completed(self, job, future, pool):
+        broken = False
+        total = None
+        try:
+            state, body, media_type, total = future.result()
+        except BrokenProcessPool as e:
+            broken = True
+            state, body, media_type = FAILED, f"Worker process died: {e}", None
+        except Exception as e:
+            state, body, media_type = FAILED, f"{type(e).__name__}: {e}", None
+        with self._lock:
+            if broken:
+                self._reset_pool(pool)
+            if job.state in FINISHED:
+                # Finished by shutdown while it ran
+                return
+            self._free.append(job.slot)
+            if state == DONE:
+                self.store.put(job.id, body, media_type)
+                job.media_type = media_type
+                job.total = total if total is not None else job.total
+                job.done = job.total if job.total is not None else job.done
+                self._finish(job, DONE)
+            else:
+                self._finish(job, state, body)
+            self._dispatch()
+
+    def _finish(self, job, state, error=None):
+        job.state = state
+        job.error = error
+        job.finished = time.time()
+        job.partial = None
+        job.payload = None
+        job.version += 1
+        JOBS.inc(job.kind, state)
+
+    def _reset_pool(self, pool):
+        # Every job of a dead pool reports in; only the first one replaces it
+        if self._pool is not pool:
+            return
+        queue = self._progress
+        self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+        queue.put(None)
+
+    def stats(self):
+        with self._lock:
+            running = sum(1 for job in self.jobs.values() if job.state == RUNNING)
+            return {
+                "workers": self.workers,
+                "queued": self._queued,
+                "running": running,
+                "max_queued": self.max_queued,
+                "records": len(self.jobs),
+                "store": self.store.stats(),
+            }
+
+    def shutdown(self):
+        with self._lock:
+            for job in list(self.jobs.values()):
+                if job.state == RUNNING:
+                    # Stops at its next progress report instead of holding up the shutdown
+                    self._cancel[job.slot] = job.number
+                if job.state in (QUEUED, RUNNING):
+                    self._finish(job, CANCELLED)
+            self._heap, self._queued = [], 0
+            pool, queue = self._pool, self._progress
+            self._pool = None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+            queue.put(None)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
+
+
+def shutdown_jobs():
+    global _queue
+    with _queue_lock:
+        if _queue is not None:
+            _queue.shutdown()
+            _queue = None
@@ -0,0 +1,259 @@
+import asyncio
+import hashlib
+import json
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from app.core import config
+
+# Bump when prompt templates change so old explanations are not served
+PROMPT_VERSION = 2
+
+
+def _canonical(value, digits):
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            return repr(value)
+        # Round to significant digits so float noise does not split the cache
+        return float(f"{value:.{digits}g}")
+    if isinstance(value, dict):
+        return {str(k): _canonical(v, digits) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v, digits) for v in value]
+    return str(value)
+
+
+def cache_key(scenario, calculation, data=None, digits=None):
+    """Content address of an explanation: sha256 over scenario + rounded calculation and inputs.
+
+    ``data`` is part of the key because prompts echo raw inputs that the calculation
+    does not always carry (e.g. bandwidth when wireless_comm gets an explicit sampling rate).
+    """
+    digits = config.LLM_CACHE_DIGITS if digits is None else digits
+    doc = {
+        "v": PROMPT_VERSION,
+        "scenario": scenario,
+        "calculation": _canonical(calculation, digits),
+        "data": _canonical(data or {}, digits),
+    }
+    blob = json.dumps(doc, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU with a per-entry TTL."""
+
+    def __init__(self, maxsize=1024, ttl=3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, record_miss=True):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                if record_miss:
+                    self.misses += 1
+                return None
+            expires, value = item
+            if expires < now:
+                del self._data[key]
+                self.expirations += 1
+                if record_miss:
+                    self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class SQLiteCache:
+    """Persistent tier shared by every uvicorn worker on the host (WAL mode)."""
+
+    def __init__(self, path, ttl=86400.0, max_rows=100000):
+        self.path = path
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._writes = 0
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL, stored REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_stored ON llm_cache (stored)")
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, record_miss=True):
+        row = self._conn().execute(
+            "SELECT value, expires FROM llm_cache WHERE key = ?", (key,)
+        ).fetchone()
+        hit = row is not None and row[1] >= time.time()
+        with self._lock:
+            if hit:
+                self.hits += 1
+            elif record_miss:
+                self.misses += 1
+        return row[0] if hit else None
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, value, expires, stored) VALUES (?, ?, ?, ?)",
+            (key, value, now + (self.ttl if ttl is None else ttl), now),
+        )
+        with self._lock:
+            self._writes += 1
+            due = self._writes % 256 == 0
+        if due:
+            self.prune()
+
+    def prune(self):
+        conn = self._conn()
+        removed = conn.execute("DELETE FROM llm_cache WHERE expires < ?", (time.time(),)).rowcount
+        count = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        if count > self.max_rows:
+            removed += conn.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY stored ASC LIMIT ?)",
+                (count - self.max_rows,),
+            ).rowcount
+        with self._lock:
+            self.evictions += max(removed, 0)
+
+    def clear(self):
+        self._conn().execute("DELETE FROM llm_cache")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "path": self.path,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class ResponseCache:
+    """Memory LRU in front of an optional SQLite tier; disk hits are promoted.
+
+    Async callers use :meth:`aget` / :meth:`aset`, which run the disk tier in a worker
+    thread so SQLite busy waits never stall the event loop. ``record_miss=False`` makes
+    a lookup that is not final (it will be repeated) invisible to the miss counters.
+    """
+
+    def __init__(self, memory, disk=None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key, record_miss=True):
+        value = self.memory.get(key, record_miss)
+        if value is not None or self.disk is None:
+            return value
+        value = self.disk.get(key, record_miss)
+        if value is not None:
+            self.memory.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    async def aget(self, key, record_miss=True):
+        value = self.memory.get(key, record_miss)
+        if value is not None or self.disk is None:
+            return value
+        value = await asyncio.to_thread(self.disk.get, key, record_miss)
+        if value is not None:
+            self.memory.set(key, value)
+        return value
+
+    async def aset(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, value)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self):
+        return {
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            disk = None
+            if config.LLM_CACHE_PATH:
+                disk = SQLiteCache(
+                    config.LLM_CACHE_PATH,
+                    ttl=config.LLM_CACHE_TTL_S,
+                    max_rows=config.LLM_CACHE_DISK_MAX_ROWS,
+                )
+            _cache = ResponseCache(LRUCache(config.LLM_CACHE_SIZE, config.LLM_CACHE_TTL_S), disk)
+        return _cache
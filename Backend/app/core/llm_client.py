@@ -0,0 +1,399 @@
+import asyncio
+import json
+import random
+import threading
+import time
+import weakref
+from collections import deque
+
+import httpx
+
+from app.core import config
+from app.core.metrics import LLM_LATENCY, LLM_REQUESTS
+
+# Status codes worth another attempt (rate limiting / transient upstream failures)
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _extract_text(payload):
+    parts = payload["candidates"][0]["content"]["parts"]
+    return "".join(part.get("text", "") for part in parts)
+
+
+def _record(method, status, started):
+    # Streams are timed to their last chunk; "transport" covers connect/read failures and deadlines
+    LLM_REQUESTS.inc(method, status)
+    LLM_LATENCY.observe(time.perf_counter() - started, method)
+
+
+def _grant(waiter):
+    if not waiter.done():
+        waiter.set_result(True)
+
+
+class ConcurrencyBudget:
+    """FIFO semaphore shared by threads and event loops.
+
+    ``asyncio.Semaphore`` belongs to one loop and ``threading.Semaphore`` blocks the loop,
+    so neither can cap calls made from both the async routes and blocking callers.
+    A released slot is handed straight to the oldest waiter, whichever side it is on.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._in_use = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def in_use(self):
+        return self._in_use
+
+    def _take_or_enqueue(self, waiter):
+        with self._lock:
+            if self._in_use < self.limit and not self._waiters:
+                self._in_use += 1
+                return True
+            self._waiters.append(waiter)
+            return False
+
+    def _withdraw(self, waiter):
+        # False means release() already handed this waiter a slot
+        with self._lock:
+            try:
+                self._waiters.remove(waiter)
+                return True
+            except ValueError:
+                return False
+
+    def acquire(self, timeout=None):
+        event = threading.Event()
+        if self._take_or_enqueue(event) or event.wait(timeout):
+            return True
+        if self._withdraw(event):
+            return False
+        return True
+
+    async def acquire_async(self):
+        waiter = asyncio.get_running_loop().create_future()
+        if self._take_or_enqueue(waiter):
+            return
+        try:
+            await asyncio.shield(waiter)
+        except asyncio.CancelledError:
+            if not self._withdraw(waiter):
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+                loop = waiter.get_loop()
+                if not loop.is_closed():
+                    loop.call_soon_threadsafe(_grant, waiter)
+                    return
+            self._in_use -= 1
+
+
+class GeminiClient:
+    """Pooled Gemini client with per-call deadlines, jittered retries and a concurrency cap.
+
+    One instance is shared by the whole worker process. Each event loop gets its own
+    ``httpx.AsyncClient`` (pooled connections belong to the loop that opened them);
+    blocking callers are bridged onto a private loop thread, so the sync and async paths
+    share one :class:`ConcurrencyBudget` and the same deadline handling.
+
+    ``deadline`` is a wall-clock budget for the whole call: waiting for a concurrency
+    slot, every attempt and every backoff sleep count against it.
+    """
+
+    def __init__(
+        self,
+        base_url=None,
+        model=None,
+        api_key=None,
+        timeout=None,
+        connect_timeout=None,
+        max_retries=None,
+        backoff_base=None,
+        backoff_max=None,
+        max_concurrency=None,
+        max_connections=None,
+        keepalive_connections=None,
+    ):
+        self.base_url = (base_url or config.GEMINI_BASE_URL).rstrip("/")
+        self.model = model or config.GEMINI_MODEL
+        self._api_key = api_key
+        self.timeout = config.LLM_TIMEOUT_S if timeout is None else timeout
+        self.connect_timeout = config.LLM_CONNECT_TIMEOUT_S if connect_timeout is None else connect_timeout
+        self.max_retries = config.LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = config.LLM_BACKOFF_BASE_S if backoff_base is None else backoff_base
+        self.backoff_max = config.LLM_BACKOFF_MAX_S if backoff_max is None else backoff_max
+        self.max_concurrency = max_concurrency or config.LLM_MAX_CONCURRENCY
+        self.budget = ConcurrencyBudget(self.max_concurrency)
+        self._limits = httpx.Limits(
+            max_connections=max_connections or config.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=keepalive_connections or config.LLM_KEEPALIVE_CONNECTIONS,
+        )
+
+        self._clients = weakref.WeakKeyDictionary()
+        self._bridge_loop = None
+        self._bridge_thread = None
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------ helpers
+
+    @property
+    def api_key(self):
+        return self._api_key or config.gemini_api_key()
+
+    def url(self, method="generateContent"):
+        return f"{self.base_url}/models/{self.model}:{method}"
+
+    def _headers(self):
+        return {"Content-Type": "application/json", "x-goog-api-key": self.api_key}
+
+    def _timeout(self, end):
+        # Per-operation httpx timeouts never outlast the remaining budget
+        remaining = max(end - asyncio.get_running_loop().time(), 0.001)
+        return httpx.Timeout(remaining, connect=min(self.connect_timeout, remaining))
+
+    @staticmethod
+    def _payload(prompt):
+        return {"contents": [{"parts": [{"text": prompt}]}]}
+
+    def backoff(self, attempt):
+        # Full jitter: uniform in [0, min(cap, base * 2^attempt)]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _check_key(self):
+        if not self.api_key:
+            raise LLMError("Gemini API key is missing")
+
+    @staticmethod
+    def _parse(response):
+        if response.status_code != 200:
+            raise LLMError(f"{response.status_code} - {response.text}", response.status_code)
+        try:
+            return _extract_text(response.json())
+        except (ValueError, KeyError, IndexError, TypeError):
+            raise LLMError(f"{response.status_code} - {response.text}", response.status_code)
+
+    @staticmethod
+    def _retryable(exc):
+        if isinstance(exc, httpx.TransportError):
+            return True
+        return isinstance(exc, LLMError) and exc.status_code in RETRYABLE_STATUS
+
+    def _as_error(self, exc, end, budget):
+        if asyncio.get_running_loop().time() >= end:
+            # An httpx timeout sized to the remaining budget is still a deadline miss
+            return self._deadline_error(budget)
+        if isinstance(exc, LLMError):
+            return exc
+        return LLMError(f"{type(exc).__name__}: {exc}")
+
+    def _should_retry(self, exc, attempt, delay, end):
+        # Give up early when the backoff alone would run past the deadline
+        return (
+            attempt < self.max_retries
+            and self._retryable(exc)
+            and asyncio.get_running_loop().time() + delay < end
+        )
+
+    @staticmethod
+    def _deadline_error(budget):
+        return LLMError(f"Deadline of {budget:g}s exceeded")
+
+    async def _within(self, end, budget, awaitable):
+        remaining = end - asyncio.get_running_loop().time()
+        if remaining <= 0:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise self._deadline_error(budget)
+        try:
+            return await asyncio.wait_for(awaitable, remaining)
+        except asyncio.TimeoutError:
+            raise self._deadline_error(budget) from None
+
+    # -------------------------------------------------------------------- async
+
+    def _client_for_loop(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.get(loop)
+            if client is None:
+                client = httpx.AsyncClient(limits=self._limits)
+                self._clients[loop] = client
+            return client
+
+    async def generate(self, prompt, deadline=None):
+        """Return Gemini's text for ``prompt`` within ``deadline`` seconds (default ``timeout``)."""
+        self._check_key()
+        budget = self.timeout if deadline is None else deadline
+        end = asyncio.get_running_loop().time() + budget
+        try:
+            return await asyncio.wait_for(self._generate(prompt, end, budget), budget)
+        except asyncio.TimeoutError:
+            raise self._deadline_error(budget) from None
+
+    async def _generate(self, prompt, end, budget):
+        client = self._client_for_loop()
+        attempt = 0
+        while True:
+            try:
+                await self.budget.acquire_async()
+                started = time.perf_counter()
+                status = "transport"
+                try:
+                    response = await client.post(
+                        self.url(),
+                        headers=self._headers(),
+                        json=self._payload(prompt),
+                        timeout=self._timeout(end),
+                    )
+                    status = str(response.status_code)
+                finally:
+                    self.budget.release()
+                    _record("generateContent", status, started)
+                return self._parse(response)
+            except (httpx.TransportError, LLMError) as exc:
+                delay = self.backoff(attempt)
+                if not self._should_retry(exc, attempt, delay, end):
+                    raise self._as_error(exc, end, budget) from exc
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def stream(self, prompt, deadline=None):
+        """Yield text fragments from ``streamGenerateContent`` (SSE) as they arrive.
+
+        The whole stream must finish within ``deadline``. Transient failures are retried
+        only until the first fragment has been yielded.
+        """
+        self._check_key()
+        budget = self.timeout if deadline is None else deadline
+        end = asyncio.get_running_loop().time() + budget
+        client = self._client_for_loop()
+        attempt = 0
+        while True:
+            emitted = False
+            try:
+                await self._within(end, budget, self.budget.acquire_async())
+                started = time.perf_counter()
+                status = "transport"
+                try:
+                    request = client.build_request(
+                        "POST",
+                        self.url("streamGenerateContent"),
+                        params={"alt": "sse"},
+                        headers=self._headers(),
+                        json=self._payload(prompt),
+                        timeout=self._timeout(end),
+                    )
+                    response = await self._within(end, budget, client.send(request, stream=True))
+                    status = str(response.status_code)
+                    try:
+                        if response.status_code != 200:
+                            await self._within(end, budget, response.aread())
+                            raise LLMError(f"{response.status_code} - {response.text}", response.status_code)
+                        lines = response.aiter_lines()
+                        while True:
+                            try:
+                                line = await self._within(end, budget, lines.__anext__())
+                            except StopAsyncIteration:
+                                break
+                            if not line.startswith("data:"):
+                                continue
+                            try:
+                                text = _extract_text(json.loads(line[5:]))
+                            except (ValueError, KeyError, IndexError, TypeError):
+                                continue
+                            if text:
+                                emitted = True
+                                yield text
+                    finally:
+                        await response.aclose()
+                finally:
+                    self.budget.release()
+                    _record("streamGenerateContent", status, started)
+                return
+            except (httpx.TransportError, LLMError) as exc:
+                delay = self.backoff(attempt)
+                if emitted or not self._should_retry(exc, attempt, delay, end):
+                    raise self._as_error(exc, end, budget) from exc
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def aclose(self):
+        """Close the connection pool of the running loop."""
+        with self._lock:
+            client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    # --------------------------------------------------------------------- sync
+
+    def _bridge(self):
+        with self._lock:
+            if self._bridge_loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="gemini-client", daemon=True)
+                thread.start()
+                self._bridge_loop, self._bridge_thread = loop, thread
+            return self._bridge_loop
+
+    def generate_sync(self, prompt, deadline=None):
+        """Blocking twin of :meth:`generate` for scripts and threadpool callers.
+
+        Runs on the client's private loop thread; never call it from that thread.
+        """
+        self._check_key()
+        future = asyncio.run_coroutine_threadsafe(self.generate(prompt, deadline), self._bridge())
+        return future.result()
+
+    def close(self):
+        """Close the blocking path's pool and stop its loop thread."""
+        with self._lock:
+            loop, thread = self._bridge_loop, self._bridge_thread
+            self._bridge_loop = self._bridge_thread = None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.aclose(), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        loop.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GeminiClient()
+        return _client
+
+
+def set_client(client):
+    """Swap the process-wide client (e.g. one pointed at a stub server)."""
+    global _client
+    with _client_lock:
+        _client = client
+
+
+async def close_client():
+    if _client is not None:
+        await _client.aclose()
+        _client.close()
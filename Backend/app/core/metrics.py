@@ -0,0 +1,221 @@
+import bisect
+import contextvars
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from app.core import config
+
+# Latency buckets in seconds, from sub-millisecond calculations to slow LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # per-bucket counts (+Inf last), sum
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *labels):
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._series.items())
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound:g}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, [le])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by route, method and status.", ("route", "method", "status")
+))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Time to the end of the response body.", ("route", "method")
+))
+STAGE_LATENCY = REGISTRY.register(Histogram(
+    "app_stage_duration_seconds", "Time spent per request stage.", ("route", "stage")
+))
+CALCULATIONS = REGISTRY.register(Counter(
+    "app_calculations_total", "Scenario calculations by outcome.", ("scenario", "outcome")
+))
+ERRORS = REGISTRY.register(Counter(
+    "app_errors_total", "Errors returned to clients by type.", ("type",)
+))
+EXPLANATIONS = REGISTRY.register(Counter(
+    "app_explanations_total", "Explanations answered by Gemini (fresh or cached) or by the local fallback.", ("source",)
+))
+JOBS = REGISTRY.register(Counter(
+    "app_jobs_total", "Background job transitions by kind and state.", ("kind", "state")
+))
+LLM_REQUESTS = REGISTRY.register(Counter(
+    "llm_requests_total", "Upstream Gemini attempts by HTTP status (or transport error).", ("method", "status")
+))
+LLM_LATENCY = REGISTRY.register(Histogram(
+    "llm_request_duration_seconds", "Upstream Gemini attempt latency.", ("method",)
+))
+
+
+# --------------------------------------------------------------------------- per-request stages
+
+_timings = contextvars.ContextVar("timings", default=None)
+
+
+class Timings:
+    """Stage durations of one request, in the order they were recorded."""
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.stages = []
+
+    def add(self, name, seconds):
+        self.stages.append((name, seconds))
+        # Stages run inside the endpoint, after routing has filled in scope["route"]
+        STAGE_LATENCY.observe(seconds, _route_label(self.scope), name)
+
+    def header(self, total=None):
+        parts = [f"{name};dur={seconds * 1000:.3f}" for name, seconds in self.stages]
+        if total is not None:
+            parts.append(f"total;dur={total * 1000:.3f}")
+        return ", ".join(parts)
+
+
+@contextmanager
+def stage(name):
+    """Time a block as one ``Server-Timing`` stage of the current request (no-op outside one)."""
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+def _route_label(scope):
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: request counters/latency plus a ``Server-Timing`` header.
+
+    The header is written with the response start, so it holds the stages finished by
+    then; for streamed responses that excludes the body (the histograms still get it).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings = Timings(scope)
+        token = _timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.header(time.perf_counter() - start).encode("latin-1")))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timings.reset(token)
+            route = _route_label(scope)
+            HTTP_REQUESTS.inc(route, scope["method"], str(status))
+            HTTP_LATENCY.observe(time.perf_counter() - start, route, scope["method"])
+
+
+# --------------------------------------------------------------------------- logging
+
+
+def debug_sampled(logger, message, *args):
+    """DEBUG log for a fraction (``LOG_SAMPLE_RATE``) of calls.
+
+    Costs one level check when DEBUG is off; arguments are only formatted if emitted.
+    """
+    if logger.isEnabledFor(logging.DEBUG) and random.random() < config.LOG_SAMPLE_RATE:
+        logger.debug(message, *args)
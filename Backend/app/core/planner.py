@@ -0,0 +1,242 @@
+import math
+
+import numpy as np
+
+from app.core import config
+from app.core.batch import calculate_batch, plain_column
+from app.core.erlang import traffic_for, traffic_for_array
+from app.core.propagation import DEFAULT_MODEL, PropagationError, parse_model
+from app.core.sweep import Axis, SweepError, get_pool, pool_size
+
+# Area of a hexagonal cell is HEX_AREA * r^2, as in the cellular calculator
+HEX_AREA = 3 * math.sqrt(3) / 2
+
+DEFAULT_RADII = {"start": 0.1, "stop": 30, "num": 300, "scale": "log"}
+DEFAULT_MAX_REUSE = 19
+DEFAULT_CHANNEL_BANDWIDTHS = (0.025, 0.2, 1.25, 5)
+
+_DESIGN_INPUTS = ("area", "bandwidth", "spectral_efficiency", "subscribers", "calls_per_day", "call_duration", "gos")
+
+
+class PlanError(ValueError):
+    pass
+
+
+def cluster_sizes(max_size):
+    """Valid hexagonal reuse cluster sizes N = i^2 + i*j + j^2 up to ``max_size``."""
+    sizes = set()
+    for i in range(int(math.isqrt(max(max_size, 0))) + 1):
+        for j in range(i + 1):
+            size = i * i + i * j + j * j
+            if 0 < size <= max_size:
+                sizes.add(size)
+    return sorted(sizes)
+
+
+def _is_cluster_size(n):
+    return n >= 1 and n in cluster_sizes(n)
+
+
+def pareto_front(sites, headroom):
+    """Indices of designs no other design beats on both fewer sites and more headroom.
+
+    Sorted by site count; among equal site counts only the best headroom survives.
+    """
+    order = np.lexsort((-headroom, sites))
+    ranked = headroom[order]
+    best_before = np.concatenate(([-np.inf], np.maximum.accumulate(ranked)[:-1]))
+    return order[ranked > best_before]
+
+
+class CellularPlan:
+    """Search space and fixed design inputs for :func:`optimize`."""
+
+    def __init__(self, data, radii, reuse, channel_bandwidths, min_headroom=0.0, max_sites=None):
+        try:
+            self.data = {name: float(data[name]) for name in _DESIGN_INPUTS}
+        except (KeyError, TypeError, ValueError):
+            raise PlanError(f"data needs numeric {', '.join(_DESIGN_INPUTS)}")
+        if not all(math.isfinite(v) for v in self.data.values()):
+            raise PlanError("All inputs must be numbers.")
+        if self.data["area"] <= 0 or self.data["bandwidth"] <= 0:
+            raise PlanError("Area and bandwidth must be greater than 0.")
+        if not 0 < self.data["gos"] < 1:
+            raise PlanError("GoS must be between 0 and 1.")
+        self.total_traffic = (
+            self.data["calls_per_day"] * self.data["call_duration"] * 60 / 86400 * int(self.data["subscribers"])
+        )
+        if self.total_traffic <= 0:
+            raise PlanError("Subscribers, calls per day and call duration must give some traffic.")
+
+        self.radii = np.asarray(radii, dtype=float)
+        if self.radii.size == 0 or not np.all(np.isfinite(self.radii)) or np.any(self.radii <= 0):
+            raise PlanError("Cell radii must be positive numbers.")
+        try:
+            self.reuse = [int(n) for n in reuse]
+        except (TypeError, ValueError, OverflowError):
+            raise PlanError("Reuse factors must be whole numbers")
+        bad = [n for n in self.reuse if not _is_cluster_size(n)]
+        if bad or not self.reuse:
+            raise PlanError(f"Reuse factors must be cluster sizes i^2 + ij + j^2, got {bad or 'none'}")
+        try:
+            self.channel_bandwidths = [float(b) for b in channel_bandwidths]
+        except (TypeError, ValueError):
+            raise PlanError("Channel bandwidths must be numbers")
+        if not self.channel_bandwidths or any(not b > 0 for b in self.channel_bandwidths):
+            raise PlanError("Channel bandwidths must be greater than 0.")
+        try:
+            self.min_headroom = float(min_headroom)
+            self.max_sites = None if max_sites is None else int(max_sites)
+        except (TypeError, ValueError, OverflowError):
+            raise PlanError("min_headroom and max_sites must be numbers")
+        if not self.min_headroom > -1:
+            raise PlanError("min_headroom must be greater than -1.")
+        # A maximum path loss caps the radius at the propagation model's range
+        self.max_radius = None
+        if data.get("max_path_loss_db") is not None:
+            try:
+                max_loss, frequency = float(data["max_path_loss_db"]), float(data.get("frequency"))
+            except (TypeError, ValueError):
+                raise PlanError("max_path_loss_db and frequency must be numbers")
+            try:
+                self.max_radius = parse_model(data, DEFAULT_MODEL).max_range_km(max_loss, frequency)
+            except PropagationError as e:
+                raise PlanError(str(e))
+        if self.radii.size > config.PLAN_MAX_RADII:
+            raise PlanError(f"Search has {self.radii.size} radii; at most {config.PLAN_MAX_RADII} are allowed")
+        self.candidates = self.radii.size * len(self.reuse) * len(self.channel_bandwidths)
+
+    @classmethod
+    def parse(cls, body):
+        data = body.get("data")
+        if not isinstance(data, dict):
+            raise PlanError("data must be an object")
+        search = body.get("search") or {}
+        if not isinstance(search, dict):
+            raise PlanError("search must be an object")
+        try:
+            radii = Axis.parse("cell_radius", search.get("cell_radius", DEFAULT_RADII)).values
+        except SweepError as e:
+            raise PlanError(str(e))
+        if radii.dtype == object:
+            raise PlanError("cell_radius values must be numbers")
+        reuse = search.get("reuse_factor")
+        if not reuse:
+            try:
+                reuse = cluster_sizes(int(search.get("max_reuse", DEFAULT_MAX_REUSE)))
+            except (TypeError, ValueError, OverflowError):
+                raise PlanError("max_reuse must be a whole number")
+        bandwidths = search.get("channel_bandwidth")
+        if bandwidths is None:
+            bandwidths = [data["channel_bandwidth"]] if "channel_bandwidth" in data else DEFAULT_CHANNEL_BANDWIDTHS
+        if not isinstance(reuse, (list, tuple)) or not isinstance(bandwidths, (list, tuple)):
+            raise PlanError("reuse_factor and channel_bandwidth must be lists")
+        return cls(data, radii, reuse, bandwidths, body.get("min_headroom", 0.0), body.get("max_sites"))
+
+    def feasible(self):
+        """Candidate (radius, reuse, channel bandwidth) columns that can be on the front.
+
+        Pruned analytically before anything is evaluated:
+
+        * With C channels per cell a cell carries at most T = traffic_for(C, gos) Erlangs,
+          and offered traffic per cell grows with r^2, so each (reuse, bandwidth) pair has a
+          largest compliant radius.
+        * Site count depends on the radius alone and headroom is T / traffic - 1, so at any
+          radius the pair with the largest T dominates every other pair.
+        * With a maximum path loss, radii beyond the propagation model's range cannot be covered.
+        """
+        gos, area = self.data["gos"], self.data["area"]
+        best = None
+        for n in self.reuse:
+            for bw in self.channel_bandwidths:
+                channels = int(self.data["bandwidth"] / (n * bw))
+                if channels < 1:
+                    continue
+                capacity = traffic_for(channels, gos)
+                if best is None or capacity > best[0]:
+                    best = (capacity, n, bw)
+        if best is None:
+            return np.empty(0), np.empty(0), np.empty(0)
+        capacity, n, bw = best
+        # Headroom h needs traffic per cell <= T / (1 + h)
+        limit = capacity / (1 + self.min_headroom)
+        max_radius = math.sqrt(limit * area / (self.total_traffic * HEX_AREA))
+        if self.max_radius is not None:
+            max_radius = min(max_radius, self.max_radius)
+        keep = self.radii[self.radii <= max_radius * (1 + 1e-9)]
+        if self.max_sites is not None:
+            keep = keep[np.ceil(area / (HEX_AREA * keep ** 2)) <= self.max_sites]
+        return keep, np.full(keep.size, n, dtype=float), np.full(keep.size, bw)
+
+
+def evaluate_candidates(data, radius, reuse, bandwidth, min_headroom):
+    """Run the cellular calculator over candidates and keep this chunk's Pareto front.
+
+    Runs in worker processes; only the local front travels back.
+    """
+    columns = dict(data, cell_radius=radius, reuse_factor=reuse, channel_bandwidth=bandwidth)
+    result = calculate_batch("cellular", columns)
+    out = result.columns
+    # The calculator rounds its traffic columns; headroom uses the unrounded values
+    total_traffic = data["calls_per_day"] * data["call_duration"] * 60 / 86400 * math.trunc(data["subscribers"])
+    cell_area = HEX_AREA * radius ** 2
+    traffic_per_cell = total_traffic * cell_area / data["area"]
+    capacity = traffic_for_array(out["channels_per_cell"], data["gos"])
+    headroom = capacity / traffic_per_cell - 1
+    sites = np.ceil(data["area"] / cell_area)
+    compliant = result.ok & out["meets_gos"].astype(bool) & (headroom >= min_headroom - 1e-9)
+    index = np.flatnonzero(compliant)
+    front = index[pareto_front(sites[index], headroom[index])]
+    doc = {name: values[front] for name, values in out.items()}
+    doc["sites"] = sites[front]
+    doc["headroom"] = headroom[front]
+    return doc
+
+
+def _merge(parts):
+    if not parts:
+        return {}
+    return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+
+def optimize(plan, chunk_rows=None, parallel=None):
+    """Pareto front of site count against capacity headroom over the plan's search space.
+
+    Large searches are split across the sweep process pool; ``parallel`` forces the choice.
+    """
+    radius, reuse, bandwidth = plan.feasible()
+    chunk_rows = chunk_rows or config.SWEEP_CHUNK_ROWS
+    if parallel is None:
+        parallel = radius.size >= config.PLAN_PARALLEL_MIN_ROWS
+    if parallel:
+        # At least two chunks per worker so one slow chunk does not idle the others
+        chunk_rows = max(1, min(chunk_rows, math.ceil(radius.size / (2 * pool_size()))))
+    tasks = [
+        (plan.data, radius[start:start + chunk_rows], reuse[start:start + chunk_rows],
+         bandwidth[start:start + chunk_rows], plan.min_headroom)
+        for start in range(0, radius.size, chunk_rows)
+    ]
+    if parallel and len(tasks) > 1:
+        parts = list(get_pool().map(evaluate_candidates, *zip(*tasks)))
+    else:
+        parts = [evaluate_candidates(*task) for task in tasks]
+
+    merged = _merge(parts)
+    front = []
+    size = 0
+    if merged:
+        keep = pareto_front(merged["sites"], merged["headroom"])
+        size = keep.size
+        if size > config.PLAN_MAX_FRONT:
+            # The front is one design per site count; return an even spread including both ends
+            keep = keep[np.unique(np.linspace(0, size - 1, config.PLAN_MAX_FRONT).round().astype(int))]
+        columns = {name: plain_column(values[keep]) for name, values in merged.items()}
+        front = [dict(zip(columns, row)) for row in zip(*columns.values())]
+    return {
+        "candidates": plan.candidates,
+        "evaluated": int(radius.size),
+        "pruned": plan.candidates - int(radius.size),
+        "front_size": int(size),
+        "front": front,
+        "cheapest": front[0] if front else None,
+    }
@@ -0,0 +1,165 @@
+# Gemini prompt templates for each /calculate scenario
+
+def link_budget_prompt(data, calculation):
+    return f"""
+        You are a wireless link budget analysis expert. Based on the following user inputs and computed results, provide a detailed explanation of how each parameter and result affects the received power, transmit power, and link performance. Explain the significance of each metric and how the configuration impacts the reliability and performance of the wireless link.
+
+        User Inputs:
+        - Link Margin (dB): {calculation['link_margin_db']}
+        - Temperature (K): {calculation['temperature_K']}
+        - Noise Figure (dB): {calculation['noise_figure_db']}
+        - Bitrate (bps): {calculation['bitrate_bps']}
+        - Eb/N0 (dB): {calculation['eb_no_db']}
+        - Distance (km): {calculation['distance_km']}
+        - Frequency (MHz): {calculation['frequency_mhz']}
+        - Transmitter Gain (dBi): {calculation['tx_gain_dbi']}
+        - Receiver Gain (dBi): {calculation['rx_gain_dbi']}
+        - System Loss (dB): {calculation['system_loss_db']}
+
+        Computed Results:
+        - Received Power (dBm): {calculation['received_power_dbm']}
+        - Required Transmit Power (dBm): {calculation['transmit_power_dbm']}
+        - Free Space Path Loss (FSPL, dB): {calculation['fspl_db']}
+{_path_loss(calculation)}
+        Discuss how these values are derived and their importance in wireless link design.
+        """
+
+
+def ofdm_prompt(data, calculation):
+    return f"""
+        You are an OFDM systems expert. Based on the following user inputs and computed results, provide a detailed explanation of how each parameter and result affects the data rates, resource allocation, and spectral efficiency in the OFDM system. Explain the significance of each metric and how the configuration impacts the maximum transmission capacity and efficiency.
+
+        User Inputs:
+        - Bandwidth: {data.get('bandwidth')} kHz
+        - Subcarrier Spacing: {data.get('subcarrierSpacing')} kHz
+        - Modulation: {data.get('modulation')}
+        - Number of OFDM Symbols per RB: {data.get('numSymbols')}
+        - Duration of RB: {data.get('duration_of_RB')} ms
+        - Parallel RBs: {data.get('parallelRB')}
+
+        Computed Results:
+        - Subcarriers per RB: {calculation['subcarriers_per_rb']}
+        - Bits per Resource Element: {calculation['bits_per_re']}
+        - Bits per OFDM Symbol: {calculation['bits_per_ofdm_symbol']}
+        - Bits per Resource Block: {calculation['bits_per_rb']}
+        - Total Bits (all parallel RBs): {calculation['total_bits']}
+        - RB Duration (s): {calculation['rb_duration_sec']:.6f}
+        - Max Data Rate: {calculation['max_data_rate_bps']:.2f} bps
+        - Total Bandwidth: {calculation['total_bandwidth_hz'] / 1e3:.2f} kHz
+        - Spectral Efficiency: {calculation['spectral_efficiency_bps_per_hz']:.4f} bps/Hz
+{_ofdm_errors(calculation)}
+        Discuss how these values are derived and their importance in OFDM system design.
+        """
+
+
+def _ofdm_errors(calculation):
+    if calculation.get("bler") is None:
+        return ""
+    return (
+        f"        - Simulated BER at Eb/N0 {calculation['eb_n0_db']} dB ({calculation['channel']}): {calculation['ber']:.3g}\n"
+        f"        - OFDM Symbol Error Rate (BLER): {calculation['bler']:.3g}\n"
+        f"        - Effective Data Rate: {calculation['effective_data_rate_bps']:.2f} bps\n"
+    )
+
+
+def _path_loss(calculation):
+    if "path_loss_db" not in calculation:
+        return ""
+    return f"        - Path Loss used for the Transmit Power ({calculation['propagation_model']} model, dB): {calculation['path_loss_db']}\n"
+
+
+def wireless_comm_prompt(data, calculation):
+    return f"""
+        You are a communication systems expert. A wireless communication system has passed through several blocks. Based on the following inputs and their corresponding computed data rates, provide a detailed explanation of how the data rate changes at each block and why.
+
+        User Inputs:
+        - Bandwidth: {data.get("bandwidth")} kHz
+        - Sampling Rate: {data.get("samplingRate") or 'Auto (2×Bandwidth)'} Hz
+        - Quantization Bits: {data.get("quantBits")}
+        - Source Encoder Rate: {data.get("sourceEncoderRate")}
+        - Channel Encoder Rate: {data.get("channelEncoderRate")}
+        - Interleaver Rate: {data.get("interleaverRate")}
+        - Burst Length: {data.get("burstLength")}
+
+        Computed Output Rates:
+        - Sampler Rate: {calculation['sampler_rate_bps']:.2f} bps
+        - Quantizer Rate: {calculation['quantizer_rate_bps']:.2f} bps
+        - Source Encoder Rate: {calculation['source_encoder_rate_bps']:.2f} bps
+        - Channel Encoder Rate: {calculation['channel_encoder_rate_bps']:.2f} bps
+        - Interleaver Rate: {calculation['interleaver_rate_bps']:.2f} bps
+        - Burst Formatter Rate: {calculation['burst_formatter_rate_bps']:.2f} bps
+
+        Explain the role of each block and how the rate evolves through the pipeline.
+        """
+
+
+def cellular_prompt(data, calculation):
+    return f"""
+    You are a cellular network design expert. Based on the following user inputs and computed results, explain the impact of each input on network capacity, frequency reuse, user support, and area coverage. Provide clear and helpful analysis.
+
+    User Inputs:
+    - Total Area: {data.get('area')} km²
+    - Cell Radius: {data.get('cell_radius')} km
+    - Frequency Reuse Factor: {data.get('reuse_factor')}
+    - Total Bandwidth: {data.get('bandwidth')} MHz
+    - Channel Bandwidth per User: {data.get('channel_bandwidth')} MHz
+    - Spectral Efficiency: {data.get('spectral_efficiency')} bps/Hz
+    - Number of Subscribers: {data.get('subscribers')}
+    - Calls per Day per Subscriber: {data.get('calls_per_day')}
+    - Average Call Duration: {data.get('call_duration')} minutes
+    - Grade of Service (GoS): {data.get('gos')}
+
+    Computed Results:
+    - Cell Area: {calculation['cell_area_km2']:.2f} km²
+    - Number of Cells: {calculation['num_cells']}
+    - Channels per Cell: {calculation['channels_per_cell']}
+    - Total Channels in Network: {calculation['total_channels']}
+    - Erlang per User: {calculation['erlang_per_user']:.4f}
+    - Total Network Traffic: {calculation['total_traffic_erlangs']:.2f} Erlangs
+    - Traffic per Cell: {calculation['traffic_per_cell_erlangs']:.2f} Erlangs
+    - Network Capacity: {calculation['network_capacity_bps'] / 1e6:.2f} Mbps
+    - Channels per Cell Required for the GoS (Erlang-B): {calculation['channels_required_per_cell']}
+    - Blocking Probability with the Available Channels: {calculation['blocking_probability']:.4g}
+    - Maximum Traffic per Cell at the GoS: {calculation['max_traffic_per_cell_erlangs']} Erlangs
+    - Meets the GoS Target: {calculation['meets_gos']}
+{_cell_range(calculation)}
+    Provide a structured explanation of how these parameters define the size, capacity, blocking, and efficiency of the designed cellular network.
+    """
+
+
+def _cell_range(calculation):
+    if "max_path_loss_db" not in calculation:
+        return ""
+    return (
+        f"    - Cell Radius from a {calculation['max_path_loss_db']} dB Maximum Path Loss at {calculation['frequency_mhz']} MHz "
+        f"({calculation['propagation_model']} model): {calculation['cell_radius_km']:.3f} km\n"
+    )
+
+
+def sweep_prompt(scenario, sweep, summary):
+    return f"""
+        You are a wireless network design expert. A designer swept the inputs of a {scenario} calculation over the ranges below and collected summary results. Explain the trends these results reveal, which inputs matter most, and which region of the design space looks most attractive.
+
+        Swept Inputs:
+        {sweep}
+
+        Summary (extremes of each output, with the inputs where they occur):
+        {summary['extrema']}
+
+        Limits (per curve, the extreme input value that keeps the output within bound):
+        {summary['limits']}
+
+        Keep the explanation focused on design trade-offs rather than restating every number.
+        """
+
+
+PROMPT_BUILDERS = {
+    "link_budget": link_budget_prompt,
+    "ofdm": ofdm_prompt,
+    "wireless_comm": wireless_comm_prompt,
+    "cellular": cellular_prompt,
+}
+
+
+def build_prompt(scenario, data, calculation):
+    return PROMPT_BUILDERS[scenario](data, calculation)
@@ -0,0 +1,295 @@
+import math
+from functools import lru_cache
+from statistics import NormalDist
+
+import numpy as np
+
+DEFAULT_MODEL = "free_space"
+
+# Model inputs a request may carry, besides "propagation_model" itself
+PARAMETERS = (
+    "tx_height_m", "rx_height_m", "environment", "path_loss_exponent",
+    "reference_distance_km", "shadowing_sigma_db", "location_reliability",
+)
+
+ENVIRONMENTS = ("large_city", "urban", "suburban", "rural")
+
+
+class PropagationError(ValueError):
+    pass
+
+
+def free_space_db(distance_km, frequency_mhz):
+    """Free-space path loss in dB, as in the single-design link budget."""
+    return 32.45 + 20 * np.log10(distance_km) + 20 * np.log10(frequency_mhz)
+
+
+def _free_space_range_km(loss_db, frequency_mhz):
+    return 10 ** ((loss_db - 32.45 - 20 * np.log10(frequency_mhz)) / 20)
+
+
+class Model:
+    """Path loss as a function of distance (km) and carrier frequency (MHz).
+
+    ``loss_db`` and ``range_km`` take scalars or arrays and broadcast like NumPy;
+    callers validate distance and frequency first (see :meth:`invalid_frequency`).
+    Terms that depend only on the model's parameters are computed once in ``__init__``,
+    and :func:`get_model` caches instances per parameter set.
+    """
+
+    name = None
+    title = None
+    params = {}
+    frequency_range = (0.0, math.inf)
+
+    def __init__(self, **params):
+        for key, value in params.items():
+            setattr(self, key, value)
+
+    def loss_db(self, distance_km, frequency_mhz):
+        raise NotImplementedError
+
+    def range_km(self, max_loss_db, frequency_mhz):
+        """Largest distance whose loss stays within ``max_loss_db`` (the inverse of ``loss_db``)."""
+        raise NotImplementedError
+
+    def invalid_frequency(self, frequency_mhz):
+        low, high = self.frequency_range
+        frequency_mhz = np.asarray(frequency_mhz, dtype=float)
+        return ~((frequency_mhz > 0) & (frequency_mhz >= low) & (frequency_mhz <= high))
+
+    def frequency_message(self):
+        low, high = self.frequency_range
+        if high == math.inf:
+            return "Frequency must be greater than 0."
+        return f"{self.title} is valid from {low:g} to {high:g} MHz."
+
+    def check(self, frequency_mhz):
+        if self.invalid_frequency(frequency_mhz):
+            raise PropagationError(self.frequency_message())
+
+    def path_loss_db(self, distance_km, frequency_mhz):
+        self.check(frequency_mhz)
+        return float(self.loss_db(distance_km, frequency_mhz))
+
+    def max_range_km(self, max_loss_db, frequency_mhz):
+        self.check(frequency_mhz)
+        return float(self.range_km(max_loss_db, frequency_mhz))
+
+
+class FreeSpace(Model):
+    name = "free_space"
+    title = "Free space"
+
+    def loss_db(self, distance_km, frequency_mhz):
+        return free_space_db(distance_km, frequency_mhz)
+
+    def range_km(self, max_loss_db, frequency_mhz):
+        return _free_space_range_km(max_loss_db, frequency_mhz)
+
+
+class LogDistance(Model):
+    """Free space out to ``reference_distance_km``, then ``10 * n * log10(d / d0)``.
+
+    Log-normal shadowing enters as the margin that keeps the loss within bounds at
+    ``location_reliability`` of locations, so results stay deterministic.
+    """
+
+    name = "log_distance"
+    title = "Log-distance"
+    params = {
+        "path_loss_exponent": 3.0, "reference_distance_km": 0.1,
+        "shadowing_sigma_db": 0.0, "location_reliability": 0.5,
+    }
+
+    def __init__(self, **params):
+        super().__init__(**params)
+        if not self.path_loss_exponent > 0:
+            raise PropagationError("path_loss_exponent must be greater than 0.")
+        if not self.reference_distance_km > 0:
+            raise PropagationError("reference_distance_km must be greater than 0.")
+        if not self.shadowing_sigma_db >= 0:
+            raise PropagationError("shadowing_sigma_db must be at least 0.")
+        if not 0 < self.location_reliability < 1:
+            raise PropagationError("location_reliability must be between 0 and 1.")
+        self.shadowing_margin_db = self.shadowing_sigma_db * NormalDist().inv_cdf(self.location_reliability)
+        self.slope = 10 * self.path_loss_exponent
+        self.log_reference = math.log10(self.reference_distance_km)
+
+    def loss_db(self, distance_km, frequency_mhz):
+        log_distance = np.log10(distance_km)
+        log_frequency = np.log10(frequency_mhz)
+        at_reference = 32.45 + 20 * self.log_reference + 20 * log_frequency
+        loss = np.where(
+            log_distance < self.log_reference,
+            32.45 + 20 * log_distance + 20 * log_frequency,
+            at_reference + self.slope * (log_distance - self.log_reference),
+        )
+        return loss + self.shadowing_margin_db
+
+    def range_km(self, max_loss_db, frequency_mhz):
+        loss = np.asarray(max_loss_db, dtype=float) - self.shadowing_margin_db
+        at_reference = 32.45 + 20 * self.log_reference + 20 * np.log10(frequency_mhz)
+        return np.where(
+            loss < at_reference,
+            _free_space_range_km(loss, frequency_mhz),
+            10 ** (self.log_reference + (loss - at_reference) / self.slope),
+        )
+
+
+@lru_cache(maxsize=256)
+def hata_height_terms(tx_height_m, rx_height_m, large_city):
+    """Base-station terms and the mobile antenna correction a(hm) of the Hata family.
+
+    a(hm) is returned as ``(per log10(f), constant)`` for small and medium cities and as
+    ``(below 300 MHz, from 300 MHz)`` for large ones, so only log10(f) varies per call.
+    """
+    log_hb = math.log10(tx_height_m)
+    if large_city:
+        correction = (
+            8.29 * math.log10(1.54 * rx_height_m) ** 2 - 1.1,
+            3.2 * math.log10(11.75 * rx_height_m) ** 2 - 4.97,
+        )
+    else:
+        correction = (1.1 * rx_height_m - 1.56, 0.7 * rx_height_m - 0.8)
+    return -13.82 * log_hb, 44.9 - 6.55 * log_hb, correction
+
+
+class _Hata(Model):
+    """Empirical macro-cell loss ``intercept(f) + slope * log10(d)`` of the Hata family.
+
+    Valid for base stations 30-200 m high, mobiles 1-10 m and distances of 1-20 km;
+    distances outside that span are extrapolated along the same line.
+    """
+
+    params = {"tx_height_m": 30.0, "rx_height_m": 1.5, "environment": "urban"}
+    environments = ENVIRONMENTS
+
+    def __init__(self, **params):
+        super().__init__(**params)
+        if not 30 <= self.tx_height_m <= 200:
+            raise PropagationError(f"{self.title} needs tx_height_m between 30 and 200 m.")
+        if not 1 <= self.rx_height_m <= 10:
+            raise PropagationError(f"{self.title} needs rx_height_m between 1 and 10 m.")
+        if self.environment not in self.environments:
+            raise PropagationError(f"environment must be one of {', '.join(self.environments)}")
+        self.large_city = self.environment == "large_city"
+        self.height_db, self.slope, self.correction = hata_height_terms(
+            self.tx_height_m, self.rx_height_m, self.large_city
+        )
+
+    def mobile_correction(self, log_frequency):
+        first, second = self.correction
+        if self.large_city:
+            return np.where(log_frequency < math.log10(300), first, second)
+        return first * log_frequency - second
+
+    def intercept_db(self, log_frequency):
+        raise NotImplementedError
+
+    def loss_db(self, distance_km, frequency_mhz):
+        return self.intercept_db(np.log10(frequency_mhz)) + self.slope * np.log10(distance_km)
+
+    def range_km(self, max_loss_db, frequency_mhz):
+        return 10 ** ((np.asarray(max_loss_db, dtype=float) - self.intercept_db(np.log10(frequency_mhz))) / self.slope)
+
+
+class OkumuraHata(_Hata):
+    name = "okumura_hata"
+    title = "Okumura-Hata"
+    frequency_range = (150.0, 1500.0)
+
+    def intercept_db(self, log_frequency):
+        loss = 69.55 + 26.16 * log_frequency + self.height_db - self.mobile_correction(log_frequency)
+        if self.environment == "suburban":
+            return loss - 2 * (log_frequency - math.log10(28)) ** 2 - 5.4
+        if self.environment == "rural":
+            return loss - 4.78 * log_frequency ** 2 + 18.33 * log_frequency - 40.94
+        return loss
+
+
+class Cost231Hata(_Hata):
+    name = "cost231_hata"
+    title = "COST-231 Hata"
+    frequency_range = (1500.0, 2000.0)
+    environments = ("large_city", "urban", "suburban")
+
+    def intercept_db(self, log_frequency):
+        # 3 dB metropolitan correction; medium cities and suburbs take none
+        clutter = 3.0 if self.large_city else 0.0
+        return 46.3 + 33.9 * log_frequency + self.height_db - self.mobile_correction(log_frequency) + clutter
+
+
+class TwoRay(Model):
+    """Free space up to the crossover distance 4*pi*ht*hr / lambda, then 40 dB per decade."""
+
+    name = "two_ray"
+    title = "Two-ray ground"
+    params = {"tx_height_m": 30.0, "rx_height_m": 1.5}
+
+    def __init__(self, **params):
+        super().__init__(**params)
+        if not (self.tx_height_m > 0 and self.rx_height_m > 0):
+            raise PropagationError("Antenna heights must be greater than 0.")
+        self.height_db = 20 * math.log10(self.tx_height_m * self.rx_height_m)
+        # Crossover in km is this times the frequency in MHz (lambda = 300 / f metres)
+        self.crossover_per_mhz = 4 * math.pi * self.tx_height_m * self.rx_height_m / 300 / 1000
+
+    def loss_db(self, distance_km, frequency_mhz):
+        crossover = self.crossover_per_mhz * np.asarray(frequency_mhz, dtype=float)
+        return np.where(
+            distance_km < crossover,
+            free_space_db(distance_km, frequency_mhz),
+            120 + 40 * np.log10(distance_km) - self.height_db,
+        )
+
+    def range_km(self, max_loss_db, frequency_mhz):
+        max_loss_db = np.asarray(max_loss_db, dtype=float)
+        at_crossover = free_space_db(self.crossover_per_mhz * np.asarray(frequency_mhz, dtype=float), frequency_mhz)
+        return np.where(
+            max_loss_db < at_crossover,
+            _free_space_range_km(max_loss_db, frequency_mhz),
+            10 ** ((max_loss_db - 120 + self.height_db) / 40),
+        )
+
+
+MODELS = {model.name: model for model in (FreeSpace, LogDistance, OkumuraHata, Cost231Hata, TwoRay)}
+
+
+@lru_cache(maxsize=256)
+def get_model(name, params=()):
+    """Shared model instance for ``name`` and a tuple of ``(parameter, value)`` pairs."""
+    if name not in MODELS:
+        raise PropagationError(f"Unknown propagation model: {name}. Choose one of {', '.join(MODELS)}")
+    return MODELS[name](**dict(params))
+
+
+def model_params(name, data):
+    """Parameters of model ``name`` from request inputs, defaults filled in, as a hashable tuple."""
+    if name not in MODELS:
+        raise PropagationError(f"Unknown propagation model: {name}. Choose one of {', '.join(MODELS)}")
+    params = []
+    for key, default in MODELS[name].params.items():
+        value = data.get(key)
+        if value is None or value == "":
+            value = default
+        elif isinstance(default, str):
+            value = str(value)
+        else:
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                raise PropagationError(f"{key} must be a number")
+            if not math.isfinite(value):
+                raise PropagationError(f"{key} must be a number")
+        params.append((key, value))
+    return tuple(params)
+
+
+def parse_model(data, default=None):
+    """Model selected by ``data["propagation_model"]``, or ``default``; None when neither is set."""
+    name = data.get("propagation_model") or default
+    if name is None:
+        return None
+    name = str(name)
+    return get_model(name, model_params(name, data))
@@ -0,0 +1,137 @@
+import asyncio
+
+from app.core import config
+from app.core.admission import Overloaded
+from app.core.ai_agent import explain_within, explanation_token
+from app.core.graph import GRAPHS, GraphError, GraphState
+from app.core.metrics import CALCULATIONS, ERRORS
+from app.core.prompts import build_prompt
+
+
+class LiveSession:
+    """State behind one ``/session`` WebSocket.
+
+    Messages from the client:
+
+    * ``{"type": "init", "scenario": ..., "data": {...}, "explain": true}`` starts or resets the session.
+    * ``{"type": "update", "data": {...}}`` carries only the inputs that moved.
+    * ``{"type": "explain"}`` asks for an explanation of the current state right away.
+
+    Every init or update is answered with a ``result`` message. Updates carry only the outputs
+    that changed. Explanations are debounced, so a burst of updates such as a slider drag
+    ends in one LLM call for the state it settles on.
+    """
+
+    def __init__(self, send, client=None, debounce=None):
+        self.send = send
+        self.client = client
+        self.debounce = config.SESSION_DEBOUNCE_S if debounce is None else debounce
+        self.state = None
+        self.explain = True
+        self.seq = 0
+        self._pending = None
+
+    async def handle(self, message):
+        if not isinstance(message, dict):
+            await self._error("Messages must be JSON objects")
+            return
+        kind = message.get("type")
+        if kind == "init":
+            await self._init(message)
+        elif kind == "update":
+            await self._update(message)
+        elif kind == "explain":
+            if self.state is None:
+                await self._error("Send init first")
+            else:
+                self._schedule(0)
+        else:
+            await self._error(f"Unknown message type: {kind}")
+
+    async def _init(self, message):
+        graph = GRAPHS.get(message.get("scenario"))
+        data = message.get("data") or {}
+        if graph is None or not isinstance(data, dict):
+            await self._error(f"Unknown scenario: {message.get('scenario')}")
+            return
+        self.state = GraphState(graph, data)
+        self.explain = bool(message.get("explain", True))
+        self.seq += 1
+        error = self.state.error()
+        CALCULATIONS.inc(graph.scenario, "invalid" if error else "ok")
+        await self.send({
+            "type": "result",
+            "seq": self.seq,
+            "scenario": graph.scenario,
+            "outputs": None if error else self.state.outputs(),
+            "error": error,
+        })
+        self._after_change(error)
+
+    async def _update(self, message):
+        if self.state is None:
+            await self._error("Send init first")
+            return
+        delta = message.get("data")
+        if not isinstance(delta, dict):
+            await self._error("update needs a data object")
+            return
+        try:
+            changed, recomputed = self.state.update(delta)
+        except GraphError as e:
+            await self._error(str(e))
+            return
+        self.seq += 1
+        error = self.state.error()
+        CALCULATIONS.inc(self.state.graph.scenario, "invalid" if error else "incremental")
+        await self.send({
+            "type": "result",
+            "seq": self.seq,
+            "changed": {} if error else changed,
+            "recomputed": recomputed,
+            "error": error,
+        })
+        if changed or error:
+            self._after_change(error)
+
+    def _after_change(self, error):
+        self._cancel()
+        if self.explain and error is None:
+            self._schedule(self.debounce)
+
+    def _schedule(self, delay):
+        self._cancel()
+        self._pending = asyncio.ensure_future(self._explain_later(delay, self.seq))
+
+    def _cancel(self):
+        # The shared LLM call is shielded, so an abandoned one still lands in the cache
+        if self._pending is not None and not self._pending.done():
+            self._pending.cancel()
+        self._pending = None
+
+    async def _explain_later(self, delay, seq):
+        await asyncio.sleep(delay)
+        scenario = self.state.graph.scenario
+        data = self.state.data()
+        calculation = self.state.outputs()
+        prompt = build_prompt(scenario, data, calculation)
+        try:
+            text, source = await explain_within(scenario, data, calculation, prompt, self.client)
+        except Overloaded as e:
+            ERRORS.inc(f"overloaded_{e.status_code}")
+            await self.send({"type": "explanation", "seq": seq, "error": str(e), "retry_after": e.retry_after})
+            return
+        await self.send({
+            "type": "explanation",
+            "seq": seq,
+            "text": text,
+            "source": source,
+            "explanation_id": explanation_token(scenario, data),
+        })
+
+    async def _error(self, message):
+        ERRORS.inc("session")
+        await self.send({"type": "error", "message": message})
+
+    async def close(self):
+        self._cancel()
@@ -0,0 +1,330 @@
+import math
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app.core import config
+from app.core.batch import BatchError, calculate_batch
+
+
+# A limit keeps one value per curve; cap the curves so the summary stays small
+MAX_LIMIT_CURVES = 100000
+
+
+class SweepError(ValueError):
+    pass
+
+
+class Axis:
+    """One swept input and the values it takes."""
+
+    def __init__(self, name, values):
+        self.name = name
+        self.values = np.asarray(values)
+
+    def __len__(self):
+        return len(self.values)
+
+    @classmethod
+    def parse(cls, name, spec):
+        # {"values": [...]} | {"start", "stop", "num", "scale": "linear" | "log"} | [...]
+        if isinstance(spec, (list, tuple)):
+            spec = {"values": spec}
+        if not isinstance(spec, dict):
+            raise SweepError(f"Sweep axis {name!r} must be a list or an object")
+        if "values" in spec:
+            values = spec["values"]
+            if not isinstance(values, (list, tuple)) or not values:
+                raise SweepError(f"Sweep axis {name!r} needs a non-empty list of values")
+            if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+                return cls(name, np.asarray(values, dtype=float))
+            return cls(name, np.asarray([str(v) for v in values], dtype=object))
+        try:
+            start, stop = float(spec["start"]), float(spec["stop"])
+            num = int(spec.get("num", 50))
+        except (KeyError, TypeError, ValueError):
+            raise SweepError(f"Sweep axis {name!r} needs numeric start, stop and num")
+        if num < 1:
+            raise SweepError(f"Sweep axis {name!r} needs num >= 1")
+        if spec.get("scale", "linear") == "log":
+            if start <= 0 or stop <= 0:
+                raise SweepError(f"Log sweep axis {name!r} needs positive start and stop")
+            return cls(name, np.geomspace(start, stop, num))
+        return cls(name, np.linspace(start, stop, num))
+
+
+class Limit:
+    """Largest (or smallest) value of ``axis`` whose ``output`` stays within a bound, per curve.
+
+    E.g. the maximum distance for which the required transmit power is <= 30 dBm, once for
+    every combination of the other swept inputs.
+    """
+
+    def __init__(self, output, axis, at_most=None, at_least=None, find="max"):
+        if (at_most is None) == (at_least is None):
+            raise SweepError("A limit needs exactly one of at_most / at_least")
+        if find not in ("max", "min"):
+            raise SweepError("A limit's find must be 'max' or 'min'")
+        self.output = output
+        self.axis = axis
+        self.at_most = None if at_most is None else _threshold(at_most)
+        self.at_least = None if at_least is None else _threshold(at_least)
+        self.find = find
+
+    @classmethod
+    def parse(cls, spec):
+        try:
+            return cls(
+                spec["output"],
+                spec["axis"],
+                at_most=spec.get("at_most"),
+                at_least=spec.get("at_least"),
+                find=spec.get("find", "max"),
+            )
+        except (KeyError, TypeError):
+            raise SweepError("A limit needs output, axis and at_most or at_least")
+
+
+def _threshold(value):
+    if isinstance(value, bool):
+        raise SweepError("A limit's at_most / at_least must be a number")
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise SweepError("A limit's at_most / at_least must be a number")
+    if math.isnan(value):
+        raise SweepError("A limit's at_most / at_least must be a number")
+    return value
+
+
+class SweepPlan:
+    """Lazy Cartesian product of the swept axes over a fixed ``base`` design."""
+
+    def __init__(self, scenario, base, axes, outputs=None, limits=()):
+        if not axes:
+            raise SweepError("At least one sweep axis is required")
+        names = [axis.name for axis in axes]
+        if len(set(names)) != len(names):
+            raise SweepError("Each input can only be swept once")
+        base = dict(base or {})
+        if any(isinstance(v, (list, tuple, dict)) for v in base.values()):
+            raise SweepError("base inputs must be scalars; put ranges under sweep")
+        self.scenario = scenario
+        self.base = base
+        self.axes = list(axes)
+        self.limits = list(limits)
+        # Limit outputs are always evaluated, even when the caller trims the streamed outputs
+        if outputs is not None:
+            outputs = list(outputs) + [limit.output for limit in self.limits if limit.output not in outputs]
+        self.outputs = outputs
+        self.shape = tuple(len(axis) for axis in self.axes)
+        self.total = math.prod(self.shape)
+        for limit in self.limits:
+            if limit.axis not in names:
+                raise SweepError(f"Limit axis {limit.axis!r} is not swept")
+            if self.axes[names.index(limit.axis)].values.dtype == object:
+                raise SweepError(f"Limit axis {limit.axis!r} must be numeric")
+
+    @classmethod
+    def parse(cls, body):
+        sweep = body.get("sweep")
+        if not isinstance(sweep, dict) or not sweep:
+            raise SweepError("sweep must map input names to ranges or value lists")
+        axes = [Axis.parse(name, spec) for name, spec in sweep.items()]
+        limits = [Limit.parse(spec) for spec in body.get("limits") or []]
+        return cls(body.get("scenario"), body.get("base"), axes, body.get("outputs"), limits)
+
+    def chunks(self, chunk_rows):
+        for start in range(0, self.total, chunk_rows):
+            yield start, min(start + chunk_rows, self.total)
+
+    def task(self, start, stop):
+        """Picklable arguments for :func:`evaluate_chunk`."""
+        return (
+            self.scenario,
+            self.base,
+            [axis.name for axis in self.axes],
+            [axis.values for axis in self.axes],
+            start,
+            stop,
+            self.outputs,
+        )
+
+
+def evaluate_chunk(scenario, base, names, values, start, stop, outputs=None):
+    """Evaluate rows ``[start, stop)`` of the sweep; runs in worker processes."""
+    shape = tuple(len(v) for v in values)
+    index = np.unravel_index(np.arange(start, stop), shape)
+    columns = dict(base)
+    inputs = {}
+    for name, axis_values, axis_index in zip(names, values, index):
+        inputs[name] = axis_values[axis_index]
+        columns[name] = inputs[name]
+    result = calculate_batch(scenario, columns)
+    out = result.columns if outputs is None else {k: v for k, v in result.columns.items() if k in outputs}
+    return {"start": start, "stop": stop, "inputs": inputs, "outputs": out, "errors": result.errors}
+
+
+class SweepSummary:
+    """Running min/max per output and per-curve limits, updated chunk by chunk."""
+
+    def __init__(self, plan):
+        self.plan = plan
+        self.rows = 0
+        self.failed = 0
+        self.extrema = {}
+        self._names = [axis.name for axis in plan.axes]
+        self._limit_state = []
+        for limit in plan.limits:
+            position = self._names.index(limit.axis)
+            curves = math.prod(s for i, s in enumerate(plan.shape) if i != position)
+            if curves > MAX_LIMIT_CURVES:
+                raise SweepError(f"Limit on {limit.axis!r} would track {curves} curves; at most {MAX_LIMIT_CURVES}")
+            fill = -np.inf if limit.find == "max" else np.inf
+            self._limit_state.append((limit, position, np.full(curves, fill)))
+
+    def update(self, chunk):
+        errors = chunk["errors"]
+        ok = np.fromiter((e is None for e in errors), dtype=bool, count=len(errors))
+        self.rows += len(errors)
+        self.failed += int((~ok).sum())
+        inputs = chunk["inputs"]
+        for name, values in chunk["outputs"].items():
+            if values.dtype.kind != "f":
+                continue
+            valid = ok & np.isfinite(values)
+            if not valid.any():
+                continue
+            lo = int(np.argmin(np.where(valid, values, np.inf)))
+            hi = int(np.argmax(np.where(valid, values, -np.inf)))
+            current = self.extrema.setdefault(name, {"min": math.inf, "max": -math.inf})
+            if values[lo] < current["min"]:
+                self._set(current, "min", values[lo], inputs, lo)
+            if values[hi] > current["max"]:
+                self._set(current, "max", values[hi], inputs, hi)
+
+        flat = np.arange(chunk["start"], chunk["stop"])
+        index = np.unravel_index(flat, self.plan.shape)
+        for limit, position, best in self._limit_state:
+            values = chunk["outputs"].get(limit.output)
+            if values is None:
+                raise SweepError(f"Limit output {limit.output!r} is not produced")
+            if limit.at_most is not None:
+                meets = ok & (values <= limit.at_most)
+            else:
+                meets = ok & (values >= limit.at_least)
+            other = [idx for i, idx in enumerate(index) if i != position]
+            other_shape = [s for i, s in enumerate(self.plan.shape) if i != position]
+            curve = np.ravel_multi_index(other, other_shape) if other else np.zeros(len(flat), dtype=int)
+            axis_values = inputs[limit.axis].astype(float)
+            reducer = np.maximum if limit.find == "max" else np.minimum
+            reducer.at(best, curve[meets], axis_values[meets])
+
+    @staticmethod
+    def _set(entry, which, value, inputs, row):
+        entry[which] = float(value)
+        entry[f"{which}_at"] = {k: _plain(v[row]) for k, v in inputs.items()}
+
+    def to_dict(self):
+        doc = {"rows": self.rows, "failed_rows": self.failed, "extrema": self.extrema, "limits": []}
+        for limit, position, best in self._limit_state:
+            others = [axis for i, axis in enumerate(self.plan.axes) if i != position]
+            curves = []
+            for curve, value in enumerate(best):
+                point = {}
+                if others:
+                    idx = np.unravel_index(curve, [len(a) for a in others])
+                    point = {a.name: _plain(a.values[i]) for a, i in zip(others, idx)}
+                point[limit.axis] = float(value) if np.isfinite(value) else None
+                curves.append(point)
+            doc["limits"].append({
+                "output": limit.output,
+                "axis": limit.axis,
+                "find": limit.find,
+                "at_most": limit.at_most,
+                "at_least": limit.at_least,
+                "curves": curves,
+            })
+        return doc
+
+
+def _plain(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def pool_size():
+    return config.SWEEP_WORKERS or os.cpu_count() or 1
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a threaded server process can deadlock the children
+            _pool = ProcessPoolExecutor(
+                max_workers=pool_size(), mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def run_sweep(plan, chunk_rows=None, parallel=None):
+    """Yield evaluated chunks in order, keeping at most a few chunks in memory.
+
+    Large sweeps are spread over the process pool; ``parallel`` forces the choice.
+    """
+    chunk_rows = chunk_rows or config.SWEEP_CHUNK_ROWS
+    if parallel is None:
+        parallel = plan.total >= config.SWEEP_PARALLEL_MIN_ROWS
+    if not parallel:
+        for start, stop in plan.chunks(chunk_rows):
+            yield evaluate_chunk(*plan.task(start, stop))
+        return
+
+    pool = get_pool()
+    window = 2 * pool_size()
+    pending = deque()
+    chunks = plan.chunks(chunk_rows)
+    try:
+        for start, stop in chunks:
+            pending.append(pool.submit(evaluate_chunk, *plan.task(start, stop)))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def validate(plan):
+    if plan.total > config.SWEEP_MAX_ROWS:
+        raise SweepError(f"Sweep has {plan.total} points; at most {config.SWEEP_MAX_ROWS} are allowed")
+    # Fail fast on a bad scenario, base or limit before any chunk is queued
+    try:
+        outputs = evaluate_chunk(*plan.task(0, 1))["outputs"]
+    except BatchError as e:
+        raise SweepError(str(e))
+    for limit in plan.limits:
+        values = outputs.get(limit.output)
+        if values is None:
+            raise SweepError(f"Limit output {limit.output!r} is not an output of {plan.scenario}")
+        if values.dtype.kind not in "fiub":
+            raise SweepError(f"Limit output {limit.output!r} is not numeric")
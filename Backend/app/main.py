@@ -1,11 +1,21 @@
+import logging
+import math
 import os
-from fastapi import FastAPI
-from fastapi.responses import FileResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
 
 from app.api.v1.routes import router as api_router
+from app.core import config
+from app.core.assets import get_assets
+from app.core.coverage import shutdown_executor
+from app.core.erlang import build_tables
+from app.core.jobs import shutdown_jobs
+from app.core.llm_client import close_client
+from app.core.metrics import MetricsMiddleware
+from app.core.sweep import shutdown_pool
 
 # Paths
 BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))  # .../Backend/app
@@ -17,8 +27,30 @@ ENV_PATH = os.path.join(PROJECT_ROOT, ".env")
 # Load environment variables
 load_dotenv()
 
+# App loggers stay quiet (WARNING) unless LOG_LEVEL asks for more
+app_log = logging.getLogger("app")
+app_log.setLevel(config.LOG_LEVEL)
+if not app_log.handlers:
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    app_log.addHandler(handler)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Fingerprint and precompress the frontend and solve the Erlang-B tables before the first request
+    get_assets(FRONTEND_DIR)
+    build_tables()
+    yield
+    # Release pooled Gemini connections, sweep and job workers and coverage threads on shutdown
+    await close_client()
+    shutdown_pool()
+    shutdown_jobs()
+    shutdown_executor()
+
+
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # CORS Middleware for frontend requests
 app.add_middleware(
@@ -29,19 +61,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files (like /static/images/Aws.jpg)
-app.mount("/static", StaticFiles(directory=FRONTEND_DIR), name="static")
+# Per-stage Server-Timing headers and /metrics counters (outermost, so it times everything)
+app.add_middleware(MetricsMiddleware)
 
 # Include API routes
 app.include_router(api_router, prefix="/api/v1")
 app.include_router(api_router, prefix="")  # Optional alias
 
+def serve_asset(path, request):
+    try:
+        width = float(request.query_params.get("w") or 0)
+    except ValueError:
+        width = 0
+    # Like the Width hint, only a positive, finite ?w= picks a size
+    width = width if 0 < width < math.inf else None
+    found = get_assets(FRONTEND_DIR).respond(path, request.headers, width)
+    if found is None:
+        return PlainTextResponse("Not Found", status_code=404)
+    status, body, media_type, headers = found
+    return Response(body, status_code=status, media_type=media_type, headers=headers)
+
+# Static files (like /static/images/Aws.jpg), from memory; fingerprinted URLs are cached for good
+# Sync routes: a first request for an image variant resizes it on the threadpool
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"])
+def serve_static(path: str, request: Request):
+    return serve_asset(path, request)
+
 # Route for welcome.html as homepage
-@app.get("/")
-def serve_welcome():
-    return FileResponse(os.path.join(FRONTEND_DIR, "welcome.html"), media_type="text/html")
+@app.api_route("/", methods=["GET", "HEAD"])
+def serve_welcome(request: Request):
+    return serve_asset("welcome.html", request)
 
 # Route for index.html (start button target)
-@app.get("/index.html")
-def serve_index():
-    return FileResponse(os.path.join(FRONTEND_DIR, "index.html"), media_type="text/html")
+@app.api_route("/index.html", methods=["GET", "HEAD"])
+def serve_index(request: Request):
+    return serve_asset("index.html", request)
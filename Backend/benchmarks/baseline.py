@@ -0,0 +1,82 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+# Metric name -> True when larger is better
+DIRECTIONS = {
+    "throughput_rps": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "per_call_us": False,
+}
+
+
+def metadata(**extra):
+    meta = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "commit": _commit(),
+    }
+    meta.update(extra)
+    return meta
+
+
+def _commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def save(path, report):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, current, tolerance=0.2):
+    """Regressions of ``current`` against ``baseline``, as human-readable lines.
+
+    A metric regresses when it is worse by more than ``tolerance`` (relative). Only
+    entries and metrics present in both reports are compared.
+    """
+    regressions = []
+    old_results = baseline.get("results", {})
+    for name, new in current.get("results", {}).items():
+        old = old_results.get(name)
+        if old is None:
+            continue
+        for metric, higher_is_better in DIRECTIONS.items():
+            before, after = old.get(metric), new.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            worse = -change if higher_is_better else change
+            if worse > tolerance:
+                regressions.append(f"{name} {metric}: {before:g} -> {after:g} ({change:+.0%})")
+    return regressions
+
+
+def report_comparison(path, current, tolerance):
+    """Print the comparison with the baseline at ``path``; exit status 1 on regressions."""
+    regressions = compare(load(path), current, tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    if not regressions:
+        print(f"No regressions beyond {tolerance:.0%} against {path}")
+    return 1 if regressions else 0
@@ -0,0 +1,202 @@
+"""Configurable stand-in for the Gemini ``generateContent`` / ``streamGenerateContent`` API.
+
+Run on its own with ``python -m benchmarks.fake_gemini --port 8787 --latency 0.3`` and point
+the app at it with ``GEMINI_BASE_URL=http://127.0.0.1:8787/v1beta``, or start it in-process
+through :class:`FakeGemini`.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY_TEXT = (
+    "The design meets its targets. Each stage scales the bit rate by its coding rate, "
+    "so the channel encoder dominates the final figure."
+)
+
+
+def gemini_body(text):
+    return {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+
+
+class FakeGemini(ThreadingHTTPServer):
+    """Gemini stub with injectable latency, errors and streaming.
+
+    * ``latency`` + uniform(0, ``jitter``) seconds pass before the first byte.
+    * A fraction ``error_rate`` of requests fail with ``error_status``.
+    * Streamed replies arrive in ``chunks`` SSE events, ``chunk_delay`` seconds apart.
+
+    Tests can also queue one-off replies with :meth:`reply`; those are served first, in
+    order. Requests are recorded in ``requests`` and peak concurrency in ``peak``.
+    """
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                 error_status=503, chunks=4, chunk_delay=0.0, text=REPLY_TEXT, seed=None):
+        super().__init__((host, port), _Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.chunks = max(1, int(chunks))
+        self.chunk_delay = chunk_delay
+        self.text = text
+        self.script = []
+        self.requests = []
+        self.errors = 0
+        self.active = 0
+        self.peak = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1beta"
+
+    def settings(self):
+        return {
+            "latency": self.latency, "jitter": self.jitter, "error_rate": self.error_rate,
+            "error_status": self.error_status, "chunks": self.chunks, "chunk_delay": self.chunk_delay,
+        }
+
+    def reply(self, status=200, text="ok", delay=0.0, trickle=None, chunks=None):
+        """Queue one reply. ``trickle`` spaces streamed events, or dribbles a plain body byte by byte."""
+        with self._lock:
+            self.script.append({"status": status, "text": text, "delay": delay, "trickle": trickle, "chunks": chunks})
+
+    def plan(self, stream):
+        """The next request's reply: the first queued one, else one drawn from the settings."""
+        with self._lock:
+            if self.script:
+                return self.script.pop(0)
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            if self._random.random() < self.error_rate:
+                self.errors += 1
+                return {"status": self.error_status, "text": "injected failure", "delay": delay}
+        return {"status": 200, "text": self.text, "delay": delay, "chunks": self.pieces(),
+                "trickle": self.chunk_delay if stream else None}
+
+    def pieces(self):
+        size = -(-len(self.text) // self.chunks)
+        return [self.text[i:i + size] for i in range(0, len(self.text), size)] or [self.text]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with server._lock:
+            server.requests.append({"path": self.path, "key": self.headers.get("x-goog-api-key"), "body": body})
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+        try:
+            self._answer(server.plan("streamGenerateContent" in self.path))
+        finally:
+            with server._lock:
+                server.active -= 1
+
+    def _answer(self, reply):
+        time.sleep(reply["delay"])
+        if reply["status"] != 200:
+            payload = json.dumps({"error": {"code": reply["status"], "message": reply["text"]}}).encode()
+            self._send(reply["status"], "application/json", payload)
+        elif "streamGenerateContent" in self.path:
+            self._stream(reply["chunks"] or [reply["text"]], reply["trickle"])
+        elif reply["trickle"]:
+            self._dribble(json.dumps(gemini_body(reply["text"])).encode(), reply["trickle"])
+        else:
+            self._send(200, "application/json", json.dumps(gemini_body(reply["text"])).encode())
+
+    def _stream(self, pieces, gap):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, piece in enumerate(pieces):
+            if i and gap:
+                time.sleep(gap)
+            event = ("data: " + json.dumps(gemini_body(piece)) + "\r\n\r\n").encode()
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(event), event))
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _dribble(self, payload, gap):
+        # One byte at a time, so no single read ever times out
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        for i in range(len(payload)):
+            self.wfile.write(payload[i:i + 1])
+            self.wfile.flush()
+            time.sleep(gap)
+
+    def _send(self, status, content_type, payload):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def add_arguments(parser):
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before the first byte")
+    parser.add_argument("--jitter", type=float, default=0.05, help="extra uniform random latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--chunks", type=int, default=4, help="SSE events per streamed reply")
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="seconds between streamed events")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def from_arguments(args, host="127.0.0.1", port=0):
+    return FakeGemini(
+        host, port, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        error_status=args.error_status, chunks=args.chunks, chunk_delay=args.chunk_delay, seed=args.seed,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    server = from_arguments(args, args.host, args.port)
+    print(f"Fake Gemini on {server.base_url} {server.settings()}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""Load benchmark: drive the API at fixed concurrency levels against a fake Gemini server.
+
+Examples (from ``Backend/``)::
+
+    python -m benchmarks.load --concurrency 1,8,32 --requests 200 --save baseline.json
+    python -m benchmarks.load --mode uvicorn --workers 2 --compare baseline.json
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import httpx
+import numpy as np
+
+from benchmarks import baseline, fake_gemini
+from benchmarks.workloads import new_nonce, targets
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def rss_mb(pid=None):
+    """Resident memory of ``pid`` and its child processes (Linux), or None."""
+    pid = pid or os.getpid()
+    total = 0
+    pending = [pid]
+    try:
+        while pending:
+            current = pending.pop()
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+            with open(f"/proc/{current}/task/{current}/children") as f:
+                pending.extend(int(child) for child in f.read().split())
+    except (OSError, ValueError):
+        return None
+    return round(total / 1024, 1)
+
+
+def summarize(latencies, statuses, elapsed):
+    ms = np.asarray(latencies) * 1000
+    errors = sum(n for status, n in statuses.items() if not status.startswith(("2", "3")))
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99]) if ms.size else (np.nan,) * 3
+    return {
+        "requests": int(ms.size),
+        "errors": errors,
+        "status": dict(sorted(statuses.items())),
+        "elapsed_s": round(elapsed, 4),
+        "throughput_rps": round(ms.size / elapsed, 2) if elapsed > 0 else None,
+        "mean_ms": round(float(ms.mean()), 3) if ms.size else None,
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+    }
+
+
+async def run_level(client, target, concurrency, requests, warmup=0):
+    """Send ``requests`` requests from ``concurrency`` workers, each its own admission client."""
+    nonce = new_nonce()
+    for i in range(warmup):
+        method, path, kwargs = target.request(-1 - i, nonce)
+        await client.request(method, path, **kwargs)
+
+    latencies = []
+    statuses = Counter()
+    indices = iter(range(requests))
+
+    async def worker(number):
+        headers = {"X-Client-Id": f"bench-{number}"}
+        for i in indices:
+            method, path, kwargs = target.request(i, nonce)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, headers=headers, **kwargs)
+                status = str(response.status_code)
+            except httpx.HTTPError:
+                status = "transport"
+            latencies.append(time.perf_counter() - start)
+            statuses[status] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return summarize(latencies, statuses, time.perf_counter() - start)
+
+
+async def run_all(client, selected, levels, requests, warmup, memory, progress=None):
+    results = {}
+    for target in selected:
+        for concurrency in levels:
+            stats = await run_level(client, target, concurrency, requests, warmup)
+            stats.update(target=target.name, concurrency=concurrency, rss_mb=memory())
+            results[f"{target.name}@{concurrency}"] = stats
+            if progress:
+                progress(f"{target.name}@{concurrency}", stats)
+    return results
+
+
+async def _run_in_process(selected, levels, requests, warmup, fake, progress):
+    # Imported here so ``--mode uvicorn`` never loads the app into the driver process
+    from app.core import llm_client
+    from app.main import app
+
+    previous = llm_client.get_client()
+    llm_client.set_client(llm_client.GeminiClient(base_url=fake.base_url, api_key="benchmark"))
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            return await run_all(client, selected, levels, requests, warmup, rss_mb, progress)
+    finally:
+        await llm_client.close_client()
+        llm_client.set_client(previous)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_uvicorn(fake, workers=1, port=None, env=None):
+    """Serve ``app.main:app`` in a subprocess wired to ``fake``; returns (process, base_url)."""
+    port = port or _free_port()
+    child_env = dict(os.environ, GEMINI_BASE_URL=fake.base_url, GEMINI_API_KEY="benchmark", LLM_CACHE_PATH="")
+    child_env.update(env or {})
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=child_env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with status {process.returncode}")
+        try:
+            if httpx.get(f"{base_url}/api/v1/metrics", timeout=1).status_code == 200:
+                return process, base_url
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("uvicorn did not start within 60 s")
+
+
+async def _run_uvicorn(selected, levels, requests, warmup, fake, workers, progress):
+    process, base_url = start_uvicorn(fake, workers)
+    try:
+        limits = httpx.Limits(max_connections=max(levels) * 2, max_keepalive_connections=max(levels))
+        async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+            return await run_all(
+                client, selected, levels, requests, warmup, lambda: rss_mb(process.pid), progress
+            )
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def run(target_names=None, levels=(1, 8, 32), requests=200, warmup=5, mode="inprocess", workers=1,
+        fake=None, progress=None):
+    """Run the load benchmark and return a report ready for :func:`baseline.save`."""
+    available = targets()
+    names = target_names or list(available)
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown targets {unknown}; choose from {sorted(available)}")
+    selected = [available[name] for name in names]
+    own_fake = fake is None
+    if own_fake:
+        fake = fake_gemini.FakeGemini().start()
+    try:
+        if mode == "uvicorn":
+            results = asyncio.run(_run_uvicorn(selected, levels, requests, warmup, fake, workers, progress))
+        else:
+            results = asyncio.run(_run_in_process(selected, levels, requests, warmup, fake, progress))
+    finally:
+        if own_fake:
+            fake.stop()
+    meta = baseline.metadata(
+        kind="load", mode=mode, workers=workers if mode == "uvicorn" else None,
+        requests_per_level=requests, fake_gemini=fake.settings(),
+    )
+    return {"meta": meta, "results": results}
+
+
+def _print_row(name, stats):
+    print(
+        f"{name:<24} {stats['throughput_rps']:>9} rps  p50 {stats['p50_ms']:>9.2f} ms  "
+        f"p95 {stats['p95_ms']:>9.2f} ms  p99 {stats['p99_ms']:>9.2f} ms  "
+        f"errors {stats['errors']:>4}  rss {stats['rss_mb']} MB",
+        flush=True,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--targets", help=f"comma-separated, default all of: {', '.join(targets())}")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="requests per target and level")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--mode", choices=("inprocess", "uvicorn"), default="inprocess")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--save", help="write the report to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON to check for regressions (exit 1 if any)")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown")
+    fake_gemini.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    fake = fake_gemini.from_arguments(args).start()
+    try:
+        report = run(
+            args.targets.split(",") if args.targets else None,
+            [int(level) for level in args.concurrency.split(",")],
+            args.requests, args.warmup, args.mode, args.workers, fake, _print_row,
+        )
+    finally:
+        fake.stop()
+    if args.save:
+        baseline.save(args.save, report)
+    if args.compare:
+        return baseline.report_comparison(args.compare, report, args.tolerance)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Microbenchmarks for the pure calculators in ``app/api/v1/routes.py``.
+
+``python -m benchmarks.micro --save micro.json`` / ``--compare micro.json``
+"""
+import argparse
+import statistics
+import sys
+import timeit
+
+from app.api.v1.routes import SCENARIOS
+from app.core.batch import calculate_batch
+from app.core.prompts import build_prompt
+from benchmarks import baseline
+from benchmarks.workloads import SCENARIO_DATA
+
+BATCH_ROWS = 10000
+
+
+def measure(func, repeat=5, min_time=0.2):
+    """Best and median time per call (microseconds) over ``repeat`` timed runs."""
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    # autorange stops at 0.2 s; scale up so each run lasts about min_time
+    number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    runs = [t / number * 1e6 for t in timer.repeat(repeat, number)]
+    return {
+        "per_call_us": round(min(runs), 4),
+        "median_us": round(statistics.median(runs), 4),
+        "calls_per_run": number,
+    }
+
+
+def benchmarks():
+    """Name -> (callable, rows per call)."""
+    found = {}
+    for scenario, data in SCENARIO_DATA.items():
+        calculator = SCENARIOS[scenario]
+        found[f"calc:{scenario}"] = (lambda calculator=calculator, data=data: calculator(data), 1)
+        calculation = calculator(data)
+        found[f"prompt:{scenario}"] = (
+            lambda scenario=scenario, data=data, calculation=calculation: build_prompt(scenario, data, calculation),
+            1,
+        )
+        columns = {name: [value] * BATCH_ROWS for name, value in data.items()}
+        # Reported per row, so it compares directly with calc:<scenario>
+        found[f"batch_row:{scenario}"] = (
+            lambda scenario=scenario, columns=columns: calculate_batch(scenario, columns),
+            BATCH_ROWS,
+        )
+    return found
+
+
+def run(names=None, repeat=5, min_time=0.2, progress=None):
+    available = benchmarks()
+    names = names or list(available)
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown benchmarks {unknown}; choose from {sorted(available)}")
+    results = {}
+    for name in names:
+        func, per = available[name]
+        stats = measure(func, repeat, min_time)
+        if per != 1:
+            stats = {key: round(value / per, 4) if key.endswith("_us") else value for key, value in stats.items()}
+            stats["rows"] = per
+        results[name] = stats
+        if progress:
+            progress(name, stats)
+    return {"meta": baseline.metadata(kind="micro", repeat=repeat), "results": results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", help="comma-separated benchmark names")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timed run")
+    parser.add_argument("--save")
+    parser.add_argument("--compare")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+    report = run(
+        args.only.split(",") if args.only else None, args.repeat, args.min_time,
+        lambda name, stats: print(f"{name:<24} {stats['per_call_us']:>12.3f} us/call", flush=True),
+    )
+    if args.save:
+        baseline.save(args.save, report)
+    if args.compare:
+        return baseline.report_comparison(args.compare, report, args.tolerance)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+import uuid
+
+from app.core.ai_agent import explanation_token
+
+# One representative design per /calculate scenario
+SCENARIO_DATA = {
+    "link_budget": {
+        "link_margin_db": 10, "temperature_k": 290, "noise_figure_db": 5, "bitrate": 1e6, "eb_n0_db": 10,
+        "distance": 2, "frequency": 2400, "tx_gain": 15, "rx_gain": 3, "system_loss_db": 2,
+    },
+    "ofdm": {
+        "bandwidth": 180, "subcarrierSpacing": 15, "modulation": "64", "numSymbols": 7,
+        "duration_of_RB": 0.5, "parallelRB": 25,
+    },
+    "wireless_comm": {
+        "bandwidth": 4, "quantBits": 8, "sourceEncoderRate": 0.5, "channelEncoderRate": 0.5,
+        "interleaverRate": 1, "burstLength": 1,
+    },
+    "cellular": {
+        "area": 100, "cell_radius": 1, "reuse_factor": 7, "bandwidth": 25, "channel_bandwidth": 0.2,
+        "spectral_efficiency": 2, "subscribers": 50000, "calls_per_day": 3, "call_duration": 2, "gos": 0.02,
+    },
+}
+
+
+class Target:
+    """One endpoint under load; ``request(i)`` gives the i-th request as (method, path, kwargs)."""
+
+    def __init__(self, name, method, path, json_body=None, params=None, calls_llm=False):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.json_body = json_body
+        self.params = params
+        self.calls_llm = calls_llm
+
+    def request(self, i, nonce):
+        kwargs = {}
+        if self.json_body is not None:
+            kwargs["json"] = self.json_body
+        if self.params is not None:
+            kwargs["params"] = self.params(i, nonce)
+        path = self.path(i, nonce) if callable(self.path) else self.path
+        return self.method, path, kwargs
+
+
+def _explain_path(i, nonce):
+    # A fresh design per request, so every stream reaches the (fake) LLM instead of the cache
+    data = dict(SCENARIO_DATA["wireless_comm"], quantBits=8 + i % 8, run=f"{nonce}-{i}")
+    return f"/api/v1/explain/{explanation_token('wireless_comm', data)}"
+
+
+def targets():
+    found = {
+        f"calc:{scenario}": Target(
+            f"calc:{scenario}", "POST", "/api/v1/calculate", json_body={"scenario": scenario, "data": data}
+        )
+        for scenario, data in SCENARIO_DATA.items()
+    }
+    found["ai"] = Target(
+        "ai", "GET", "/api/v1/ai", params=lambda i, nonce: {"prompt": f"benchmark {nonce} {i}"}, calls_llm=True
+    )
+    found["explain"] = Target("explain", "GET", _explain_path, calls_llm=True)
+    found["static:welcome"] = Target("static:welcome", "GET", "/")
+    found["static:index"] = Target("static:index", "GET", "/index.html")
+    found["static:image"] = Target("static:image", "GET", "/static/images/space.jpg")
+    return found
+
+
+def new_nonce():
+    return uuid.uuid4().hex[:8]
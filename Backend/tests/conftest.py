@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+# Make ``app`` importable when pytest runs from the Backend directory or the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import admission, llm_cache, llm_client  # noqa: E402
+from app.core.admission import AdmissionController, SingleFlight  # noqa: E402
+from app.core.llm_cache import LRUCache, ResponseCache  # noqa: E402
+from app.core.llm_client import GeminiClient  # noqa: E402
+from benchmarks.fake_gemini import FakeGemini  # noqa: E402
+
+
+@pytest.fixture
+def stub():
+    """The benchmarks' fake Gemini, answering ``"ok"`` in one piece unless replies are queued."""
+    with FakeGemini(text="ok", chunks=1) as server:
+        yield server
+
+
+@pytest.fixture
+def gemini(stub, monkeypatch):
+    """The stub wired in as Gemini, with a fresh response cache, admission controller and flights."""
+    monkeypatch.setattr(llm_cache, "_cache", ResponseCache(LRUCache(16, 60)))
+    monkeypatch.setattr(llm_client, "_client", GeminiClient(base_url=stub.base_url, api_key="test-key", max_retries=0))
+    monkeypatch.setattr(admission, "_admission", AdmissionController(8, 64, 8, 10))
+    monkeypatch.setattr(admission, "_flights", SingleFlight())
+    return stub
@@ -0,0 +1,151 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import admission, ai_agent
+from app.core.admission import AdmissionController, Overloaded
+from app.main import app
+
+
+def test_queue_limits_shed_with_429_and_503():
+    async def scenario():
+        gate = AdmissionController(max_active=1, max_queue=2, per_client=1, queue_timeout=5)
+        await gate.acquire("a")
+        waiting = asyncio.ensure_future(gate.acquire("b"))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as client_limit:
+            await gate.acquire("b")
+        queued_c = asyncio.ensure_future(gate.acquire("c"))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as full:
+            await gate.acquire("d")
+        gate.release()
+        await waiting
+        gate.release()
+        await queued_c
+        gate.release()
+        return client_limit.value.status_code, full.value.status_code, gate.stats()
+
+    client_status, full_status, stats = asyncio.run(scenario())
+    assert (client_status, full_status) == (429, 503)
+    assert stats["active"] == 0 and stats["queued"] == 0
+    assert stats["rejected_client"] == 1 and stats["rejected_full"] == 1
+
+
+def test_freed_slots_rotate_between_clients():
+    async def scenario():
+        gate = AdmissionController(max_active=1, max_queue=10, per_client=5, queue_timeout=5)
+        await gate.acquire("busy")
+        order = []
+
+        async def request(client):
+            await gate.acquire(client)
+            order.append(client)
+
+        tasks = [asyncio.ensure_future(request("busy")) for _ in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.ensure_future(request("quiet")))
+        await asyncio.sleep(0)
+        for _ in tasks:
+            gate.release()
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()) == ["busy", "quiet", "busy", "busy"]
+
+
+def test_queue_timeout_sheds_with_503():
+    async def scenario():
+        gate = AdmissionController(max_active=1, max_queue=5, per_client=5, queue_timeout=0.05)
+        await gate.acquire("a")
+        with pytest.raises(Overloaded) as timed_out:
+            await gate.acquire("b")
+        return timed_out.value.status_code, gate.stats()
+
+    status, stats = asyncio.run(scenario())
+    assert status == 503
+    assert stats["queued"] == 0 and stats["timed_out"] == 1
+
+
+def test_identical_explanations_share_one_call(gemini):
+    gemini.reply(text="Shared answer.", delay=0.2)
+
+    async def scenario():
+        calls = [ai_agent.explain_within("ofdm", {"x": 1}, {"total_bits": 1}, "prompt", deadline=5) for _ in range(5)]
+        return await asyncio.gather(*calls)
+
+    assert asyncio.run(scenario()) == [("Shared answer.", "llm")] * 5
+    assert len(gemini.requests) == 1
+    assert admission.get_flights().stats() == {"leaders": 1, "coalesced": 4}
+
+
+def test_identical_streams_share_one_upstream(gemini):
+    gemini.reply(chunks=["one ", "two ", "three"], trickle=0.05)
+
+    async def scenario():
+        async def read():
+            return await _read(await ai_agent.open_explanation("ofdm", {}, {"total_bits": 2}, "prompt"))
+
+        first = asyncio.ensure_future(read())
+        await asyncio.sleep(0.08)  # joins mid-stream and still gets the replayed head
+        second = asyncio.ensure_future(read())
+        return await asyncio.gather(first, second)
+
+    assert asyncio.run(scenario()) == ["one two three", "one two three"]
+    assert len(gemini.requests) == 1
+    assert admission.get_admission().stats()["active"] == 0
+
+
+def test_endpoints_shed_load(gemini, monkeypatch):
+    monkeypatch.setattr(admission, "_admission", AdmissionController(0, 0, 1, 1))
+    with TestClient(app) as client:
+        response = client.get("/api/v1/ai", params={"prompt": "hi"})
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "2"
+        body = client.post("/calculate", json={"scenario": "ofdm", "data": {"bandwidth": 180}}).json()
+        assert client.get(body["explanation_url"]).status_code == 503
+    assert gemini.requests == []
+
+
+def test_inline_explanation_joins_a_stream_in_flight(gemini):
+    gemini.reply(chunks=["one ", "two ", "three"], trickle=0.05)
+
+    async def scenario():
+        chunks = await ai_agent.open_explanation("ofdm", {}, {"total_bits": 3}, "prompt")
+        reader = asyncio.ensure_future(_read(chunks))
+        await asyncio.sleep(0.02)
+        inline = await ai_agent.explain_within("ofdm", {}, {"total_bits": 3}, "prompt", deadline=5)
+        return await reader, inline
+
+    streamed, inline = asyncio.run(scenario())
+    assert streamed == "one two three"
+    assert inline == ("one two three", "llm")
+    assert len(gemini.requests) == 1
+
+
+async def _read(chunks):
+    return "".join([chunk async for chunk in chunks])
+
+
+def test_calculate_inline_while_the_same_stream_is_open(gemini):
+    gemini.reply(chunks=["streamed ", "answer"], trickle=0.2)
+    design = {"scenario": "ofdm", "data": {"bandwidth": 180}}
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            url = (await client.post("/calculate", json=design)).json()["explanation_url"]
+            stream = asyncio.ensure_future(client.get(url))
+            await asyncio.sleep(0.1)
+            inline = await client.post("/calculate", json={**design, "explain": "inline"})
+            return inline, await stream
+
+    inline, stream = asyncio.run(scenario())
+    assert inline.status_code == 200
+    assert inline.json()["gemini"] == "streamed answer"
+    assert '"text": "answer"' in stream.text
+    assert len(gemini.requests) == 1
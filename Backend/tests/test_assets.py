@@ -0,0 +1,129 @@
+import gzip
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import assets, config
+from app.core.assets import IMMUTABLE, REVALIDATE, AssetStore, etag_matches
+from app.main import app
+
+CSS = b"body { color: #123456; }\n" * 100
+
+
+@pytest.fixture
+def site(tmp_path):
+    (tmp_path / "images").mkdir()
+    (tmp_path / "style.css").write_bytes(CSS)
+    (tmp_path / "images" / "logo.png").write_bytes(b"\x89PNG not really")
+    (tmp_path / "page.html").write_text(
+        '<link href="/static/style.css"><img src="/static/images\\logo.png"><a href="/static/missing.js">'
+        + "<p>text</p>" * 200
+    )
+    return tmp_path
+
+
+def test_pages_link_fingerprinted_urls(site):
+    store = AssetStore(str(site))
+    css, logo = store.assets["style.css"], store.assets["images/logo.png"]
+    assert css.url.startswith("style.") and css.url.endswith(".css") and css.url != "style.css"
+    page = store.assets["page.html"].identity.body.decode()
+    assert f"/static/{css.url}" in page and f"/static/{logo.url}" in page
+    assert "/static/missing.js" in page
+    assert store.lookup(css.url) == (css, True)
+    assert store.lookup("style.css") == (css, False)
+    assert store.lookup("style.000000000000.css") == (None, False)
+
+    # Editing a linked file changes the page's URL too
+    (site / "style.css").write_bytes(CSS + b"p {}")
+    assert AssetStore(str(site)).assets["page.html"].digest != store.assets["page.html"].digest
+
+
+def test_encoding_negotiation_and_conditional_requests(site):
+    store = AssetStore(str(site))
+    status, body, media_type, headers = store.respond("style.css", {"accept-encoding": "gzip;q=0.5, identity"})
+    assert status == 200 and media_type == "text/css; charset=utf-8"
+    assert headers["Content-Encoding"] == "gzip" and headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(body) == CSS and len(body) < len(CSS)
+    assert headers["Cache-Control"] == REVALIDATE
+
+    status, body, _, plain = store.respond("style.css", {"accept-encoding": "gzip;q=0"})
+    assert body == CSS and "Content-Encoding" not in plain and plain["ETag"] != headers["ETag"]
+
+    hashed = store.assets["style.css"].url
+    status, body, _, cached = store.respond(hashed, {"if-none-match": f'"other", W/{headers["ETag"]}',
+                                                     "accept-encoding": "gzip"})
+    assert (status, body) == (304, b"") and cached["Cache-Control"] == IMMUTABLE
+    assert store.respond("nope.css", {}) is None
+
+    # Binary files are not compressed and carry no Vary
+    _, _, _, headers = store.respond("images/logo.png", {"accept-encoding": "gzip"})
+    assert "Content-Encoding" not in headers and "Vary" not in headers
+
+
+def test_etag_matching():
+    assert etag_matches('"a", "b"', '"b"')
+    assert etag_matches('W/"b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches('"bb"', '"b"')
+    assert not etag_matches(None, '"b"')
+
+
+def test_large_images_get_webp_and_downscaled_variants(tmp_path, monkeypatch):
+    Image = pytest.importorskip("PIL.Image")
+    monkeypatch.setattr(config, "ASSET_IMAGE_MIN_BYTES", 1000)
+    buffer = io.BytesIO()
+    Image.effect_noise((2000, 1000), 64).convert("RGB").save(buffer, "JPEG", quality=95)
+    (tmp_path / "space.jpg").write_bytes(buffer.getvalue())
+    store = AssetStore(str(tmp_path), widths=[480, 960, 1920])
+    asset = store.assets["space.jpg"]
+    assert asset.resizable and asset.width == 2000
+
+    status, body, media_type, headers = store.respond("space.jpg", {"accept": "image/avif,image/webp,*/*",
+                                                                    "sec-ch-viewport-width": "400", "sec-ch-dpr": "2"})
+    assert media_type == "image/webp" and "Accept" in headers["Vary"]
+    with Image.open(io.BytesIO(body)) as image:
+        assert image.format == "WEBP" and image.size == (960, 480)
+    status, body, _, _ = store.respond("space.jpg", {"accept": "image/webp", "sec-ch-viewport-width": "400",
+                                                     "sec-ch-dpr": "2", "if-none-match": headers["ETag"]})
+    assert (status, body) == (304, b"")
+
+    _, body, media_type, _ = store.respond("space.jpg", {"accept": "image/jpeg"}, query_width=300)
+    with Image.open(io.BytesIO(body)) as image:
+        assert media_type == "image/jpeg" and image.width == 480
+    # Never upscaled: wider requests get the original
+    _, body, _, headers = store.respond("space.jpg", {"width": "3000"})
+    assert body == asset.identity.body and headers["ETag"] == asset.identity.etag
+
+
+def test_query_width_must_be_positive_and_finite(tmp_path, monkeypatch):
+    Image = pytest.importorskip("PIL.Image")
+    monkeypatch.setattr(config, "ASSET_IMAGE_MIN_BYTES", 1000)
+    buffer = io.BytesIO()
+    Image.effect_noise((2000, 1000), 64).convert("RGB").save(buffer, "JPEG", quality=95)
+    (tmp_path / "space.jpg").write_bytes(buffer.getvalue())
+    store = AssetStore(str(tmp_path), widths=[480, 960])
+    monkeypatch.setattr(assets, "_store", store)
+    with TestClient(app) as client:
+        for width in ("-5", "0", "nan", "inf", "wide"):
+            response = client.get(f"/static/space.jpg?w={width}", headers={"Accept": "image/jpeg"})
+            assert response.content == store.assets["space.jpg"].identity.body, width
+        response = client.get("/static/space.jpg?w=300", headers={"Accept": "image/jpeg"})
+        with Image.open(io.BytesIO(response.content)) as image:
+            assert image.width == 480
+
+
+def test_app_serves_pages_and_static_files_from_memory():
+    with TestClient(app) as client:
+        page = client.get("/", headers={"Accept-Encoding": "gzip"})
+        assert page.status_code == 200 and page.headers["cache-control"] == REVALIDATE
+        assert "Accept-CH" in page.headers
+        assert client.get("/", headers={"If-None-Match": page.headers["etag"], "Accept-Encoding": "gzip"}).status_code == 304
+        store = assets.get_assets(None)
+        logo = store.assets["images/BZU.png"]
+        assert f"/static/{logo.url}" in page.text
+        response = client.get(f"/static/{logo.url}")
+        assert response.headers["cache-control"] == IMMUTABLE
+        assert response.content == logo.identity.body
+        assert client.get("/index.html").headers["content-type"] == "text/html; charset=utf-8"
+        assert client.get("/static/images/../../Backend/app/main.py").status_code == 404
@@ -0,0 +1,135 @@
+import io
+import json
+import random
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.v1.routes import SCENARIOS
+from app.core.batch import BatchError, calculate_batch
+from app.main import app
+
+
+def random_rows(scenario, n, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n):
+        if scenario == "link_budget":
+            row = {
+                "link_margin_db": rng.uniform(0, 10), "temperature_k": rng.uniform(200, 400),
+                "noise_figure_db": rng.uniform(0, 8), "bitrate": rng.uniform(1e3, 1e8),
+                "eb_n0_db": rng.uniform(0, 20), "distance": rng.uniform(0.01, 100),
+                "frequency": rng.uniform(100, 6000), "tx_gain": rng.uniform(0, 20),
+                "rx_gain": rng.uniform(0, 20), "system_loss_db": rng.uniform(0, 5),
+            }
+        elif scenario == "ofdm":
+            row = {
+                "bandwidth": rng.choice([180, 360, 720]), "subcarrierSpacing": rng.choice([15, 30, 60]),
+                "modulation": rng.choice(["BPSK", "QPSK", "16", "64", "256", "QAM"]),
+                "numSymbols": rng.randint(1, 14), "duration_of_RB": rng.uniform(0.1, 1),
+                "parallelRB": rng.randint(1, 100),
+            }
+        elif scenario == "wireless_comm":
+            row = {
+                "bandwidth": rng.uniform(1, 100), "quantBits": rng.randint(1, 16),
+                "sourceEncoderRate": rng.uniform(0.1, 1), "channelEncoderRate": rng.uniform(0.1, 1),
+                "interleaverRate": rng.uniform(1, 2), "burstLength": rng.uniform(1, 4),
+            }
+        else:
+            row = {
+                "area": rng.uniform(10, 1000), "cell_radius": rng.uniform(0.5, 5),
+                "reuse_factor": rng.choice([1, 3, 4, 7, 12]), "bandwidth": rng.uniform(5, 40),
+                "channel_bandwidth": rng.choice([0.025, 0.2]), "spectral_efficiency": rng.uniform(1, 5),
+                "subscribers": rng.randint(1000, 100000), "calls_per_day": rng.uniform(1, 10),
+                "call_duration": rng.uniform(1, 5), "gos": 0.02,
+            }
+        rows.append(row)
+    return rows
+
+
+def to_columns(rows):
+    return {key: [row[key] for row in rows] for key in rows[0]}
+
+
+@pytest.mark.parametrize("scenario", ["link_budget", "ofdm", "wireless_comm", "cellular"])
+def test_batch_matches_scalar_calculator(scenario):
+    rows = random_rows(scenario, 50)
+    result = calculate_batch(scenario, to_columns(rows))
+    assert result.errors == [None] * 50
+    for index, row in enumerate(rows):
+        expected = SCENARIOS[scenario](row)
+        for name, values in result.columns.items():
+            assert values[index] == pytest.approx(expected[name], rel=1e-9, abs=1e-9), name
+
+
+def test_scalars_broadcast_and_defaults_apply():
+    result = calculate_batch("link_budget", {"distance": [1, 2, 4], "frequency": 900})
+    assert result.rows == 3
+    assert list(result.columns["frequency_mhz"]) == [900, 900, 900]
+    assert list(result.columns["temperature_K"]) == [290, 290, 290]
+    fspl = result.columns["fspl_db"]
+    assert fspl[1] - fspl[0] == pytest.approx(6.02, abs=0.02)
+
+
+def test_per_row_validation_errors():
+    columns = to_columns(random_rows("wireless_comm", 4))
+    columns["bandwidth"][1] = 0
+    columns["quantBits"][2] = 40
+    columns["burstLength"][3] = "abc"
+    result = calculate_batch("wireless_comm", columns)
+    assert result.errors == [
+        None,
+        "Bandwidth must be greater than 0.",
+        "Quantization bits must be between 1 and 32.",
+        "Burst length must be > 0.",
+    ]
+    assert np.isnan(result.columns["sampler_rate_bps"][1])
+    assert list(result.ok) == [True, False, False, False]
+
+
+def test_request_level_errors():
+    with pytest.raises(BatchError):
+        calculate_batch("link_budget", {"distance": [1, 2], "frequency": [1, 2, 3]})
+    with pytest.raises(BatchError):
+        calculate_batch("nope", {})
+    with pytest.raises(BatchError):
+        calculate_batch("ofdm", {"bandwidth": [1, 2, 3]}, max_rows=2)
+
+
+def test_batch_endpoint_formats():
+    columns = to_columns(random_rows("cellular", 5))
+    columns["cell_radius"][4] = 0
+    body = {"scenario": "cellular", "data": columns}
+    with TestClient(app) as client:
+        response = client.post("/api/v1/calculate/batch", json=body)
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert response.headers["x-batch-errors"] == "1"
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["row"] for line in lines] == [0, 1, 2, 3, 4]
+        assert lines[4] == {"row": 4, "error": "Cell radius must be greater than 0."}
+        assert "explanation_id" not in lines[0]
+
+        doc = client.post("/calculate/batch", json={**body, "format": "columns"}).json()
+        assert doc["num_cells"][4] is None and doc["error"][4]
+
+        npz = np.load(io.BytesIO(client.post("/calculate/batch", json={**body, "format": "npz"}).content))
+        assert set(npz.files) == set(doc)
+        for name in npz.files:
+            assert npz[name].shape == (5,) and npz[name].dtype != object, name
+        assert npz["meets_gos"].dtype == np.int8 and npz["meets_gos"][4] == -1
+        assert list(npz["meets_gos"][:4]) == [int(v) for v in doc["meets_gos"][:4]]
+        assert npz["error"][4] == doc["error"][4]
+
+        models = {**body, "data": {**columns, "max_path_loss_db": 140, "frequency": 900,
+                                   "propagation_model": ["okumura_hata", "two_ray", None, "log_distance", "free_space"]}}
+        npz = np.load(io.BytesIO(client.post("/calculate/batch", json={**models, "format": "npz"}).content))
+        for name in npz.files:
+            assert npz[name].shape == (5,), name
+        assert npz["propagation_model"].dtype.kind == "U"
+        assert list(npz["propagation_model"]) == ["okumura_hata", "two_ray", "free_space", "log_distance", "free_space"]
+
+        explained = client.post("/calculate/batch", json={**body, "explain": True}).text.splitlines()
+        assert json.loads(explained[0])["explanation_id"]
+
+        assert client.post("/calculate/batch", json={"scenario": "x", "data": {}}).status_code == 400
@@ -0,0 +1,44 @@
+import httpx
+
+from app.core import config
+from benchmarks import baseline, load, micro
+from benchmarks.fake_gemini import FakeGemini
+
+
+def test_fake_gemini_injects_errors_and_streams():
+    with FakeGemini(error_rate=0.5, chunks=3, seed=1) as fake:
+        url = f"{fake.base_url}/models/m:generateContent"
+        statuses = [httpx.post(url, json={}).status_code for _ in range(20)]
+        fake.error_rate = 0
+        with httpx.stream("POST", f"{fake.base_url}/models/m:streamGenerateContent?alt=sse", json={}) as response:
+            events = [line for line in response.iter_lines() if line.startswith("data: ")]
+    assert set(statuses) == {200, 503}
+    assert statuses.count(503) == fake.errors
+    assert len(events) == 3
+
+
+def test_load_run_reports_percentiles_per_level(monkeypatch):
+    monkeypatch.setattr(config, "LLM_MAX_RETRIES", 0)
+    with FakeGemini(latency=0.01, error_rate=1.0) as fake:
+        report = load.run(["calc:ofdm", "ai", "static:index"], levels=(1, 4), requests=12, warmup=0, fake=fake)
+
+    results = report["results"]
+    assert set(results) == {f"{t}@{c}" for t in ("calc:ofdm", "ai", "static:index") for c in (1, 4)}
+    ofdm = results["calc:ofdm@4"]
+    assert ofdm["requests"] == 12 and ofdm["errors"] == 0 and ofdm["status"] == {"200": 12}
+    assert 0 < ofdm["p50_ms"] <= ofdm["p95_ms"] <= ofdm["p99_ms"]
+    # /ai reports upstream failures in its body, so the injected 503s reach the fake server only
+    assert results["ai@1"]["status"] == {"200": 12} and len(fake.requests) == fake.errors == 24
+    assert report["meta"]["fake_gemini"]["error_rate"] == 1.0
+
+
+def test_compare_flags_only_regressions_beyond_tolerance(tmp_path):
+    old = {"results": {"a@1": {"throughput_rps": 100, "p95_ms": 10}, "b": {"per_call_us": 2.0}}}
+    new = {"results": {"a@1": {"throughput_rps": 70, "p95_ms": 11}, "b": {"per_call_us": 1.0}, "c": {"p95_ms": 1}}}
+    assert baseline.compare(old, new, tolerance=0.2) == ["a@1 throughput_rps: 100 -> 70 (-30%)"]
+
+    path = tmp_path / "micro.json"
+    report = micro.run(["calc:ofdm", "batch_row:ofdm"], repeat=1, min_time=0.01)
+    baseline.save(path, report)
+    assert baseline.report_comparison(path, report, 0.2) == 0
+    assert report["results"]["batch_row:ofdm"]["rows"] == micro.BATCH_ROWS
@@ -0,0 +1,98 @@
+import itertools
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.v1.routes import calculate_ofdm
+from app.core import ber
+from app.core.ber import Constellation, SimulationError, SimulationPlan, simulate
+from app.core.graph import GRAPHS, GraphState
+from app.core.llm_cache import LRUCache
+from app.core.sweep import shutdown_pool
+from app.main import app
+
+OFDM = {"bandwidth": 180, "subcarrierSpacing": 15, "modulation": "16", "numSymbols": 14, "duration_of_RB": 0.5, "parallelRB": 10}
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch):
+    monkeypatch.setattr(ber, "_cache", LRUCache(16, 60))
+
+
+@pytest.mark.parametrize("bits", [1, 2, 3, 4, 5, 6, 8, 10, 12])
+def test_constellations_round_trip_with_unit_energy(bits):
+    constellation = Constellation(bits)
+    patterns = np.array(list(itertools.product([0, 1], repeat=bits)), dtype=np.uint8)
+    symbols = constellation.modulate(patterns)
+    assert np.mean(np.abs(symbols) ** 2) == pytest.approx(1)
+    assert len(np.unique(symbols)) == 2 ** bits
+    assert (constellation.demodulate(symbols) == patterns).all()
+
+
+@pytest.mark.parametrize("modulation, channel", [("BPSK", "awgn"), ("16", "awgn"), ("64", "awgn"), ("QPSK", "rayleigh")])
+def test_simulated_ber_matches_theory(modulation, channel):
+    plan = SimulationPlan.parse({"modulation": modulation, "channel": channel, "eb_n0_db": [2, 6], "precision": 0.1})
+    doc, cached = simulate(plan, parallel=False)
+    assert not cached
+    for point in doc["points"]:
+        assert point["converged"] and point["errors"] >= plan.target_errors
+        # 16-QAM and 64-QAM theory is the usual nearest-neighbour approximation
+        assert point["theory_ber"] == pytest.approx(point["ber"], rel=0.15)
+        assert point["ber_low"] < point["ber"] < point["ber_high"]
+
+
+def test_stops_early_and_caps_clean_points():
+    plan = SimulationPlan.parse({"modulation": "QPSK", "eb_n0_db": [0, 30], "max_bits": 500000})
+    noisy, clean = simulate(plan, parallel=False)[0]["points"]
+    assert noisy["converged"] and noisy["bits"] < 500000
+    assert not clean["converged"] and clean["bits"] >= 500000 and clean["errors"] == 0
+    assert clean["ber_high"] == pytest.approx(3 / clean["bits"])
+
+
+def test_pool_matches_serial_and_results_are_cached():
+    plan = SimulationPlan.parse({"modulation": "QPSK", "channel": "rayleigh", "eb_n0_db": {"start": 0, "stop": 4, "step": 2}})
+    try:
+        pooled, _ = simulate(plan, parallel=True)
+    finally:
+        shutdown_pool()
+    ber._cache.clear()
+    serial, cached = simulate(plan, parallel=False)
+    assert pooled == serial and not cached
+    assert simulate(SimulationPlan.parse({"modulation": "QPSK", "channel": "rayleigh", "eb_n0_db": [0, 2, 4]}))[1]
+
+
+def test_invalid_plans():
+    for body, message in [
+        ({"modulation": "QAM"}, "Unknown modulation"),
+        ({"channel": "rician"}, "channel"),
+        ({"eb_n0_db": {"start": 0, "stop": 1000, "step": 1}}, "At most"),
+        ({"taps": 100, "subcarriers": 64}, "taps"),
+    ]:
+        with pytest.raises(SimulationError, match=message):
+            SimulationPlan.parse(body)
+
+
+def test_ofdm_reports_effective_rate_and_graph_agrees():
+    plain = calculate_ofdm(OFDM)
+    assert "effective_data_rate_bps" not in plain
+    result = calculate_ofdm({**OFDM, "eb_n0_db": 10, "channel": "rayleigh"})
+    assert 0 < result["bler"] < 1
+    assert result["effective_data_rate_bps"] == pytest.approx(result["max_data_rate_bps"] * (1 - result["bler"]))
+
+    state = GraphState(GRAPHS["ofdm"], OFDM)
+    assert state.outputs() == plain
+    changed, _ = state.update({"eb_n0_db": 10, "channel": "rayleigh"})
+    assert state.outputs() == result and changed["bler"] == result["bler"]
+    changed, _ = state.update({"eb_n0_db": ""})
+    assert state.outputs() == plain and changed["bler"] is None
+
+
+def test_simulate_route():
+    with TestClient(app) as client:
+        assert client.post("/simulate/ber", json={"modulation": "QAM"}).status_code == 400
+        body = {"modulation": "BPSK", "eb_n0_db": [0, 2]}
+        first = client.post("/simulate/ber", json=body).json()
+        second = client.post("/simulate/ber", json=body).json()
+    assert (first["cached"], second["cached"]) == (False, True)
+    assert [p["eb_n0_db"] for p in first["points"]] == [0, 2]
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from fractions import Fraction
+from fastapi.testclient import TestClient
+
+from app.api.v1.routes import calculate_wireless_comm
+from app.core.chain import (
+    BARKER_13, BlockInterleaver, BurstFramer, ChainError, ConvolutionalEncoder, RepetitionEncoder, SourceEncoder,
+    run_chain,
+)
+from app.main import app
+
+WIRELESS = {
+    "bandwidth": 4, "quantBits": 8, "sourceEncoderRate": 0.5, "channelEncoderRate": 0.75,
+    "interleaverRate": 1.25, "burstLength": 1.1,
+}
+
+
+def push_in_pieces(stage, bits, sizes):
+    out, start = [], 0
+    for size in sizes:
+        out.append(stage.push(bits[start:start + size]).copy())
+        start += size
+    return np.concatenate(out)
+
+
+def reference_convolutional(bits):
+    register = [0] * 6
+    coded = []
+    for bit in bits:
+        window = [int(bit)] + register
+        for g in (0o133, 0o171):
+            coded.append(sum(window[d] for d in range(7) if g >> (6 - d) & 1) % 2)
+        register = window[:6]
+    return np.array(coded, dtype=np.uint8)
+
+
+def test_convolutional_encoder_streams_exactly():
+    bits = np.random.default_rng(1).integers(0, 2, 600, dtype=np.uint8)
+    encoder = ConvolutionalEncoder(Fraction(1, 2), 256)
+    assert (push_in_pieces(encoder, bits, [7, 256, 100, 237]) == reference_convolutional(bits)).all()
+
+    punctured = ConvolutionalEncoder(Fraction(3, 4), 256)
+    out = push_in_pieces(punctured, bits, [5, 250, 250, 95])
+    mother = reference_convolutional(bits).reshape(-1, 6)
+    assert (out == mother[:, punctured.keep].ravel()).all() and len(out) == 800
+
+
+def test_other_stages_and_buffer_reuse():
+    bits = np.arange(64, dtype=np.uint8)
+    interleaver = BlockInterleaver(1, 4, 64)
+    out = interleaver.push(bits[:32])
+    assert (out == np.arange(32).reshape(4, 8).T.ravel()).all()
+    assert np.shares_memory(out, interleaver.out)
+
+    framer = BurstFramer(1.5, 512)
+    burst = framer.push(np.ones(256, dtype=np.uint8))
+    assert len(burst) == 384 and (burst[:13] == BARKER_13).all() and burst[13:269].all() and not burst[269:].any()
+
+    assert (SourceEncoder(0.5, 16).push(bits[:8]) == [0, 2, 4, 6]).all()
+    assert (RepetitionEncoder(Fraction(1, 3), 16).push(bits[:2]) == [0, 0, 0, 1, 1, 1]).all()
+
+
+def test_measured_rates_match_the_calculator():
+    result = run_chain(WIRELESS, samples=50000, buffer_samples=1000)
+    analytic = calculate_wireless_comm(WIRELESS)
+    assert [s["stage"] for s in result["stages"]] == [
+        "sampler", "quantizer", "source_encoder", "channel_encoder", "interleaver", "burst_formatter",
+    ]
+    for stage in result["stages"]:
+        assert stage["analytic_bps"] == analytic[f"{stage['stage']}_rate_bps"]
+        # Only bits still waiting for a whole block at the end are missing
+        assert stage["measured_bps"] == pytest.approx(stage["analytic_bps"], rel=5e-3)
+    assert result["sqnr_db"] == pytest.approx(44, abs=2)
+    assert result["throughput"]["samples_per_s"] > 0
+
+
+def test_rates_without_a_small_fraction_are_rounded_and_reported():
+    result = run_chain({**WIRELESS, "channelEncoderRate": 0.33, "interleaverRate": 1}, samples=20000)
+    channel = result["stages"][3]
+    assert channel["implementation"] == "repetition code, rate 1/3" and channel["realized_factor"] == 3
+    assert channel["relative_error"] == pytest.approx(0.99 - 1, abs=1e-3)
+    with pytest.raises(ChainError, match="burstLength"):
+        run_chain({**WIRELESS, "burstLength": 0.5})
+
+
+def test_chain_route():
+    with TestClient(app) as client:
+        assert client.post("/simulate/chain", json={"data": {**WIRELESS, "quantBits": 64}}).status_code == 400
+        body = client.post("/simulate/chain", json={"data": WIRELESS, "samples": 4000}).json()
+    assert body["samples"] == 4000 and len(body["stages"]) == 6
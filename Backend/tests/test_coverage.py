@@ -0,0 +1,110 @@
+import io
+import struct
+import zlib
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.v1.routes import calculate_link_budget
+from app.core.coverage import CoverageError, CoverageRaster, CoverageSpec, Transmitter, encode_png
+from app.main import app
+
+BODY = {
+    "bounds": [0, 0, 10, 8],
+    "width": 100,
+    "height": 80,
+    "transmitters": [
+        {"x": 2, "y": 2, "power_dbm": 40, "gain_dbi": 15, "frequency": 1800},
+        {"x": 8, "y": 6, "power_dbm": 43, "gain_dbi": 12, "frequency": 900},
+        {"x": 5, "y": 4, "power_dbm": 30, "gain_dbi": 10, "frequency": 2100},
+    ],
+    "receiver": {"rx_gain": 2, "system_loss_db": 3},
+}
+
+
+def raster(tile=16, **overrides):
+    spec = CoverageSpec.parse({**BODY, **overrides})
+    spec.tile = tile
+    result = CoverageRaster(spec)
+    result.compute()
+    return result
+
+
+def test_pixels_match_link_budget_fspl():
+    result = raster()
+    spec = result.spec
+    row, col = 13, 71
+    powers = []
+    for tx in spec.transmitters:
+        distance = np.hypot(spec.xs[col] - tx.x, spec.ys[row] - tx.y)
+        fspl = calculate_link_budget({"distance": distance, "frequency": tx.frequency_mhz})["fspl_db"]
+        powers.append(tx.eirp_dbm + 2 - 3 - fspl)
+    assert result.best_server[row, col] == int(np.argmax(powers))
+    assert result.power[row, col] == pytest.approx(max(powers), abs=0.01)
+    assert result.snr[row, col] == pytest.approx(max(powers) - spec.noise_dbm, abs=0.01)
+
+
+def test_tiling_does_not_change_the_raster():
+    whole = raster(tile=1000)
+    tiled = raster(tile=7)
+    assert np.array_equal(whole.power, tiled.power)
+    assert np.array_equal(whole.best_server, tiled.best_server)
+
+
+@pytest.mark.parametrize("index,x,y", [(0, 9, 1), (2, 5.2, 4.1), (1, 0.5, 7.5)])
+def test_move_matches_full_recompute(index, x, y):
+    result = raster()
+    touched = result.move(index, x, y)
+    moved = dict(BODY)
+    moved["transmitters"] = [dict(t) for t in BODY["transmitters"]]
+    moved["transmitters"][index].update(x=x, y=y)
+    expected = raster(**moved)
+    assert touched <= sum(1 for _ in result.spec.tiles())
+    assert np.array_equal(result.power, expected.power)
+    assert np.array_equal(result.best_server, expected.best_server)
+
+
+def test_small_move_touches_few_tiles():
+    result = raster()
+    total = sum(1 for _ in result.spec.tiles())
+    assert result.move(2, 5.05, 4.0) < total
+
+
+def test_png_encoder_round_trips():
+    rgb = np.arange(2 * 3 * 3, dtype=np.uint8).reshape(2, 3, 3)
+    data = encode_png(rgb)
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    width, height = struct.unpack(">II", data[16:24])
+    assert (width, height) == (3, 2)
+    length = struct.unpack(">I", data[33:37])[0]
+    raw = zlib.decompress(data[41:41 + length])
+    assert raw == b"\x00" + rgb[0].tobytes() + b"\x00" + rgb[1].tobytes()
+
+
+def test_spec_validation():
+    with pytest.raises(CoverageError):
+        CoverageSpec.parse({**BODY, "bounds": [0, 0, 0, 1]})
+    with pytest.raises(CoverageError):
+        CoverageSpec.parse({**BODY, "transmitters": []})
+    with pytest.raises(CoverageError):
+        CoverageSpec.parse({**BODY, "width": 100000, "height": 100000})
+    with pytest.raises(CoverageError):
+        Transmitter.parse({"x": 0, "y": 0, "power_dbm": "loud"})
+
+
+def test_coverage_endpoints():
+    with TestClient(app) as client:
+        response = client.post("/api/v1/coverage", json=BODY)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/png"
+        raster_id = response.headers["x-coverage-id"]
+
+        moved = client.post(f"/api/v1/coverage/{raster_id}/move", json={"index": 0, "x": 3, "y": 3, "format": "npz"})
+        assert moved.status_code == 200
+        archive = np.load(io.BytesIO(moved.content))
+        assert archive["power_dbm"].shape == (80, 100)
+        assert archive["best_server"].dtype == np.uint8
+
+        assert client.post("/coverage/nope/move", json={"index": 0, "x": 1, "y": 1}).status_code == 404
+        assert client.post("/coverage", json={**BODY, "layer": "height"}).status_code == 400
@@ -0,0 +1,101 @@
+import math
+
+import numpy as np
+import pytest
+
+from app.api.v1.routes import calculate_cellular
+from app.core import erlang
+from app.core.batch import calculate_batch
+
+
+def naive_erlang_b(traffic, channels):
+    # Textbook formula; only usable for small N before the factorials overflow
+    terms = [traffic ** k / math.factorial(k) for k in range(channels + 1)]
+    return terms[-1] / sum(terms)
+
+
+@pytest.mark.parametrize("traffic,channels", [(0.5, 1), (5, 10), (21.9, 30), (80, 100), (2, 0)])
+def test_recursion_matches_closed_form(traffic, channels):
+    assert erlang.erlang_b(traffic, channels) == pytest.approx(naive_erlang_b(traffic, channels), rel=1e-12)
+
+
+def test_large_cells_stay_finite():
+    assert 0 < erlang.erlang_b(5000, 5000) < 1
+    assert erlang.erlang_b(10, 100000) == 0.0
+
+
+@pytest.mark.parametrize("channels,gos,capacity", [(10, 0.02, 5.084), (30, 0.02, 21.932), (100, 0.01, 84.064), (5, 0.001, 0.762)])
+def test_capacity_matches_published_tables(channels, gos, capacity):
+    assert erlang.traffic_for(channels, gos) == pytest.approx(capacity, abs=1e-3)
+
+
+def test_solvers_are_inverse():
+    for gos in (0.005, 0.02, 0.035):
+        for channels in (1, 7, 64, 1500):
+            capacity = erlang.traffic_for(channels, gos)
+            assert erlang.erlang_b(capacity, channels) <= gos
+            assert erlang.channels_for(capacity, gos) == channels
+            assert erlang.channels_for(capacity * (1 + 1e-9), gos) == channels + 1
+
+
+def test_interpolated_capacity_is_close():
+    exact = erlang.traffic_for(40, 0.015)
+    assert erlang.traffic_for_interpolated(40, 0.015) == pytest.approx(exact, rel=0.01)
+    assert erlang.traffic_for_interpolated(40, 0.02) == erlang.traffic_for(40, 0.02)
+
+
+def test_array_versions_match_scalars():
+    rng = np.random.default_rng(0)
+    traffic = rng.uniform(0, 300, 200)
+    channels = rng.integers(0, 400, 200)
+    gos = rng.choice([0.01, 0.02, 0.015], 200)
+    blocking = erlang.erlang_b_array(traffic, channels)
+    required = erlang.channels_for_array(traffic, gos)
+    capacity = erlang.traffic_for_array(channels, gos)
+    for i in range(200):
+        assert blocking[i] == pytest.approx(erlang.erlang_b(traffic[i], channels[i]), rel=1e-12)
+        assert required[i] == erlang.channels_for(traffic[i], gos[i])
+        assert capacity[i] == pytest.approx(erlang.traffic_for(channels[i], gos[i]), rel=1e-9)
+    assert np.isnan(erlang.channels_for_array([5, np.nan], [0, 0.02])).all()
+
+
+def test_cellular_reports_gos_compliance():
+    data = {"area": 100, "cell_radius": 1, "reuse_factor": 7, "bandwidth": 5, "channel_bandwidth": 0.2,
+            "spectral_efficiency": 2, "subscribers": 20000, "calls_per_day": 3, "call_duration": 2, "gos": 0.02}
+    result = calculate_cellular(data)
+    assert result["channels_per_cell"] == 3
+    assert result["channels_required_per_cell"] == erlang.channels_for(result["traffic_per_cell_erlangs"], 0.02)
+    assert result["meets_gos"] is False
+    assert result["blocking_probability"] > 0.02
+
+    batch = calculate_batch("cellular", {**data, "gos": [0.02, 0, 0.5]})
+    assert list(batch.columns["meets_gos"]) == [False, None, True]
+    assert np.isnan(batch.columns["channels_required_per_cell"][1])
+    assert calculate_cellular({**data, "gos": 0})["channels_required_per_cell"] is None
+
+
+def full_recursion(traffic, channels):
+    b = 1.0
+    for n in range(1, channels + 1):
+        b = traffic * b / (n + traffic * b)
+    return b
+
+
+def test_windowed_recursion_matches_the_full_one():
+    for traffic, channels in [(950.0, 1000), (20000.0, 20100), (15000.0, 12000), (3.5, 4000), (700.0, 90)]:
+        assert erlang.erlang_b(traffic, channels) == pytest.approx(full_recursion(traffic, channels), rel=1e-13)
+    capacity = erlang.traffic_for(100000, 0.02)
+    assert erlang.erlang_b(capacity, 100000) <= 0.02 < erlang.erlang_b(capacity * (1 + 1e-9), 100000)
+    assert erlang.channels_for(capacity, 0.02) == 100000
+    assert list(erlang.channels_for_array([capacity, capacity * (1 + 1e-9)], 0.02)) == [100000, 100001]
+
+
+def test_off_table_gos_is_solved_once():
+    table = erlang.capacity_table(0.015)
+    assert erlang.capacity_table(0.015) is table
+    channels = np.arange(1, erlang.TABLE_MAX_CHANNELS + 1)
+    assert np.all(erlang.erlang_b_array(table[1:], channels) <= 0.015)
+    assert np.all(erlang.erlang_b_array(table[1:] * (1 + 1e-9), channels) > 0.015)
+    assert erlang.traffic_for(300, 0.015) == pytest.approx(table[300], rel=1e-12)
+    erlang.build_tables()
+    assert set(erlang.COMMON_GOS) <= set(erlang._tables)
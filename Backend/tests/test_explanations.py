@@ -0,0 +1,67 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import llm_cache
+from app.core.ai_agent import explanation_token, parse_explanation_token
+from app.core.llm_cache import LRUCache, ResponseCache
+from app.main import app
+
+WIRELESS = {
+    "scenario": "wireless_comm",
+    "data": {"bandwidth": 4, "quantBits": 8, "sourceEncoderRate": 0.5, "channelEncoderRate": 0.5, "burstLength": 1},
+}
+
+
+@pytest.fixture
+def client(gemini):
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def test_token_round_trip():
+    token = explanation_token("ofdm", {"bandwidth": 180, "modulation": "16"})
+    assert parse_explanation_token(token) == ("ofdm", {"bandwidth": 180, "modulation": "16"})
+    with pytest.raises(ValueError):
+        parse_explanation_token("not base64 json!")
+
+
+def test_calculate_returns_numbers_without_calling_gemini(client, stub):
+    body = client.post("/api/v1/calculate", json=WIRELESS).json()
+    assert body["calculation"]["quantizer_rate_bps"] == 64000.0
+    assert body["gemini"] is None
+    assert body["explanation_url"] == f"/api/v1/explain/{body['explanation_id']}"
+    assert stub.requests == []
+
+
+def test_explanation_streams_then_comes_from_cache(client, stub):
+    stub.reply(chunks=["Sampler ", "then quantizer."])
+    body = client.post("/calculate", json=WIRELESS).json()
+
+    lines = client.get(body["explanation_url"] + "?format=ndjson").text.splitlines()
+    assert lines == ['{"text": "Sampler "}', '{"text": "then quantizer."}', '{"done": true}']
+    stats = client.get("/llm/cache").json()["memory"]
+    assert stats["misses"] == 1 and stats["hits"] == 0
+
+    again = client.post("/calculate", json=WIRELESS).json()
+    assert again["gemini"] == "Sampler then quantizer."
+    assert len(stub.requests) == 1
+
+
+def test_explanation_survives_lost_process_state(client, stub, monkeypatch):
+    # Another worker: nothing in memory, only the id from the first response
+    body = client.post("/calculate", json=WIRELESS).json()
+    monkeypatch.setattr(llm_cache, "_cache", ResponseCache(LRUCache(16, 60)))
+    stream = client.get(body["explanation_url"])
+    assert stream.status_code == 200
+    assert "event: done" in stream.text
+
+
+def test_unknown_explanation_id_is_404(client):
+    assert client.get("/explain/abc").status_code == 404
+
+
+def test_inline_mode_keeps_blocking_contract(client, stub):
+    stub.reply(text="inline answer")
+    body = client.post("/calculate", json={**WIRELESS, "explain": "inline"}).json()
+    assert body["gemini"] == "inline answer"
+    assert "explanation_id" not in body
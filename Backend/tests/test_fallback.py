@@ -0,0 +1,72 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.v1.routes import SCENARIOS
+from app.core import config
+from app.core.fallback import NOTE, local_explanation
+from app.main import app
+
+WIRELESS = {
+    "scenario": "wireless_comm",
+    "data": {"bandwidth": 4, "quantBits": 8, "sourceEncoderRate": 0.5, "channelEncoderRate": 0.5, "burstLength": 1},
+}
+
+
+@pytest.fixture
+def client(gemini, monkeypatch):
+    monkeypatch.setattr(config, "EXPLAIN_DEADLINE_S", 0.3)
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def test_local_explanations_apply_rules():
+    risky = {"distance": 5, "frequency": 2400, "link_margin_db": 2, "eb_n0_db": 10}
+    text = local_explanation("link_budget", risky, SCENARIOS["link_budget"](risky))
+    assert "link margin of 2.0 dB is risky" in text and text.endswith(NOTE)
+    assert text == local_explanation("link_budget", risky, SCENARIOS["link_budget"](risky))
+
+    crowded = {
+        "area": 100, "cell_radius": 5, "reuse_factor": 7, "bandwidth": 5, "channel_bandwidth": 0.2,
+        "spectral_efficiency": 2, "subscribers": 50000, "calls_per_day": 3, "call_duration": 2, "gos": 0.02,
+    }
+    assert "fails its GoS" in local_explanation("cellular", crowded, SCENARIOS["cellular"](crowded))
+    assert local_explanation("unknown", None, {}).startswith("The calculation finished")
+
+
+def test_inline_answer_falls_back_at_the_deadline_and_caches_the_late_reply(client, stub):
+    stub.reply(text="Late but thorough.", delay=0.8)
+    start = time.perf_counter()
+    body = client.post("/calculate", json={**WIRELESS, "explain": "inline"}).json()
+    assert time.perf_counter() - start < 0.8
+    assert body["explanation_source"] == "local"
+    assert body["gemini"].endswith(NOTE) and "Gemini Error" not in body["gemini"]
+
+    time.sleep(0.8)  # the shared call keeps going and fills the cache
+    again = client.post("/calculate", json={**WIRELESS, "explain": "inline"}).json()
+    assert (again["gemini"], again["explanation_source"]) == ("Late but thorough.", "cache")
+    assert len(stub.requests) == 1
+
+
+def test_inline_answer_replaces_upstream_errors(client, stub):
+    stub.reply(status=400, text="bad request")
+    body = client.post("/calculate", json={**WIRELESS, "explain": "inline"}).json()
+    assert body["explanation_source"] == "local"
+    assert body["explanation_url"].endswith(body["explanation_id"])
+
+
+def test_stream_sends_fallback_then_gemini_text(client, stub):
+    stub.reply(chunks=["Sampler ", "first."], delay=0.6)
+    body = client.post("/calculate", json=WIRELESS).json()
+    lines = client.get(body["explanation_url"] + "?format=ndjson").text.splitlines()
+    assert lines[0].startswith('{"fallback": ')
+    assert lines[1:] == ['{"text": "Sampler "}', '{"text": "first."}', '{"done": true}']
+
+
+def test_stream_failure_before_first_chunk_ends_on_fallback(client, stub):
+    stub.reply(status=400, text="bad request")
+    body = client.post("/calculate", json=WIRELESS).json()
+    events = client.get(body["explanation_url"]).text
+    assert "event: fallback" in events and "event: done" in events
+    assert "event: error" not in events
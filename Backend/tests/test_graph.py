@@ -0,0 +1,132 @@
+import random
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.v1.routes import SCENARIOS
+from app.core import config
+from app.core.graph import GRAPHS, GraphError, GraphState
+from app.main import app
+
+LINK = {
+    "distance": 5, "frequency": 2400, "tx_gain": 12, "rx_gain": 12, "system_loss_db": 2,
+    "link_margin_db": 10, "temperature_k": 290, "noise_figure_db": 5, "bitrate": 1e6, "eb_n0_db": 10,
+}
+
+RANGES = {
+    "link_budget": {
+        "distance": (0.1, 50), "frequency": (100, 6000), "tx_gain": (0, 20), "rx_gain": (0, 20),
+        "system_loss_db": (0, 6), "link_margin_db": (0, 20), "temperature_k": (100, 400),
+        "noise_figure_db": (0, 10), "bitrate": (1e3, 1e8), "eb_n0_db": (0, 15),
+    },
+    "ofdm": {
+        "bandwidth": (0, 400), "subcarrierSpacing": (0, 60), "modulation": ["BPSK", "QPSK", "16-QAM", "64-QAM"],
+        "numSymbols": [0, 7, 14], "duration_of_RB": (0, 1), "parallelRB": [0, 1, 25, 100],
+    },
+    "wireless_comm": {
+        "bandwidth": (-1, 20), "samplingRate": [None, 8000, 44100, 0], "quantBits": [4, 8, 16, 40],
+        "sourceEncoderRate": (0, 1.2), "channelEncoderRate": (0, 1.2), "interleaverRate": [None, 1, 2],
+        "burstLength": (0, 2),
+    },
+    "cellular": {
+        "area": (1, 500), "cell_radius": (0.5, 5), "reuse_factor": [1, 3, 4, 7, 12], "bandwidth": (1, 40),
+        "channel_bandwidth": [0, 0.025, 0.2], "spectral_efficiency": (0.5, 6), "subscribers": [0, 1000, 50000],
+        "calls_per_day": (0, 5), "call_duration": (0, 5), "gos": [0, 0.01, 0.02, 0.05, 1],
+    },
+}
+
+
+def sample(rng, name, spec):
+    if isinstance(spec, list):
+        return rng.choice(spec)
+    return round(rng.uniform(*spec), 3)
+
+
+def random_row(rng, scenario):
+    return {name: sample(rng, name, spec) for name, spec in RANGES[scenario].items()}
+
+
+def as_calculator(state):
+    error = state.error()
+    return {"error": error} if error else state.outputs()
+
+
+@pytest.mark.parametrize("scenario", sorted(GRAPHS))
+def test_updated_graphs_match_a_fresh_calculation(scenario):
+    rng = random.Random(scenario)
+    for _ in range(20):
+        row = random_row(rng, scenario)
+        state = GraphState(GRAPHS[scenario], row)
+        assert as_calculator(state) == SCENARIOS[scenario](row)
+        for _ in range(5):
+            delta = {name: sample(rng, name, RANGES[scenario][name]) for name in rng.sample(sorted(row), 2)}
+            row.update(delta)
+            state.update(delta)
+            assert as_calculator(state) == SCENARIOS[scenario](row)
+
+
+def test_calculators_report_bad_inputs_instead_of_raising():
+    assert SCENARIOS["link_budget"]({**LINK, "distance": "far"}) == {
+        "error": "Unexpected error: could not convert string to float: 'far'"
+    }
+    assert SCENARIOS["link_budget"]({**LINK, "distance": 0})["error"].startswith("Unexpected error")
+    assert SCENARIOS["ofdm"]({"numSymbols": 1.5e400})["error"].startswith("Unexpected error")
+
+
+def test_update_recomputes_only_the_affected_nodes():
+    state = GraphState(GRAPHS["link_budget"], LINK)
+    fspl = state.values["fspl"]
+    changed, recomputed = state.update({"noise_figure_db": 7})
+    assert set(changed) == {"received_power_dbm", "transmit_power_dbm", "noise_figure_db"}
+    # noise_figure, pr_watts, pr_dbm, pt_dbm and the three outputs
+    assert recomputed == 7
+    assert state.values["fspl"] == fspl
+    assert state.update({"noise_figure_db": 7}) == ({}, 0)
+
+
+def test_update_rejects_unknown_inputs():
+    state = GraphState(GRAPHS["link_budget"], LINK)
+    with pytest.raises(GraphError, match="noise_figure"):
+        state.update({"noise_figure": 3})
+    assert state.data() == LINK
+
+
+@pytest.fixture
+def client(gemini, monkeypatch):
+    monkeypatch.setattr(config, "SESSION_DEBOUNCE_S", 0.2)
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def test_session_sends_changed_outputs_and_one_explanation_per_burst(client, stub):
+    with client.websocket_connect("/api/v1/session") as ws:
+        ws.send_json({"type": "init", "scenario": "link_budget", "data": LINK})
+        first = ws.receive_json()
+        assert first["type"] == "result" and first["error"] is None
+        assert first["outputs"] == SCENARIOS["link_budget"](LINK)
+
+        for value in range(10, 30, 2):  # a slider drag
+            ws.send_json({"type": "update", "data": {"distance": value}})
+            result = ws.receive_json()
+            assert set(result["changed"]) == {"transmit_power_dbm", "fspl_db", "distance_km"}
+        time.sleep(0.5)
+        explanation = ws.receive_json()
+        assert explanation["type"] == "explanation" and explanation["text"] == "ok"
+        assert explanation["seq"] == result["seq"] and explanation["source"] == "llm"
+    assert len(stub.requests) == 1
+    assert "Distance (km): 28" in stub.requests[0]["body"]["contents"][0]["parts"][0]["text"]
+
+
+def test_session_reports_bad_messages_and_keeps_going(client):
+    with client.websocket_connect("/api/v1/session") as ws:
+        ws.send_json({"type": "update", "data": {"distance": 3}})
+        assert ws.receive_json() == {"type": "error", "message": "Send init first"}
+        ws.send_text("not json")
+        assert ws.receive_json()["message"] == "Messages must be JSON objects"
+        ws.send_json({"type": "init", "scenario": "link_budget", "data": LINK, "explain": False})
+        assert ws.receive_json()["type"] == "result"
+        ws.send_json({"type": "update", "data": {"bogus": 1}})
+        assert ws.receive_json()["message"] == "Unknown inputs for link_budget: bogus"
+        ws.send_json({"type": "update", "data": {"distance": 0}})
+        assert ws.receive_json()["error"] == "Unexpected error: math domain error"
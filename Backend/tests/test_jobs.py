@@ -0,0 +1,120 @@
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import jobs
+from app.core.jobs import CANCELLED, DONE, FAILED, FINISHED, JobQueue, ResultStore
+from app.core.sweep import SweepPlan, SweepSummary, run_sweep
+from app.main import app
+
+SWEEP = {
+    "scenario": "link_budget",
+    "base": {"link_margin_db": 3, "noise_figure_db": 5, "eb_n0_db": 10, "bitrate": 1e6},
+    "sweep": {"distance": {"start": 0.1, "stop": 100, "num": 200, "scale": "log"}, "frequency": [900, 1800]},
+    "chunk_rows": 50,
+}
+
+
+def check_steps(payload):
+    if payload.get("steps", 0) < 1:
+        raise ValueError("steps must be positive")
+
+
+def run_steps(payload, progress):
+    # Runs in the pool process; picklable because it lives at module level
+    for step in range(payload["steps"]):
+        time.sleep(payload.get("delay", 0.02))
+        progress.report(step + 1, payload["steps"], {"step": step})
+    if payload.get("fail"):
+        raise RuntimeError("boom")
+    return json.dumps({"steps": payload["steps"], "started": time.time()}).encode(), "application/json"
+
+
+def wait(queue, job, timeout=30):
+    deadline = time.monotonic() + timeout
+    while queue.get(job.id).state not in FINISHED:
+        assert time.monotonic() < deadline, f"job still {job.state}"
+        time.sleep(0.02)
+    return job
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    monkeypatch.setitem(jobs.KINDS, "steps", (check_steps, run_steps))
+    queue = JobQueue(workers=1, max_queued=8, store=ResultStore(10000), max_records=100, progress_interval=0)
+    monkeypatch.setattr(jobs, "_queue", queue)
+    yield queue
+    queue.shutdown()
+
+
+def test_result_store_evicts_oldest_by_size():
+    store = ResultStore(100)
+    assert store.put("a", b"x" * 40, "text/plain")
+    assert store.put("b", b"x" * 40, "text/plain")
+    assert store.put("c", b"x" * 40, "text/plain")
+    assert "a" not in store and "b" in store and store.size == 80
+    assert not store.put("huge", b"x" * 101, "text/plain")
+    assert store.stats()["evictions"] == 2
+
+
+def test_priorities_cancellation_and_failures(queue):
+    blocker = queue.submit("steps", {"steps": 500, "delay": 0.01})
+    low = queue.submit("steps", {"steps": 1}, priority=0)
+    dropped = queue.submit("steps", {"steps": 1}, priority=0)
+    high = queue.submit("steps", {"steps": 1}, priority=5)
+    failing = queue.submit("steps", {"steps": 1, "fail": True}, priority=-1)
+
+    assert queue.cancel(dropped.id).state == CANCELLED
+    while blocker.done == 0:
+        time.sleep(0.02)
+    assert blocker.partial is not None
+    queue.cancel(blocker.id)
+    for job in (blocker, low, high, failing):
+        wait(queue, job)
+
+    assert blocker.state == CANCELLED and blocker.done < 500
+    assert dropped.started is None
+    assert (low.state, high.state) == (DONE, DONE)
+    started = {job.id: json.loads(queue.store.get(job.id)[0])["started"] for job in (low, high)}
+    assert started[high.id] < started[low.id]
+    assert failing.state == FAILED and failing.error == "RuntimeError: boom"
+    assert queue.stats()["queued"] == 0 and queue.stats()["running"] == 0
+
+
+def test_finished_job_reports_its_total_before_the_progress_arrives(queue, monkeypatch):
+    # The reader drains messages without applying them, as if the last one were still queued
+    def read_nothing(self, progress):
+        while progress.get() is not None:
+            pass
+
+    monkeypatch.setattr(JobQueue, "_read_progress", read_nothing)
+    job = wait(queue, queue.submit("steps", {"steps": 3, "delay": 0}))
+    assert job.state == DONE and job.to_dict()["progress"] == {"done": 3, "total": 3}
+
+
+def test_sweep_job_over_http(queue):
+    with TestClient(app) as client:
+        assert client.post("/jobs", json={"kind": "nope", "payload": {}}).status_code == 400
+        assert client.post("/jobs", json={"kind": "sweep", "payload": {"scenario": "link_budget"}}).status_code == 400
+
+        accepted = client.post("/jobs", json={"kind": "sweep", "payload": SWEEP})
+        assert accepted.status_code == 202
+        job = accepted.json()
+        assert job["state"] in ("queued", "running")
+        events = [json.loads(line) for line in client.get(job["url"] + "/events").text.splitlines()]
+        assert events[-1]["state"] == DONE and events[-1]["progress"] == {"done": 400, "total": 400}
+
+        plan = SweepPlan.parse(SWEEP)
+        summary = SweepSummary(plan)
+        for chunk in run_sweep(plan, 50, parallel=False):
+            summary.update(chunk)
+        result = client.get(events[-1]["result_url"])
+        assert result.json() == json.loads(json.dumps({"scenario": "link_budget", "total": 400, **summary.to_dict()}))
+        assert client.get("/jobs").json()["store"]["results"] == 1
+
+        queue.max_queued = 0
+        full = client.post("/jobs", json={"kind": "sweep", "payload": SWEEP})
+        assert full.status_code == 503 and full.headers["Retry-After"]
+        assert client.get("/jobs/unknown").status_code == 404
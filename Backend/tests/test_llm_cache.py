@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from app.core import ai_agent, llm_cache, llm_client
+from app.core.llm_cache import LRUCache, ResponseCache, SQLiteCache, cache_key
+from app.core.llm_client import GeminiClient
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    cache = ResponseCache(LRUCache(16, 60))
+    monkeypatch.setattr(llm_cache, "_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def stub_client(stub, monkeypatch):
+    client = GeminiClient(base_url=stub.base_url, api_key="test-key", max_retries=0)
+    monkeypatch.setattr(llm_client, "_client", client)
+    return client
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now the oldest
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "monotonic", lambda: now[0])
+    cache = LRUCache(maxsize=4, ttl=10)
+    cache.set("a", 1)
+    now[0] += 5
+    assert cache.get("a") == 1
+    now[0] += 6
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["expirations"] == 1 and stats["size"] == 0
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_cache_key_rounds_float_noise():
+    base = {"fspl_db": 105.5, "pt_dbm": 12.345678}
+    noisy = {"fspl_db": 105.50000000001, "pt_dbm": 12.3456780000002}
+    assert cache_key("link_budget", base) == cache_key("link_budget", noisy)
+    assert cache_key("link_budget", base) != cache_key("link_budget", {**base, "pt_dbm": 12.4})
+    assert cache_key("link_budget", base) != cache_key("ofdm", base)
+
+
+def test_cache_key_includes_inputs():
+    # wireless_comm drops bandwidth from the calculation when samplingRate is explicit
+    calculation = {"sampler_rate_bps": 8000.0}
+    narrow = {"bandwidth": 4, "samplingRate": 8000}
+    wide = {"bandwidth": 100, "samplingRate": 8000}
+    assert cache_key("wireless_comm", calculation, narrow) != cache_key("wireless_comm", calculation, wide)
+
+
+def test_disk_tier_promotes_to_memory(tmp_path):
+    path = str(tmp_path / "cache.db")
+    writer = ResponseCache(LRUCache(4, 60), SQLiteCache(path))
+    writer.set("k", "explanation")
+
+    # A second worker starts with an empty memory tier but the same file
+    reader = ResponseCache(LRUCache(4, 60), SQLiteCache(path))
+    assert asyncio.run(reader.aget("k")) == "explanation"
+    assert reader.disk.stats()["hits"] == 1
+    assert reader.memory.get("k") == "explanation"
+    assert asyncio.run(reader.aget("k")) == "explanation"
+    assert reader.disk.stats()["hits"] == 1
+
+
+def test_disk_tier_prunes_oldest(tmp_path):
+    disk = SQLiteCache(str(tmp_path / "cache.db"), max_rows=2)
+    for key in "abc":
+        disk.set(key, key)
+    disk.prune()
+    assert disk.get("a") is None
+    assert disk.get("c") == "c"
+    assert disk.stats()["evictions"] == 1
+
+
+def test_errors_are_not_cached(stub, stub_client, fresh_cache):
+    stub.reply(status=400, text="bad")
+    def explain():
+        return asyncio.run(ai_agent.explain_within("ofdm", {}, {"total_bits": 1}, "prompt", deadline=5))
+
+    assert explain()[1] == "local"
+    assert len(fresh_cache.memory) == 0
+
+    stub.reply(text="good answer")
+    assert explain() == ("good answer", "llm")
+    assert explain() == ("good answer", "cache")
+    assert len(stub.requests) == 2
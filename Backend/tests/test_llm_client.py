@@ -0,0 +1,153 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.core.llm_client import ConcurrencyBudget, GeminiClient, LLMError
+
+
+def make_client(stub, **kwargs):
+    kwargs.setdefault("api_key", "test-key")
+    kwargs.setdefault("backoff_base", 0.01)
+    kwargs.setdefault("timeout", 5)
+    return GeminiClient(base_url=stub.base_url, **kwargs)
+
+
+def test_generate_success(stub):
+    stub.reply(text="hello there")
+    client = make_client(stub)
+    assert asyncio.run(client.generate("hi")) == "hello there"
+    assert len(stub.requests) == 1
+    request = stub.requests[0]
+    assert request["path"].endswith("/models/gemini-2.5-flash:generateContent")
+    assert request["key"] == "test-key"
+    assert request["body"]["contents"][0]["parts"][0]["text"] == "hi"
+
+
+@pytest.mark.parametrize("status", [503, 429])
+def test_retries_transient_status(stub, status):
+    stub.reply(status=status)
+    stub.reply(status=status)
+    stub.reply(text="recovered")
+    client = make_client(stub, max_retries=2)
+    assert asyncio.run(client.generate("hi")) == "recovered"
+    assert len(stub.requests) == 3
+
+
+def test_gives_up_after_max_retries(stub):
+    for _ in range(3):
+        stub.reply(status=503)
+    client = make_client(stub, max_retries=1)
+    with pytest.raises(LLMError) as info:
+        asyncio.run(client.generate("hi"))
+    assert info.value.status_code == 503
+    assert len(stub.requests) == 2
+
+
+def test_no_retry_on_client_error(stub):
+    stub.reply(status=400, text="bad request")
+    client = make_client(stub, max_retries=3)
+    with pytest.raises(LLMError) as info:
+        asyncio.run(client.generate("hi"))
+    assert info.value.status_code == 400
+    assert len(stub.requests) == 1
+
+
+def test_missing_key_makes_no_request(stub, monkeypatch):
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    client = GeminiClient(base_url=stub.base_url)
+    with pytest.raises(LLMError, match="API key is missing"):
+        asyncio.run(client.generate("hi"))
+    with pytest.raises(LLMError, match="API key is missing"):
+        client.generate_sync("hi")
+    assert stub.requests == []
+
+
+def test_deadline_bounds_trickled_body(stub):
+    stub.reply(text="x" * 50, trickle=0.05)
+    client = make_client(stub)
+    start = time.monotonic()
+    with pytest.raises(LLMError, match="Deadline"):
+        asyncio.run(client.generate("hi", deadline=0.5))
+    assert time.monotonic() - start < 1.0
+
+
+def test_deadline_covers_retries_and_backoff(stub):
+    for _ in range(10):
+        stub.reply(status=503, delay=0.1)
+    client = make_client(stub, max_retries=8, backoff_base=0.2)
+    start = time.monotonic()
+    with pytest.raises(LLMError):
+        asyncio.run(client.generate("hi", deadline=0.5))
+    assert time.monotonic() - start < 0.8
+
+
+def test_sync_path_and_deadline(stub):
+    stub.reply(text="from sync")
+    stub.reply(text="slow", delay=2)
+    client = make_client(stub)
+    try:
+        assert client.generate_sync("hi") == "from sync"
+        start = time.monotonic()
+        with pytest.raises(LLMError, match="Deadline"):
+            client.generate_sync("hi", deadline=0.3)
+        assert time.monotonic() - start < 0.8
+    finally:
+        client.close()
+
+
+def test_sync_and_async_share_one_budget(stub):
+    for _ in range(4):
+        stub.reply(delay=0.2)
+    client = make_client(stub, max_concurrency=1)
+
+    def blocking():
+        client.generate_sync("sync")
+
+    async def main():
+        thread = threading.Thread(target=blocking)
+        thread.start()
+        await asyncio.gather(*(client.generate(f"async {i}") for i in range(3)))
+        thread.join()
+
+    try:
+        asyncio.run(main())
+    finally:
+        client.close()
+    assert len(stub.requests) == 4
+    assert stub.peak == 1
+
+
+def test_stream_yields_chunks(stub):
+    stub.reply(chunks=["one ", "two ", "three"])
+    client = make_client(stub)
+
+    async def collect():
+        return [chunk async for chunk in client.stream("hi")]
+
+    assert asyncio.run(collect()) == ["one ", "two ", "three"]
+    assert "alt=sse" in stub.requests[0]["path"]
+
+
+def test_stream_deadline(stub):
+    stub.reply(chunks=["a"] * 20, trickle=0.1)
+    client = make_client(stub)
+
+    async def collect():
+        return [chunk async for chunk in client.stream("hi", deadline=0.4)]
+
+    start = time.monotonic()
+    with pytest.raises(LLMError, match="Deadline"):
+        asyncio.run(collect())
+    assert time.monotonic() - start < 0.8
+
+
+def test_budget_timeout_releases_nothing():
+    budget = ConcurrencyBudget(1)
+    assert budget.acquire()
+    assert not budget.acquire(timeout=0.05)
+    budget.release()
+    assert budget.acquire(timeout=0.05)
+    budget.release()
+    assert budget.in_use == 0
@@ -0,0 +1,88 @@
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import metrics
+from app.core.metrics import CALCULATIONS, LLM_REQUESTS, STAGE_LATENCY, Counter, Histogram, debug_sampled
+from app.main import app
+
+WIRELESS = {
+    "scenario": "wireless_comm",
+    "data": {"bandwidth": 4, "quantBits": 8, "sourceEncoderRate": 0.5, "channelEncoderRate": 0.5, "burstLength": 1},
+}
+
+
+@pytest.fixture
+def client(gemini):
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def test_calculate_reports_server_timing_stages(client):
+    response = client.post("/api/v1/calculate", json=WIRELESS)
+    assert response.status_code == 200
+    stages = [part.split(";")[0] for part in response.headers["server-timing"].split(", ")]
+    assert stages[:2] == ["parse", "calculate"]
+    assert "prompt" in stages and stages[-1] == "total"
+
+
+def test_metrics_endpoint_exposes_route_and_stage_series(client):
+    before = CALCULATIONS.value("wireless_comm", "ok")
+    stage_before = STAGE_LATENCY.count("/api/v1/calculate", "calculate")
+    client.post("/api/v1/calculate", json=WIRELESS)
+    client.post("/api/v1/calculate", json={"scenario": "nope", "data": {}})
+    assert CALCULATIONS.value("wireless_comm", "ok") == before + 1
+    assert STAGE_LATENCY.count("/api/v1/calculate", "calculate") == stage_before + 1
+
+    response = client.get("/api/v1/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert 'http_requests_total{route="/api/v1/calculate",method="POST",status="200"}' in text
+    assert 'app_stage_duration_seconds_bucket{route="/api/v1/calculate",stage="calculate",le="+Inf"}' in text
+    assert 'app_errors_total{type="unknown_scenario"}' in text
+
+
+def test_llm_attempts_are_counted_by_status(client, stub):
+    ok = LLM_REQUESTS.value("generateContent", "200")
+    failed = LLM_REQUESTS.value("generateContent", "503")
+    stub.reply(text="inline answer")
+    stub.reply(status=503, text="busy")
+    client.post("/calculate", json={**WIRELESS, "explain": "inline"})
+    client.get("/ai", params={"prompt": "hello"})
+    assert LLM_REQUESTS.value("generateContent", "200") == ok + 1
+    assert LLM_REQUESTS.value("generateContent", "503") == failed + 1
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("demo_seconds", "Demo.", ("kind",), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value, "a")
+    lines = histogram.render()
+    assert 'demo_seconds_bucket{kind="a",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{kind="a",le="1"} 2' in lines
+    assert 'demo_seconds_bucket{kind="a",le="+Inf"} 3' in lines
+    assert 'demo_seconds_count{kind="a"} 3' in lines
+    counter = Counter("demo_total", "Demo.", ("path",))
+    counter.inc('a"b')
+    assert 'demo_total{path="a\\"b"} 1' in counter.render()
+
+
+def test_debug_sampled_skips_formatting_when_disabled(monkeypatch):
+    class Loud:
+        def __str__(self):
+            raise AssertionError("formatted")
+
+    logger = logging.getLogger("app.test_metrics")
+    logger.setLevel(logging.WARNING)
+    debug_sampled(logger, "value %s", Loud())
+
+    seen = []
+    logger.setLevel(logging.DEBUG)
+    monkeypatch.setattr(logger, "debug", lambda message, *args: seen.append(message % args))
+    monkeypatch.setattr(metrics.config, "LOG_SAMPLE_RATE", 0.0)
+    debug_sampled(logger, "value %s", 1)
+    monkeypatch.setattr(metrics.config, "LOG_SAMPLE_RATE", 1.0)
+    debug_sampled(logger, "value %s", 2)
+    assert seen == ["value 2"]
@@ -0,0 +1,88 @@
+import math
+import time
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.v1.routes import calculate_cellular
+from app.core.planner import CellularPlan, PlanError, cluster_sizes, optimize, pareto_front
+from app.main import app
+
+CITY = {"area": 800, "bandwidth": 20, "spectral_efficiency": 3, "subscribers": 2000000,
+        "calls_per_day": 4, "call_duration": 2, "gos": 0.02}
+
+
+def city_plan(**search):
+    search.setdefault("cell_radius", {"start": 0.2, "stop": 10, "num": 400, "scale": "log"})
+    return CellularPlan.parse({"data": CITY, "search": search})
+
+
+def test_cluster_sizes():
+    assert cluster_sizes(21) == [1, 3, 4, 7, 9, 12, 13, 16, 19, 21]
+    with pytest.raises(PlanError):
+        city_plan(reuse_factor=[5])
+
+
+def test_pareto_front():
+    sites = np.array([10, 10, 8, 12, 8, 20])
+    headroom = np.array([0.5, 0.7, 0.2, 0.6, 0.3, 0.9])
+    assert list(pareto_front(sites, headroom)) == [4, 1, 5]
+
+
+def test_front_matches_exhaustive_search():
+    plan = city_plan(reuse_factor=[1, 3, 7], channel_bandwidth=[0.025, 0.2])
+    result = optimize(plan, parallel=False)
+    assert result["evaluated"] < result["candidates"]
+
+    # Brute force every candidate through the scalar calculator
+    best = {}
+    for radius in plan.radii:
+        for reuse in plan.reuse:
+            for bw in plan.channel_bandwidths:
+                calc = calculate_cellular({**CITY, "cell_radius": radius, "reuse_factor": reuse, "channel_bandwidth": bw})
+                if not calc["meets_gos"]:
+                    continue
+                sites = math.ceil(CITY["area"] / calc["cell_area_km2"])
+                traffic = calc["total_traffic_erlangs"] * calc["cell_area_km2"] / CITY["area"]
+                headroom = calc["max_traffic_per_cell_erlangs"] / traffic - 1
+                best[sites] = max(best.get(sites, -1), headroom)
+    assert result["front_size"] > 0
+    front = result["front"]
+    cheapest = min(best)
+    assert front[0]["sites"] == cheapest
+    assert front[0]["headroom"] == pytest.approx(best[cheapest], rel=1e-3)
+    for design in front:
+        assert design["meets_gos"] is True
+        assert design["headroom"] >= 0
+        assert design["headroom"] == pytest.approx(best[design["sites"]], rel=1e-3)
+    assert [d["sites"] for d in front] == sorted(d["sites"] for d in front)
+
+
+def test_min_headroom_and_parallel_agree():
+    plan = CellularPlan.parse({"data": CITY, "min_headroom": 0.25,
+                               "search": {"cell_radius": {"start": 0.2, "stop": 10, "num": 2000}}})
+    serial = optimize(plan, chunk_rows=300, parallel=False)
+    pooled = optimize(plan, chunk_rows=300, parallel=True)
+    assert serial == pooled
+    assert all(d["headroom"] >= 0.25 - 1e-9 for d in serial["front"])
+
+
+def test_plan_endpoint():
+    with TestClient(app) as client:
+        response = client.post("/api/v1/plan/cellular", json={"data": CITY, "search": {"reuse_factor": [1, 3, 4, 7]}})
+        assert response.status_code == 200
+        assert response.json()["cheapest"]["reuse_factor"] in (1, 3, 4, 7)
+        assert client.post("/plan/cellular", json={"data": {**CITY, "gos": 2}}).status_code == 400
+        for bad in ({"search": {"reuse_factor": ["seven"]}}, {"search": {"channel_bandwidth": [None]}},
+                    {"min_headroom": "lots"}, {"max_sites": [3]}, {"search": {"max_reuse": "x"}}, {"search": [1]}):
+            response = client.post("/plan/cellular", json={"data": CITY, **bad})
+            assert response.status_code == 400 and "error" in response.json(), bad
+
+
+def test_off_table_gos_plans_quickly():
+    plan = CellularPlan.parse({"data": {**CITY, "gos": 0.0137}})
+    start = time.perf_counter()
+    result = optimize(plan, parallel=False)
+    assert time.perf_counter() - start < 1
+    assert result["front_size"] > 0
@@ -0,0 +1,213 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from app.api.v1.routes import SCENARIOS, calculate_cellular, calculate_link_budget
+from app.core.batch import calculate_batch
+from app.core.coverage import CoverageRaster, CoverageSpec
+from app.core.graph import GRAPHS, GraphState
+from app.core.planner import CellularPlan
+from app.core.propagation import MODELS, PropagationError, get_model, hata_height_terms, parse_model
+
+LINK = {
+    "distance": 5, "frequency": 900, "tx_gain": 12, "rx_gain": 2, "system_loss_db": 2,
+    "link_margin_db": 10, "temperature_k": 290, "noise_figure_db": 5, "bitrate": 1e6, "eb_n0_db": 10,
+}
+
+CASES = [
+    ({"propagation_model": "free_space"}, 2400),
+    ({"propagation_model": "log_distance", "path_loss_exponent": 3.5, "shadowing_sigma_db": 8,
+      "location_reliability": 0.9}, 2400),
+    ({"propagation_model": "okumura_hata", "environment": "urban"}, 900),
+    ({"propagation_model": "okumura_hata", "environment": "large_city", "rx_height_m": 3}, 200),
+    ({"propagation_model": "okumura_hata", "environment": "suburban", "tx_height_m": 50}, 900),
+    ({"propagation_model": "okumura_hata", "environment": "rural"}, 450),
+    ({"propagation_model": "cost231_hata", "environment": "large_city"}, 1800),
+    ({"propagation_model": "two_ray", "tx_height_m": 20, "rx_height_m": 2}, 900),
+]
+
+
+def hata_urban(d, f, hb, hm):
+    # Textbook small/medium-city Okumura-Hata, written out independently
+    a = (1.1 * math.log10(f) - 0.7) * hm - (1.56 * math.log10(f) - 0.8)
+    return 69.55 + 26.16 * math.log10(f) - 13.82 * math.log10(hb) - a + (44.9 - 6.55 * math.log10(hb)) * math.log10(d)
+
+
+def test_models_match_reference_formulas():
+    hata = parse_model({"propagation_model": "okumura_hata", "tx_height_m": 40, "rx_height_m": 2})
+    distances = np.array([1.0, 3.0, 12.0])
+    expected = [hata_urban(d, 900, 40, 2) for d in distances]
+    np.testing.assert_allclose(hata.loss_db(distances, 900), expected)
+    assert hata.path_loss_db(1, 900) == pytest.approx(expected[0])
+
+    cost = parse_model({"propagation_model": "cost231_hata", "environment": "large_city", "rx_height_m": 1.5})
+    a = 3.2 * math.log10(11.75 * 1.5) ** 2 - 4.97
+    assert cost.path_loss_db(2, 1800) == pytest.approx(
+        46.3 + 33.9 * math.log10(1800) - 13.82 * math.log10(30) - a + (44.9 - 6.55 * math.log10(30)) * math.log10(2) + 3
+    )
+
+    # Two-ray falls 40 dB per decade past the crossover (about 1.1 km here) and matches free space before it
+    two_ray = parse_model({"propagation_model": "two_ray"})
+    assert two_ray.path_loss_db(50, 900) - two_ray.path_loss_db(5, 900) == pytest.approx(40)
+    assert two_ray.path_loss_db(0.5, 900) == pytest.approx(parse_model({"propagation_model": "free_space"}).path_loss_db(0.5, 900))
+
+    # Shadowing adds sigma * z(reliability); at 50% reliability it adds nothing
+    plain = parse_model({"propagation_model": "log_distance"})
+    shadowed = parse_model({"propagation_model": "log_distance", "shadowing_sigma_db": 8, "location_reliability": 0.9})
+    assert shadowed.path_loss_db(4, 2400) - plain.path_loss_db(4, 2400) == pytest.approx(8 * 1.2815515655446004)
+    assert plain.path_loss_db(1, 2400) - plain.path_loss_db(0.1, 2400) == pytest.approx(30)
+
+
+@pytest.mark.parametrize("params, frequency", CASES)
+def test_range_inverts_loss(params, frequency):
+    model = parse_model(params)
+    distances = np.geomspace(0.01, 50, 200)
+    loss = model.loss_db(distances, frequency)
+    assert np.all(np.diff(loss) > 0)
+    np.testing.assert_allclose(model.range_km(loss, frequency), distances, rtol=2e-3)
+    frequencies = np.full(distances.shape, float(frequency))
+    np.testing.assert_allclose(model.loss_db(distances, frequencies), loss)
+
+
+def test_models_are_shared_and_height_terms_memoized():
+    first = parse_model({"propagation_model": "okumura_hata", "tx_height_m": 45})
+    assert parse_model({"propagation_model": "okumura_hata", "tx_height_m": "45", "path_loss_exponent": 9}) is first
+    before = hata_height_terms.cache_info().hits
+    get_model("cost231_hata", (("tx_height_m", 45.0), ("rx_height_m", 1.5), ("environment", "urban")))
+    assert hata_height_terms.cache_info().hits == before + 1
+    assert parse_model({}) is None
+    assert set(MODELS) == {"free_space", "log_distance", "okumura_hata", "cost231_hata", "two_ray"}
+
+
+def test_invalid_models():
+    with pytest.raises(PropagationError, match="Unknown propagation model"):
+        parse_model({"propagation_model": "egli"})
+    with pytest.raises(PropagationError, match="tx_height_m between 30 and 200"):
+        parse_model({"propagation_model": "okumura_hata", "tx_height_m": 10})
+    with pytest.raises(PropagationError, match="environment must be one of"):
+        parse_model({"propagation_model": "cost231_hata", "environment": "rural"})
+    with pytest.raises(PropagationError, match="must be a number"):
+        parse_model({"propagation_model": "log_distance", "path_loss_exponent": "steep"})
+    assert calculate_link_budget({**LINK, "frequency": 2400, "propagation_model": "okumura_hata"}) == {
+        "error": "Okumura-Hata is valid from 150 to 1500 MHz."
+    }
+
+
+def test_link_budget_uses_the_selected_model():
+    plain = calculate_link_budget(LINK)
+    assert "path_loss_db" not in plain and "propagation_model" not in plain
+    free = calculate_link_budget({**LINK, "propagation_model": "free_space"})
+    assert free["path_loss_db"] == free["fspl_db"]
+    assert free["transmit_power_dbm"] == plain["transmit_power_dbm"]
+
+    hata = calculate_link_budget({**LINK, "propagation_model": "okumura_hata"})
+    assert hata["fspl_db"] == plain["fspl_db"]
+    assert hata["path_loss_db"] == round(hata_urban(5, 900, 30, 1.5), 2)
+    assert hata["transmit_power_dbm"] - plain["transmit_power_dbm"] == pytest.approx(
+        hata["path_loss_db"] - plain["fspl_db"], abs=0.02
+    )
+
+
+def test_batch_groups_rows_by_model():
+    rng = random.Random(7)
+    rows = []
+    for _ in range(60):
+        params, frequency = rng.choice(CASES)
+        rows.append({**LINK, **params, "distance": rng.uniform(0.5, 20), "frequency": frequency})
+    names = {key for row in rows for key in row}
+    columns = {key: [row.get(key) for row in rows] for key in names}
+    result = calculate_batch("link_budget", columns)
+    assert result.errors == [None] * len(rows)
+    for index, row in enumerate(rows):
+        expected = SCENARIOS["link_budget"](row)
+        assert result.columns["propagation_model"][index] == expected["propagation_model"]
+        for name in ("path_loss_db", "transmit_power_dbm", "fspl_db"):
+            assert result.columns[name][index] == pytest.approx(expected[name], abs=1e-9), name
+
+    columns["frequency"][0] = 2400
+    columns["propagation_model"][0] = "okumura_hata"
+    columns["propagation_model"][1] = "egli"
+    errors = calculate_batch("link_budget", columns).errors
+    assert errors[0] == "Okumura-Hata is valid from 150 to 1500 MHz."
+    assert errors[1].startswith("Unknown propagation model: egli")
+
+
+CELL = {"area": 400, "cell_radius": 2, "reuse_factor": 7, "bandwidth": 20, "channel_bandwidth": 0.2,
+        "spectral_efficiency": 2, "subscribers": 50000, "calls_per_day": 3, "call_duration": 2, "gos": 0.02}
+
+
+def test_cellular_radius_from_max_path_loss():
+    data = {**CELL, "max_path_loss_db": 140, "frequency": 900, "propagation_model": "okumura_hata"}
+    result = calculate_cellular(data)
+    radius = parse_model(data).max_range_km(140, 900)
+    assert result["cell_radius_km"] == radius
+    assert hata_urban(radius, 900, 30, 1.5) == pytest.approx(140)
+    assert result["propagation_model"] == "okumura_hata" and result["max_path_loss_db"] == 140
+    assert "max_path_loss_db" not in calculate_cellular(CELL)
+    assert calculate_cellular({**CELL, "max_path_loss_db": 140}) == {"error": "Frequency must be greater than 0."}
+    assert calculate_cellular({**data, "max_path_loss_db": ""}) == calculate_cellular(CELL)
+    for bad in ("loud", [140], "nan"):
+        assert calculate_cellular({**data, "max_path_loss_db": bad}) == {"error": "Maximum path loss must be a number."}
+
+    batch = calculate_batch("cellular", {**data, "max_path_loss_db": [140, 130, None]})
+    assert batch.errors == [None, None, None]
+    assert batch.columns["cell_radius_km"][0] == pytest.approx(radius)
+    assert batch.columns["cell_radius_km"][1] < radius
+    assert batch.columns["cell_radius_km"][2] == 2
+    assert batch.columns["num_cells"][0] == result["num_cells"]
+    errors = calculate_batch("cellular", {**data, "max_path_loss_db": [140, "loud", "", float("nan")]}).errors
+    assert errors == [None, "Maximum path loss must be a number.", None, "Maximum path loss must be a number."]
+
+
+def test_planner_caps_radii_at_the_propagation_range():
+    data = {**CELL, "max_path_loss_db": 130, "frequency": 900, "propagation_model": "okumura_hata"}
+    plan = CellularPlan.parse({"data": data, "search": {"cell_radius": {"start": 0.2, "stop": 10, "num": 100}}})
+    limit = parse_model(data).max_range_km(130, 900)
+    radii, _, _ = plan.feasible()
+    assert radii.size and radii.max() <= limit
+
+
+@pytest.mark.parametrize("scenario, base, params", [
+    ("link_budget", LINK, {"propagation_model": ["okumura_hata", "two_ray", None, "egli"],
+                           "frequency": [900, 1800, 2400], "environment": ["urban", "rural", "large_city"]}),
+    ("cellular", CELL, {"max_path_loss_db": [None, 120, 150], "frequency": [900, 1800, 0],
+                        "propagation_model": ["cost231_hata", "log_distance", None]}),
+])
+def test_graphs_follow_model_inputs(scenario, base, params):
+    rng = random.Random(scenario)
+    row = dict(base)
+    state = GraphState(GRAPHS[scenario], row)
+    for _ in range(40):
+        delta = {name: rng.choice(values) for name, values in params.items() if rng.random() < 0.6}
+        row.update(delta)
+        state.update(delta)
+        error = state.error()
+        assert ({"error": error} if error else state.outputs()) == SCENARIOS[scenario](row)
+
+
+def test_coverage_with_a_propagation_model():
+    body = {
+        "bounds": [0, 0, 10, 10], "width": 40, "height": 40,
+        "transmitters": [{"x": 3, "y": 3, "power_dbm": 43, "gain_dbi": 15, "frequency": 900},
+                         {"x": 7, "y": 7, "power_dbm": 40, "gain_dbi": 15, "frequency": 900}],
+        "propagation": {"propagation_model": "okumura_hata", "environment": "suburban"},
+    }
+    spec = CoverageSpec.parse(body)
+    spec.tile = 8
+    raster = CoverageRaster(spec)
+    raster.compute()
+    model = spec.model
+    row, col = 30, 5
+    powers = [tx.eirp_dbm - model.path_loss_db(math.hypot(spec.xs[col] - tx.x, spec.ys[row] - tx.y), 900)
+              for tx in spec.transmitters]
+    assert raster.power[row, col] == pytest.approx(max(powers), abs=1e-3)
+    assert raster.best_server[row, col] == int(np.argmax(powers))
+
+    before = raster.power.copy()
+    raster.move(1, 6, 2)
+    fresh = CoverageRaster(spec)
+    fresh.compute()
+    np.testing.assert_allclose(raster.power, fresh.power, atol=1e-4)
+    assert not np.allclose(before, raster.power)
@@ -0,0 +1,136 @@
+import json
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.v1.routes import calculate_link_budget
+from app.core.sweep import SweepError, SweepPlan, SweepSummary, run_sweep, shutdown_pool, validate
+from app.main import app
+
+BASE = {"link_margin_db": 3, "noise_figure_db": 5, "eb_n0_db": 10, "bitrate": 1e6, "tx_gain": 10, "rx_gain": 3}
+
+
+def link_plan(**extra):
+    body = {
+        "scenario": "link_budget",
+        "base": BASE,
+        "sweep": {
+            "distance": {"start": 0.1, "stop": 100, "num": 400, "scale": "log"},
+            "frequency": [900, 1800, 2600],
+        },
+        "limits": [{"output": "transmit_power_dbm", "at_most": 0, "axis": "distance"}],
+    }
+    body.update(extra)
+    return SweepPlan.parse(body)
+
+
+def summarise(plan, **kwargs):
+    summary = SweepSummary(plan)
+    chunks = list(run_sweep(plan, **kwargs))
+    for chunk in chunks:
+        summary.update(chunk)
+    return chunks, summary.to_dict()
+
+
+def test_chunks_cover_the_cartesian_product():
+    plan = link_plan()
+    chunks, _ = summarise(plan, chunk_rows=97, parallel=False)
+    assert plan.total == 1200
+    assert [c["start"] for c in chunks] == list(range(0, 1200, 97))
+    distance = np.concatenate([c["inputs"]["distance"] for c in chunks])
+    frequency = np.concatenate([c["inputs"]["frequency"] for c in chunks])
+    assert len(set(zip(distance.tolist(), frequency.tolist()))) == 1200
+    # Spot check one row against the single-design calculator
+    row = 523
+    expected = calculate_link_budget({**BASE, "distance": distance[row], "frequency": frequency[row]})
+    outputs = np.concatenate([c["outputs"]["transmit_power_dbm"] for c in chunks])
+    assert outputs[row] == pytest.approx(expected["transmit_power_dbm"])
+
+
+def test_limit_finds_max_distance_per_frequency():
+    plan = link_plan()
+    _, doc = summarise(plan, chunk_rows=100, parallel=False)
+    curves = doc["limits"][0]["curves"]
+    assert [c["frequency"] for c in curves] == [900, 1800, 2600]
+    distances = plan.axes[0].values
+    for curve in curves:
+        # Largest swept distance with Pt <= 0 dBm, and the next one up exceeds it
+        pt = calculate_link_budget({**BASE, "distance": curve["distance"], "frequency": curve["frequency"]})
+        assert pt["transmit_power_dbm"] <= 0
+        following = distances[np.searchsorted(distances, curve["distance"]) + 1]
+        pt_next = calculate_link_budget({**BASE, "distance": following, "frequency": curve["frequency"]})
+        assert pt_next["transmit_power_dbm"] > 0
+    # Higher frequency, more path loss, shorter reach
+    assert curves[0]["distance"] > curves[1]["distance"] > curves[2]["distance"]
+
+
+def test_extrema_report_where_they_occur():
+    _, doc = summarise(link_plan(), parallel=False)
+    fspl = doc["extrema"]["fspl_db"]
+    assert fspl["min_at"] == {"distance": pytest.approx(0.1), "frequency": 900}
+    assert fspl["max_at"] == {"distance": pytest.approx(100), "frequency": 2600}
+
+
+def test_process_pool_matches_serial():
+    plan = link_plan()
+    try:
+        parallel, parallel_doc = summarise(plan, chunk_rows=150, parallel=True)
+    finally:
+        shutdown_pool()
+    serial, serial_doc = summarise(plan, chunk_rows=150, parallel=False)
+    assert parallel_doc == serial_doc
+    for a, b in zip(parallel, serial):
+        np.testing.assert_array_equal(a["outputs"]["fspl_db"], b["outputs"]["fspl_db"])
+
+
+def test_plan_validation():
+    with pytest.raises(SweepError):
+        SweepPlan.parse({"scenario": "link_budget", "sweep": {}})
+    with pytest.raises(SweepError):
+        link_plan(limits=[{"output": "transmit_power_dbm", "at_most": 30, "axis": "bitrate"}])
+    with pytest.raises(SweepError):
+        SweepPlan.parse({"scenario": "link_budget", "sweep": {"distance": {"start": 0, "stop": 1, "scale": "log"}}})
+    with pytest.raises(SweepError):
+        link_plan(base={"distance": [1, 2]})
+    with pytest.raises(SweepError, match="must be a number"):
+        link_plan(limits=[{"output": "transmit_power_dbm", "at_most": "high", "axis": "distance"}])
+    with pytest.raises(SweepError, match="is not an output"):
+        validate(link_plan(limits=[{"output": "range_km", "at_most": 3, "axis": "distance"}]))
+
+
+def test_sweep_endpoint_rejects_bad_limits_before_streaming():
+    body = {"scenario": "link_budget", "base": BASE, "sweep": {"distance": [1, 2, 3], "frequency": [900]},
+            "limits": [{"output": "range_km", "at_most": 3, "axis": "distance"}]}
+    with TestClient(app) as client:
+        assert client.post("/sweep", json=body).status_code == 400
+        body["limits"] = [{"output": "transmit_power_dbm", "at_least": [1], "axis": "distance"}]
+        assert client.post("/sweep", json=body).status_code == 400
+        body["limits"] = []
+        for chunk_rows in (0, -5):
+            lines = [json.loads(l) for l in client.post("/sweep", json={**body, "chunk_rows": chunk_rows}).text.splitlines()]
+            assert [l["stop"] for l in lines if l["type"] == "rows"] == [1, 2, 3]
+            assert lines[-1]["rows"] == 3
+
+
+def test_sweep_endpoint_streams_and_explains_once(gemini):
+    gemini.reply(text="Reach shrinks with frequency.")
+    body = {
+        "scenario": "cellular",
+        "base": {"area": 500, "bandwidth": 20, "channel_bandwidth": 0.2, "spectral_efficiency": 2,
+                 "subscribers": 50000, "calls_per_day": 3, "call_duration": 2, "gos": 0.02},
+        "sweep": {"cell_radius": {"start": 0.5, "stop": 5, "num": 10}, "reuse_factor": [1, 3, 4, 7]},
+        "outputs": ["num_cells", "channels_per_cell"],
+        "chunk_rows": 16,
+        "explain": True,
+    }
+    with TestClient(app) as client:
+        lines = [json.loads(l) for l in client.post("/api/v1/sweep", json=body).text.splitlines()]
+        assert client.post("/sweep", json={"scenario": "cellular", "sweep": {"x": "bad"}}).status_code == 400
+    assert lines[0]["type"] == "plan" and lines[0]["total"] == 40
+    rows = [l for l in lines if l["type"] == "rows"]
+    assert sum(l["stop"] - l["start"] for l in rows) == 40
+    assert set(rows[0]) == {"type", "start", "stop", "cell_radius", "reuse_factor", "num_cells", "channels_per_cell"}
+    assert lines[-2]["type"] == "summary" and lines[-2]["rows"] == 40
+    assert lines[-1] == {"type": "explanation", "text": "Reach shrinks with frequency."}
+    assert len(gemini.requests) == 1